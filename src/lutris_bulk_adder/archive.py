@@ -0,0 +1,81 @@
+import os
+import zipfile
+from collections import namedtuple
+
+from lutris_bulk_adder.constants import ARCHIVE_EXTENSIONS
+
+# Files that come along with ROMs in archives, but aren't games themselves
+EXTRA_EXTENSIONS = {'txt', 'nfo', 'diz', 'pdf', 'htm', 'html', 'jpg', 'jpeg', 'png', 'gif', 'xml', 'dat', 'md5', 'sfv'}
+
+# A file inside an archive, as listed in the archive's central directory
+ArchiveMember = namedtuple('ArchiveMember', ['name', 'size', 'crc32', 'stored'])
+
+
+def is_archive(path: str):
+    """Checks whether a file is an archive the script can look into, by its extension.
+
+    Args:
+        path: Path to the file.
+
+    Returns:
+        True if the file is an archive.
+    """
+
+    return os.path.splitext(path)[1][1:].lower() in ARCHIVE_EXTENSIONS
+
+
+def read_archive(path: str):
+    """Lists the files inside an archive, without extracting or decompressing any of them.
+
+    Note:
+        A zip file ends with a central directory, which lists the name, uncompressed size and CRC32 of every file in it. Only that part of the file is read, so looking into an archive costs about one small read, no matter how big the ROMs inside are.
+
+    Args:
+        path: Path to the archive.
+
+    Returns:
+        A list of ArchiveMember tuples, without the directories. `stored` tells whether the member is stored uncompressed.
+
+    Raises:
+        OSError: If the archive can't be read.
+        ValueError: If the file isn't a valid zip file, or one zipfile can't read.
+    """
+
+    try:
+        with zipfile.ZipFile(path) as archive:
+            return [
+                ArchiveMember(info.filename, info.file_size, info.CRC, info.compress_type == zipfile.ZIP_STORED)
+                for info in archive.infolist()
+                if not info.is_dir()
+            ]
+    except (zipfile.BadZipFile, NotImplementedError) as err:
+        # zipfile raises NotImplementedError for archives of a
+        # newer zip version, which is as good as a broken one here
+        raise ValueError(str(err))
+
+
+def main_member(members: list[ArchiveMember]):
+    """Picks the ROM out of the files of an archive, leaving out readmes, scans and checksum files.
+
+    Args:
+        members: The files of the archive, as returned by `read_archive`.
+
+    Returns:
+        The biggest file that isn't an extra, or None if there is none.
+    """
+
+    roms = [member for member in members if os.path.splitext(member.name)[1][1:].lower() not in EXTRA_EXTENSIONS]
+    return max(roms, key=lambda member: member.size, default=None)
+
+
+def member_digests(member: ArchiveMember):
+    """The digests of a file inside an archive that are known without extracting it.
+
+    Args:
+        member: The file inside the archive.
+
+    Returns:
+        A dictionary with the CRC32 as a lowercase hex digest, like `hashing.hash_file` returns them.
+    """
+
+    return {'crc32': '{:08x}'.format(member.crc32)}
@@ -0,0 +1,586 @@
+"""Benchmarks for the hot spots of the import.
+
+Run with `python -m lutris_bulk_adder.benchmark <benchmark> [options]`.
+"""
+
+import os
+import re
+import sys
+import json
+import time
+import random
+import shutil
+import sqlite3
+import argparse
+import tempfile
+import importlib
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+
+import yaml
+
+from lutris_bulk_adder.config import ConfigTemplate, ConfigWriter
+from lutris_bulk_adder.normalize import Normalizer, filename_stem
+from lutris_bulk_adder.scanner import scan_directory
+from lutris_bulk_adder.hashing import FileHasher
+from lutris_bulk_adder.database import GameWriter, GAME_COLUMNS
+from lutris_bulk_adder.constants import DEFAULT_MANIFEST_NAME
+
+# bits and pieces synthetic file names are put together from,
+# roughly following the No-Intro/TOSEC naming conventions
+_TITLE_WORDS = ['Super', 'Mario', 'Zelda', "Link's", 'Adventure', 'Dr.', 'World', 'Kart', 'Sonic',
+                'the', 'Hedgehog', 'Final', 'Fantasy', 'Street', 'Fighter', 'II', 'Turbo', '3D']
+_TAGS = ['(USA)', '(Europe)', '(Japan)', '(En,Fr,De)', '(Rev 1)', '(Beta)', '[!]', '[b1]', '(Disc 1)', '(Disc 2)']
+_EXTENSIONS = ['sfc', 'iso', 'chd', 'zip', 'nes', 'gba']
+
+
+def synthetic_filenames(count: int, seed: int = 0, extensions: list[str] = _EXTENSIONS):
+    """Generates ROM-like file names, with repeats like a real library has them (regions, revisions, discs).
+
+    Args:
+        count: Number of file names to generate.
+        seed (optional): Seed for the random generator, so runs are comparable.
+        extensions (optional): The extensions to pick from. Defaults to a mix of cartridge, disc and archive extensions.
+
+    Returns:
+        A list of file names.
+    """
+
+    rng = random.Random(seed)
+    titles = [' '.join(rng.choices(_TITLE_WORDS, k=rng.randint(1, 4))) for _ in range(max(1, count // 4))]
+    return [
+        '{title} {tags}.{ext}'.format(
+            title = rng.choice(titles),
+            tags = ' '.join(rng.sample(_TAGS, rng.randint(0, 3))),
+            ext = rng.choice(extensions)
+        )
+        for _ in range(count)
+    ]
+
+
+def _legacy_normalize(filename: str, strip_tokens: list[str]):
+    """The name and slug generation as it used to be done inline in `main()`, kept for comparison."""
+
+    game = re.sub(r"\..*", "", filename)
+    for token in strip_tokens:
+        game = game.replace(token, "")
+    game = re.sub(r"\(.*?\)|\[.*?\]", "", game)
+    game = re.sub(r"\s+", " ", game).strip(" ")
+    slug = re.sub(r"[^0-9A-Za-z']", " ", game)
+    slug = slug.replace("'", "")
+    slug = re.sub(r"\s+", "-", slug).strip("-").lower()
+    return game, slug
+
+
+def bench_normalize(count: int, strip_tokens: list[str]):
+    """Measures the throughput of the normalizer against the old inline implementation.
+
+    Args:
+        count: Number of synthetic file names to normalize.
+        strip_tokens: Strings to strip from the file names, like `--strip-filename`.
+
+    Returns:
+        A dictionary of variant name to files normalized per second.
+    """
+
+    filenames = synthetic_filenames(count)
+    results = {}
+
+    started = time.perf_counter()
+    legacy = [_legacy_normalize(filename, strip_tokens) for filename in filenames]
+    results['legacy'] = count / (time.perf_counter() - started)
+
+    normalizer = Normalizer(strip_tokens, cache_size=0)
+    started = time.perf_counter()
+    uncached = [normalizer.normalize(filename_stem(filename)) for filename in filenames]
+    results['compiled'] = count / (time.perf_counter() - started)
+
+    normalizer = Normalizer(strip_tokens)
+    started = time.perf_counter()
+    cached = [normalizer.normalize(filename_stem(filename)) for filename in filenames]
+    results['memoized'] = count / (time.perf_counter() - started)
+
+    normalizer = Normalizer(strip_tokens)
+    started = time.perf_counter()
+    batched = normalizer.normalize_many([filename_stem(filename) for filename in filenames])
+    results['batch'] = count / (time.perf_counter() - started)
+
+    # a faster normalizer is no good if it gets the names wrong
+    if not legacy == uncached == cached == batched:
+        raise AssertionError("The normalizer doesn't produce the same names as the old implementation")
+
+    return results
+
+
+def bench_config(count: int):
+    """Measures the throughput of rendering game configs against plain `yaml.dump`.
+
+    Args:
+        count: Number of configs to render.
+
+    Returns:
+        A dictionary of variant name to configs rendered per second.
+    """
+
+    paths = ['/roms/snes/' + filename for filename in synthetic_filenames(count)]
+    template = ConfigTemplate({'core': 'snes9x', 'platform': '1'})
+    results = {}
+
+    started = time.perf_counter()
+    legacy = [yaml.dump(template.config(path), default_flow_style=False) for path in paths]
+    results['yaml.dump'] = count / (time.perf_counter() - started)
+
+    started = time.perf_counter()
+    rendered = [template.render(path) for path in paths]
+    results['template'] = count / (time.perf_counter() - started)
+
+    if legacy != rendered:
+        raise AssertionError("The config template doesn't produce the same YAML as yaml.dump")
+
+    return results
+
+
+def bench_startup(count: int):
+    """Measures how often per second the platform constants can be imported, with and without building every platform up front like it used to be done.
+
+    Args:
+        count: Number of times to import the constants.
+
+    Returns:
+        A dictionary of variant name to imports per second.
+    """
+
+    from lutris_bulk_adder import constants
+    from lutris_bulk_adder.classes import PlatformData
+    results = {}
+
+    # reloading runs the module again, like a fresh start of the script would
+    started = time.perf_counter()
+    for _ in range(count):
+        module = importlib.reload(constants)
+        platforms = {name: PlatformData(**spec) for name, spec in module.PLATFORM_SPECS.items()}
+        for platform in platforms.values():
+            platform.validate()
+    results['eager'] = count / (time.perf_counter() - started)
+
+    started = time.perf_counter()
+    for _ in range(count):
+        module = importlib.reload(constants)
+    results['lazy'] = count / (time.perf_counter() - started)
+
+    return results
+
+
+# modules the help and info paths of the command line shouldn't load
+HEAVY_MODULES = ['yaml', 'sqlite3', 'multiprocessing', 'concurrent.futures', 'datetime']
+
+
+def bench_cli(count: int, platform: str):
+    """Measures how often per second the command line can print the info of a platform, against the bare start of the interpreter.
+
+    Note:
+        Every run is a fresh interpreter started with `-X importtime`, so the imports are measured the way they happen for a user, e.g. from shell completion.
+
+    Args:
+        count: Number of times to run the command line.
+        platform: The platform to print the info of, like `-i`.
+
+    Returns:
+        A tuple of a dictionary of variant name to runs per second, the milliseconds spent importing the script as reported by `-X importtime`, and the heavy modules that got imported anyway.
+    """
+
+    commands = {
+        'python': [sys.executable, '-X', 'importtime', '-c', 'pass'],
+        'info': [sys.executable, '-X', 'importtime', '-m', 'lutris_bulk_adder.lutris_bulk_adder', '-i', platform],
+    }
+    results = {}
+    imports = {}
+    for variant, command in commands.items():
+        started = time.perf_counter()
+        for _ in range(count):
+            stderr = subprocess.run(command, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True, check=True).stderr
+        results[variant] = count / (time.perf_counter() - started)
+
+        # lines look like "import time: self [us] | cumulative | imported package",
+        # nested imports are indented below the one that triggered them
+        imports[variant] = {}
+        for line in stderr.splitlines():
+            if not line.startswith('import time:') or line.endswith('imported package'):
+                continue
+            _, cumulative, module = line[len('import time:'):].split('|')
+            imports[variant][module.strip()] = (int(cumulative), not module[1:].startswith(' '))
+
+    # whatever the interpreter imports by itself isn't the script's fault
+    import_ms = sum(cumulative for cumulative, top in imports['info'].values() if top) / 1000 \
+        - sum(cumulative for cumulative, top in imports['python'].values() if top) / 1000
+    heavy = [module for module in HEAVY_MODULES if module in imports['info']]
+
+    return results, import_ms, heavy
+
+
+# The parts of the Lutris database schema the import touches, as Lutris creates them
+LUTRIS_SCHEMA = """
+CREATE TABLE games (
+    id INTEGER PRIMARY KEY,
+    name TEXT,
+    sortname TEXT,
+    slug TEXT,
+    installer_slug TEXT,
+    parent_slug TEXT,
+    platform TEXT,
+    runner TEXT,
+    executable TEXT,
+    directory TEXT,
+    updated DATETIME,
+    lastplayed INTEGER,
+    installed INTEGER,
+    installed_at INTEGER,
+    year INTEGER,
+    configpath TEXT,
+    has_custom_banner INTEGER,
+    has_custom_icon INTEGER,
+    has_custom_coverart_big INTEGER,
+    playtime REAL,
+    hidden INTEGER DEFAULT 0,
+    service TEXT,
+    service_id TEXT,
+    discord_id TEXT
+);
+CREATE TABLE categories (id INTEGER PRIMARY KEY, name TEXT UNIQUE);
+CREATE TABLE games_categories (game_id INTEGER, category_id INTEGER);
+"""
+
+# The platform the end to end benchmark imports as, and the extensions of its ROMs
+TREE_PLATFORM = 'Nintendo SNES'
+TREE_EXTENSIONS = ['sfc', 'smc']
+TREE_LAYOUTS = ['flat', 'nested']
+
+
+def create_lutris_database(path: str):
+    """Creates an empty Lutris database to import into.
+
+    Args:
+        path: Path of the database file. An existing file is replaced.
+    """
+
+    if os.path.exists(path):
+        os.remove(path)
+    conn = sqlite3.connect(path)
+    conn.executescript(LUTRIS_SCHEMA)
+    conn.close()
+
+
+def generate_tree(root: str, count: int, layout: str = 'flat', size: int = 4096, seed: int = 0):
+    """Generates a directory tree of synthetic ROM files.
+
+    Note:
+        Every file gets its own contents, so no two files hash the same. The `flat` layout puts every file into `root` itself, the `nested` layout sorts them into a folder per first letter and a folder per game under that, like many ROM collections are kept.
+
+    Args:
+        root: The directory to generate the tree in. It must not exist yet.
+        count: Number of files to generate.
+        layout (optional): One of TREE_LAYOUTS. Default `flat`.
+        size (optional): The size of every file in bytes. Default 4096.
+        seed (optional): Seed for the random generator, so trees are comparable.
+
+    Returns:
+        The number of directories in the tree, including `root`.
+    """
+
+    os.makedirs(root)
+    directories = {root}
+    seen = set()
+    for number, filename in enumerate(synthetic_filenames(count, seed, TREE_EXTENSIONS)):
+        # the same name can come up more than once, like different dumps of a game
+        if filename in seen:
+            stem, ext = os.path.splitext(filename)
+            filename = '{} [{}]{}'.format(stem, number, ext)
+        seen.add(filename)
+
+        directory = root
+        if layout == 'nested':
+            title = re.sub(r"\s*[\(\[].*", "", os.path.splitext(filename)[0])
+            directory = os.path.join(root, title[0].upper(), title)
+            if directory not in directories:
+                os.makedirs(directory, exist_ok=True)
+                directories.add(directory)
+
+        # a counter at the start keeps the contents of every file different
+        data = number.to_bytes(8, 'little')
+        with open(os.path.join(directory, filename), 'wb') as f:
+            f.write((data * (size // 8 + 1))[:size])
+
+    return len(directories)
+
+
+def _run_import(root: str, workdir: str, count: int, layout: str, options: list[str]):
+    """Imports a synthetic ROM tree through the command line into a fresh scratch database, and returns the seconds it took."""
+
+    database = os.path.join(workdir, 'pga.db')
+    yml_dir = os.path.join(workdir, 'games')
+    create_lutris_database(database)
+    shutil.rmtree(yml_dir, ignore_errors=True)
+    os.makedirs(yml_dir)
+    # no digests from the hash cache of the run before
+    side_database = os.path.join(workdir, DEFAULT_MANIFEST_NAME)
+    if os.path.exists(side_database):
+        os.remove(side_database)
+
+    command = [sys.executable, '-m', 'lutris_bulk_adder.lutris_bulk_adder',
+               '-p', TREE_PLATFORM, '-d', root, '-f', *TREE_EXTENSIONS,
+               '-ld', database, '-ly', yml_dir, '-lg', workdir, '--no-progress', *options]
+    if layout == 'nested':
+        command.append('-R')
+    started = time.perf_counter()
+    subprocess.run(command, stdout=subprocess.DEVNULL, check=True)
+    elapsed = time.perf_counter() - started
+
+    conn = sqlite3.connect(database)
+    rows = conn.execute("SELECT count(*) FROM games").fetchone()[0]
+    conn.close()
+    if rows != count:
+        raise AssertionError("The import wrote {} games instead of {}".format(rows, count))
+    return elapsed
+
+
+def bench_import(root: str, workdir: str, count: int, layout: str, processes: list[int] | None = None):
+    """Times every stage of an import of a synthetic ROM tree on its own, and then the whole import through the command line.
+
+    Note:
+        The stages are: scanning the tree, hashing every file, generating the names and slugs, rendering the YML configs, writing the rows and configs into a scratch Lutris database, and last a full run of the command line into a fresh database, which also includes starting the interpreter. Every stage gets the output of the one before, so they work on the same files as a real import would.
+        With `processes`, the whole import is also run with hashing (`-H`), once with the threads of the pipeline (`import-hash`) and once for every number of processes (`import-hash-p4` for `--processes 4`), to see how the import scales with the cores.
+
+    Args:
+        root: The synthetic ROM tree, see `generate_tree`.
+        workdir: A directory for the scratch databases and config files.
+        count: The number of files in the tree, to check that every stage saw all of them.
+        layout: The layout of the tree, one of TREE_LAYOUTS.
+        processes (optional): The numbers of processes to run the import with.
+
+    Returns:
+        A dictionary of stage name to seconds taken.
+    """
+
+    results = {}
+    max_depth = None if layout == 'nested' else 0
+
+    started = time.perf_counter()
+    paths = list(scan_directory(root, TREE_EXTENSIONS, max_depth=max_depth))
+    results['scan'] = time.perf_counter() - started
+    if len(paths) != count:
+        raise AssertionError("The scan found {} files instead of {}".format(len(paths), count))
+
+    # hashed the way the hash stage of the import does,
+    # from as many threads as the hasher has processes
+    started = time.perf_counter()
+    hasher = FileHasher()
+    with ThreadPoolExecutor(max_workers=hasher.workers) as executor:
+        digests = list(executor.map(hasher.hash, paths))
+    hasher.close()
+    results['hash'] = time.perf_counter() - started
+    if None in digests:
+        raise AssertionError("Some of the files couldn't be hashed")
+
+    started = time.perf_counter()
+    names = Normalizer().normalize_many([filename_stem(path) for path in paths])
+    results['normalize'] = time.perf_counter() - started
+
+    template = ConfigTemplate({'core': 'snes9x'})
+    started = time.perf_counter()
+    configs = [template.render(path) for path in paths]
+    results['config'] = time.perf_counter() - started
+
+    database = os.path.join(workdir, 'pga.db')
+    yml_dir = os.path.join(workdir, 'games')
+    create_lutris_database(database)
+    shutil.rmtree(yml_dir, ignore_errors=True)
+    os.makedirs(yml_dir)
+
+    started = time.perf_counter()
+    conn = sqlite3.connect(database)
+    writer = GameWriter(conn, configs=ConfigWriter())
+    for game_id, ((name, slug), config) in enumerate(zip(names, configs), start=1):
+        values = dict.fromkeys(GAME_COLUMNS)
+        values.update(id=game_id, name=name, slug=slug, platform=TREE_PLATFORM, runner='libretro',
+                      directory=workdir, lastplayed=0, installed=1, installed_at=0,
+                      configpath='{}-{}'.format(slug, game_id))
+        writer.add(values, os.path.join(yml_dir, '{}-{}.yml'.format(slug, game_id)), config)
+    writer.close()
+    writer.configs.close()
+    conn.close()
+    results['write'] = time.perf_counter() - started
+
+    # the whole thing, the way a user runs it
+    results['import'] = _run_import(root, workdir, count, layout, [])
+    if processes:
+        results['import-hash'] = _run_import(root, workdir, count, layout, ['-H'])
+        for number in processes:
+            results['import-hash-p{}'.format(number)] = _run_import(root, workdir, count, layout, ['-H', '--processes', str(number)])
+
+    return results
+
+
+def compare_baseline(runs: list[dict], baseline: list[dict], max_regression: float):
+    """Compares the stage timings of benchmark runs against the ones stored from an earlier run.
+
+    Args:
+        runs: The runs of this benchmark, as written to the JSON results.
+        baseline: The runs of the baseline. Runs are matched up by their number of files and layout, runs without a match are left out.
+        max_regression: How much slower than the baseline a stage may be, as a fraction (0.25 is 25% slower).
+
+    Returns:
+        A list of `(files, layout, stage, seconds, baseline seconds)` tuples of the stages that got slower by more than allowed.
+    """
+
+    stored = {(run['files'], run['layout']): run['stages'] for run in baseline}
+    regressions = []
+    for run in runs:
+        stages = stored.get((run['files'], run['layout']))
+        if stages is None:
+            print("No baseline for {files} files ({layout})".format(**run))
+            continue
+        for stage, seconds in run['stages'].items():
+            before = stages.get(stage)
+            if not before:
+                continue
+            change = seconds / before - 1
+            print("{files:>8} {layout:<7} {stage:<15} {seconds:>9.3f}s  baseline {before:>9.3f}s  {change:+.1%}".format(
+                files = run['files'], layout = run['layout'], stage = stage, seconds = seconds, before = before, change = change))
+            if change > max_regression:
+                regressions.append((run['files'], run['layout'], stage, seconds, before))
+    return regressions
+
+
+def run_import_benchmark(args: argparse.Namespace):
+    """Runs the end to end benchmark for every tree size and layout, and writes and compares the results.
+
+    Returns:
+        1 if a stage got slower than the baseline allows, None otherwise.
+    """
+
+    workdir = args.workdir or tempfile.mkdtemp(prefix='lutris-bulk-adder-benchmark-')
+    os.makedirs(workdir, exist_ok=True)
+    runs = []
+    try:
+        for count in args.files:
+            for layout in args.layout:
+                root = os.path.join(workdir, 'roms-{}-{}-{}'.format(layout, count, args.file_size))
+                generated = 0.0
+                if not os.path.isdir(root):
+                    started = time.perf_counter()
+                    generate_tree(root, count, layout, args.file_size)
+                    generated = time.perf_counter() - started
+
+                stages = bench_import(root, workdir, count, layout, args.processes)
+                runs.append({'files': count, 'layout': layout, 'file_size': args.file_size,
+                             'generate': generated, 'stages': stages})
+
+                print("{count:,} files ({layout})".format(count = count, layout = layout))
+                for stage, seconds in stages.items():
+                    print("  {stage:<15} {seconds:>9.3f}s {rate:>12,.0f} files per second".format(
+                        stage = stage, seconds = seconds, rate = count / seconds if seconds else 0))
+    finally:
+        if not args.workdir:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    results = {'python': sys.version.split()[0], 'cpus': os.cpu_count(), 'runs': runs}
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        regressions = compare_baseline(runs, baseline['runs'], args.max_regression / 100)
+        for files, layout, stage, seconds, before in regressions:
+            print("The {stage} stage of {files} files ({layout}) took {seconds:.3f}s, more than {allowed}% over the baseline of {before:.3f}s".format(
+                stage = stage, files = files, layout = layout, seconds = seconds, allowed = args.max_regression, before = before), file=sys.stderr)
+        if regressions:
+            return 1
+
+
+def main(argv: list[str] | None = None):
+    parser = argparse.ArgumentParser(prog='python -m lutris_bulk_adder.benchmark',
+                                     description='Benchmarks for the hot spots of the import.')
+    benchmarks = parser.add_subparsers(dest='benchmark', required=True)
+
+    normalize = benchmarks.add_parser('normalize', help='Throughput of game name and slug generation.')
+    normalize.add_argument('--count', type=int, default=1_000_000,
+                           help='Number of synthetic file names to normalize.')
+    normalize.add_argument('-s', '--strip-filename', nargs='*', default=['(USA)', '(Europe)'],
+                           help='Space-separated list of strings to strip from the file names.')
+
+    config = benchmarks.add_parser('config', help='Throughput of YML config rendering.')
+    config.add_argument('--count', type=int, default=100_000,
+                        help='Number of configs to render.')
+
+    startup = benchmarks.add_parser('startup', help='Import time of the platform constants.')
+    startup.add_argument('--count', type=int, default=1_000,
+                         help='Number of times to import the constants.')
+    startup.add_argument('--max-ms', type=float, default=None,
+                         help='Fail if importing the constants takes longer than this many milliseconds, to catch startup regressions.')
+
+    cli = benchmarks.add_parser('cli', help='Start up time of the command line, printing the info of a platform.')
+    cli.add_argument('--count', type=int, default=20,
+                     help='Number of times to run the command line.')
+    cli.add_argument('-i', '--platform-info', default='Nintendo 64',
+                     help='The platform to print the info of.')
+    cli.add_argument('--max-ms', type=float, default=None,
+                     help='Fail if a run takes longer than this many milliseconds, to catch startup regressions.')
+
+    end_to_end = benchmarks.add_parser('import', help='Time of every stage of importing synthetic ROM trees, and of the whole import.')
+    end_to_end.add_argument('--files', type=int, nargs='+', default=[1_000, 10_000],
+                            help='The sizes of the trees to import, in files, e.g. 1000 10000 100000 1000000.')
+    end_to_end.add_argument('--layout', nargs='+', choices=TREE_LAYOUTS, default=TREE_LAYOUTS,
+                            help='Lay the files out in one directory (flat), and/or in a folder per letter and game (nested).')
+    end_to_end.add_argument('--file-size', type=int, default=4096,
+                            help='The size of every synthetic ROM in bytes.')
+    end_to_end.add_argument('--workdir', default=None,
+                            help='Keep the trees and scratch databases in this directory, and reuse trees generated by an earlier run. By default they go into a temporary directory that is deleted afterwards.')
+    end_to_end.add_argument('--processes', type=int, nargs='+', default=[],
+                            help='Also import with hashing, in threads and with each of these numbers of processes, to see how the import scales with the cores.')
+    end_to_end.add_argument('-o', '--output', default=None,
+                            help='Write the results as JSON to this file, to be used as a baseline later.')
+    end_to_end.add_argument('--baseline', default=None,
+                            help='Compare the results against a JSON file written by an earlier run with --output.')
+    end_to_end.add_argument('--max-regression', type=float, default=25.0,
+                            help='Fail if a stage is more than this many percent slower than in the baseline.')
+
+    args = parser.parse_args(argv)
+
+    if args.benchmark == 'import':
+        return run_import_benchmark(args)
+
+    if args.benchmark == 'normalize':
+        results = bench_normalize(args.count, args.strip_filename)
+    elif args.benchmark == 'config':
+        results = bench_config(args.count)
+    elif args.benchmark == 'startup':
+        results = bench_startup(args.count)
+    elif args.benchmark == 'cli':
+        results, import_ms, heavy = bench_cli(args.count, args.platform_info)
+
+    baseline = next(iter(results.values()))
+    for variant, rate in results.items():
+        print("{variant:<10} {rate:>12,.0f} per second ({speedup:.1f}x)".format(
+            variant = variant, rate = rate, speedup = rate / baseline))
+
+    if args.benchmark == 'startup' and args.max_ms is not None:
+        import_ms = 1000 / results['lazy']
+        if import_ms > args.max_ms:
+            print("Importing the constants took {:.3f}ms, more than the allowed {}ms".format(import_ms, args.max_ms), file=sys.stderr)
+            return 1
+
+    if args.benchmark == 'cli':
+        run_ms = 1000 / results['info']
+        print("Importing the script took {:.1f}ms, a whole run {:.1f}ms".format(import_ms, run_ms))
+        if heavy:
+            print("Heavy modules imported: {}".format(', '.join(heavy)), file=sys.stderr)
+            return 1
+        if args.max_ms is not None and run_ms > args.max_ms:
+            print("A run took {:.1f}ms, more than the allowed {}ms".format(run_ms, args.max_ms), file=sys.stderr)
+            return 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,3 +1,5 @@
+from collections.abc import Mapping
+
 class MissingRequiredDataError(ValueError):
     pass
 
@@ -27,18 +29,28 @@ class PlatformData():
         default_runner (required): The default lutris runner assigned for this platform. This runner must be included in the runners list.
         cores (required by default_core attribute, requires libretro to be in runners list): A list of libretro cores available for the platform.
         default_core (optional, requires libretro to be the default_runner attribute's value): The default libretro core assigned for this platform.
+        extensions (optional): A list of file extensions (lowercase, without the dot) the games of the platform come in. Used to detect the platform of a file.
     """
     runners: list[str]
     default_runner: str
-    cores: list[str] | None = None
-    default_core: str | None = None
+    cores: list[str] | None
+    default_core: str | None
+    extensions: list[str] | None
+
+    # the platforms are built on every start of the script,
+    # slots keep them small and quick to create
+    __slots__ = ('runners', 'default_runner', 'cores', 'default_core', 'extensions')
 
     def __init__(
             self,
             runners: list[str], default_runner: str,
-            cores: list[str] | None = None, default_core: str | None = None
+            cores: list[str] | None = None, default_core: str | None = None,
+            extensions: list[str] | None = None
     ):
-        """Initialize the class and before that ensure no foul play with the input data.
+        """Initialize the class.
+
+        Note:
+            The input data isn't checked here, so looking up a platform stays cheap. The built-in platforms are checked once with `validate` by running `python -m lutris_bulk_adder.constants`, see `PlatformRegistry.validate`.
 
         Args:
             self: The current class instance. Used to reference the attributes of the class.
@@ -46,14 +58,36 @@ class PlatformData():
             default_runner (required): The default lutris runner assigned for this platform. This runner must be included in the runners list.
             cores (required by default_core attribute, requires libretro to be in runners list): A list of libretro cores available for the platform.
             default_core (optional, requires libretro to be the default_runner attribute's value): The default libretro core assigned for this platform.
+            extensions (optional): A list of file extensions (lowercase, without the dot) the games of the platform come in.
+        """
+
+        self.extensions = extensions
+        self.cores = cores
+        self.default_core = default_core
+        self.default_runner = default_runner
+        self.runners = runners
+
+    def __repr__(self):
+        return "PlatformData(runners={!r}, default_runner={!r}, cores={!r}, default_core={!r}, extensions={!r})".format(
+            self.runners, self.default_runner, self.cores, self.default_core, self.extensions)
+
+    def validate(self):
+        """Ensure no foul play with the platform data.
+
+        Args:
+            self: The current class instance. Used to reference the attributes of the class.
 
         Raises:
             MissingRequiredDataError: If the required arguments - runners and default_runner - aren't specified, or if a dependency argument - cores for default_core - isn't specified.
             DefaultValueNotInListOfValuesError: If a supplied default value - default_runner or default_core - cannot find its entry in its respective list of values - runners or cores respectively.
             ExpectedValueMissingInListOfValuesError: If a certain argument - cores - is supplied to the init function, but a specific value - "libretro" - in a list of values - runners - is missing.
             MisconfiguredDefaultsError: If default values are supplied - default_core and default_runner - but one of the arguments for the default value is incorrect for the other default value - a default_core is specified, but the default_runner is not libretro.
+            InvalidDataError: If one or more of the values have the wrong type or are empty.
         """
 
+        runners, default_runner = self.runners, self.default_runner
+        cores, default_core = self.cores, self.default_core
+
         # missing runners or default_runner
         if runners == None or default_runner == None: 
             raise MissingRequiredDataError('{} cannot be a None value and are required'.format(
@@ -121,6 +155,17 @@ class PlatformData():
             else:
                 if len(default_core.replace(" ", "")) == 0: invalidations.append("The default_core string mustn't be empty")
 
+        # extensions invalidations:
+        # 1. isn't a list
+        # 2. contains something other than a lowercase extension without the dot
+        extensions = self.extensions
+        if extensions != None:
+            if type(extensions) != list: invalidations.append("The extensions input must be a list")
+            else:
+                for extension in extensions:
+                    if type(extension) != str or not extension or extension != extension.lower() or '.' in extension or ' ' in extension:
+                        invalidations.append("The extension {!r} must be a lowercase string without a dot".format(extension))
+
         # print all invalidations if any
         if len(invalidations) > 0:
             raise InvalidDataError("""One or multiple basic validation failures have occoured with the constructor inputs:
@@ -129,7 +174,146 @@ class PlatformData():
                 '\n\t\t'.join(invalidations)
             ))
 
-        self.cores = cores
-        self.default_core = default_core
-        self.default_runner = default_runner
-        self.runners = runners
\ No newline at end of file
+class PlatformRegistry(Mapping):
+    """A read-only dictionary of platform names to `PlatformData`, which only builds the platforms that are actually looked up.
+
+    Note:
+        Only the plain specs of the platforms are kept until a platform is looked up, so importing the constants doesn't build every platform on every start of the script. Looking up a platform builds its `PlatformData` once and keeps it for the next time.
+        Listing the platform names, like for `--help` or the `choices` of argparse, doesn't build any of them.
+
+    Attributes:
+        specs: Dictionary of platform name to the keyword arguments of its `PlatformData`.
+    """
+    specs: dict[str, dict]
+
+    def __init__(self, specs: dict[str, dict]):
+        """Initialize the registry.
+
+        Args:
+            specs: Dictionary of platform name to the keyword arguments of its `PlatformData`.
+        """
+
+        self.specs = specs
+        self._platforms = {}
+        self._extensions = None
+
+    def __getitem__(self, name: str):
+        platform = self._platforms.get(name)
+        if platform is None:
+            platform = self._platforms[name] = PlatformData(**self.specs[name])
+        return platform
+
+    def __contains__(self, name):
+        return name in self.specs
+
+    def __iter__(self):
+        return iter(self.specs)
+
+    def __len__(self):
+        return len(self.specs)
+
+    def extension_index(self):
+        """The reverse index of file extension to the platforms using it.
+
+        Note:
+            Built from the specs on the first call, without building any of the platforms, and kept for later calls.
+
+        Returns:
+            A dictionary of extension (lowercase, without the dot) to a tuple of platform names, in the order of the registry.
+        """
+
+        if self._extensions is None:
+            index = {}
+            for name, spec in self.specs.items():
+                for extension in spec.get('extensions') or []:
+                    index.setdefault(extension, []).append(name)
+            self._extensions = {extension: tuple(names) for extension, names in index.items()}
+        return self._extensions
+
+    def validate(self):
+        """Builds and validates every platform in the registry.
+
+        Returns:
+            A dictionary of platform name to the error it failed validation with, empty if all of them are fine.
+        """
+
+        errors = {}
+        for name in self.specs:
+            try:
+                self[name].validate()
+            except (TypeError, ValueError) as err:
+                errors[name] = err
+        return errors
+
+
+class ImportJob():
+    """A directory to import, together with everything needed to import its games: the platform, runner, core and the scan and naming options.
+
+    Note:
+        A plain run of the script is a single job built from the command line arguments. A library file (`--library`) makes one job per entry, and all of them are imported in the same run, sharing the database connection, the writer and the duplicate index.
+
+    Attributes:
+        platform: The platform name, a key of the PLATFORMS dictionary, or `constants.AUTO_PLATFORM` to detect the platform of every file.
+        directory: The directory to scan for games.
+        runner: The Lutris runner to use. With auto detection, the runner to use for the platforms that have it, if any.
+        core: The libretro core to use, if the runner is libretro. With auto detection, the core to use for the platforms that have it, if any.
+        file_types: File extensions to scan for.
+        game_options: Additional options written under the "game" key of the YML files.
+        strip_filename: Strings to strip from the file names when generating game names.
+        max_depth: How many levels of subdirectories to scan, None for no limit.
+        include: Glob patterns a file has to match to be included.
+        exclude: Glob patterns for files and directories to skip.
+    """
+    __slots__ = ('platform', 'directory', 'runner', 'core', 'file_types', 'game_options',
+                 'strip_filename', 'max_depth', 'include', 'exclude')
+
+    def __init__(
+            self,
+            platform: str, directory: str, runner: str | None, core: str | None = None,
+            file_types: list[str] | None = None, game_options: dict | None = None, strip_filename: list[str] | None = None,
+            max_depth: int | None = 0, include: list[str] | None = None, exclude: list[str] | None = None
+    ):
+        self.platform = platform
+        self.directory = directory
+        self.runner = runner
+        self.core = core
+        self.file_types = file_types or []
+        self.game_options = game_options
+        self.strip_filename = strip_filename or []
+        self.max_depth = max_depth
+        self.include = include or []
+        self.exclude = exclude or []
+
+
+class GameRecord():
+    """Everything known about a single game on its way through the import pipeline, before it gets its id and is written out.
+
+    Attributes:
+        job: The `ImportJob` the file was found by.
+        platform: The platform of the game, the one of the job unless it was detected.
+        runner: The Lutris runner of the game.
+        file: Path of the ROM file.
+        digests: Dictionary of hash algorithm name to hex digest, or None if the file wasn't hashed. For an archive, the digests of the ROM inside.
+        size: The size of the ROM in bytes if it's known, for an archive the size of the ROM inside.
+        name: The generated game name.
+        slug: The generated game slug.
+        existing: The matching game already in the Lutris database (a `database.GameRow`), or None.
+        installed_at: Unix timestamp of the moment the game was prepared.
+        config_file: Name of the YML config file, without the extension.
+        config: The contents of the YML config file.
+    """
+    __slots__ = ('job', 'platform', 'runner', 'file', 'digests', 'size', 'name', 'slug', 'existing', 'installed_at', 'config_file', 'config')
+
+    def __init__(self, job: ImportJob, platform: str, runner: str, file: str, digests: dict | None, size: int | None, name: str, slug: str, existing, installed_at: int, config_file: str, config: str):
+        self.job = job
+        self.platform = platform
+        self.runner = runner
+        self.file = file
+        self.digests = digests
+        self.size = size
+        self.name = name
+        self.slug = slug
+        self.existing = existing
+        self.installed_at = installed_at
+        self.config_file = config_file
+        self.config = config
@@ -0,0 +1,297 @@
+import os
+import re
+import tempfile
+from concurrent.futures import ThreadPoolExecutor, Future
+
+import yaml
+
+from lutris_bulk_adder.constants import DEFAULT_CONFIG_WORKERS
+
+# The default line width of PyYAML's emitter. Plain scalars with spaces
+# in them are folded onto the next line past this column
+YAML_WIDTH = 80
+
+# Characters that are always emitted as they are in a plain scalar.
+# Anything else (quotes, colons, hashes, non-ASCII, ...) makes PyYAML
+# consider quoting, so those values are left to the real emitter
+_PLAIN_RE = re.compile(r"[A-Za-z0-9_./(][A-Za-z0-9 _./+(),!&'\[\]-]*")
+_STR_TAG = 'tag:yaml.org,2002:str'
+_resolver = yaml.resolver.Resolver()
+
+# The temporary files of the ConfigWriter, named after the final file
+# and the process writing it, like .snes-super-mario-world-1700000000.yml.1234.k2j5_x9q.tmp
+_TEMP_RE = re.compile(r"\..+\.yml\.(\d+)\.[^.]+\.tmp")
+
+# the permissions new files get, read once
+# because os.umask can only be read by setting it
+_UMASK = os.umask(0)
+os.umask(_UMASK)
+
+
+def dump_config(config: dict):
+    """Serializes a game config with `yaml.dump(config, default_flow_style=False)`, the way the configs have always been written.
+
+    Note:
+        libyaml's emitter would be faster, but it folds long double-quoted scalars (like paths with non-ASCII characters) at a different spot than the pure Python one, so its output loads to the same config, but isn't byte for byte the same. Only the values the template can't write verbatim end up here, so the speed hardly matters.
+
+    Args:
+        config: The config dictionary.
+
+    Returns:
+        The YAML document as a string.
+    """
+
+    return yaml.dump(config, default_flow_style=False)
+
+
+def plain_scalar(value, column: int = 0):
+    """Checks whether a value is emitted by PyYAML as a plain (unquoted) scalar exactly as it is.
+
+    Note:
+        This is deliberately conservative. It only accepts strings made of characters that never need quoting, which don't look like another type to the YAML resolver (like `1`, `yes` or `null`), and which won't be folded over the line width. Everything else is reported as unsafe, even if PyYAML might still emit it plain.
+
+    Args:
+        value: The value to check.
+        column (optional): The column the value starts at in the document, for the line width check.
+
+    Returns:
+        True if the value can be written into the document verbatim.
+    """
+
+    if type(value) != str or not _PLAIN_RE.fullmatch(value) or value.endswith(' '):
+        return False
+    if ' ' in value and column + len(value) > YAML_WIDTH:
+        return False
+    return _resolver.resolve(yaml.ScalarNode, value, (True, False)) == _STR_TAG
+
+
+def _running(pid: int):
+    """Whether a process with the given id is running."""
+
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        # there is one, it just isn't ours
+        return True
+    return True
+
+
+def sweep_temp_files(directory: str):
+    """Deletes the temporary files a `ConfigWriter` left behind in a directory, when the import writing them died before moving them into place.
+
+    Note:
+        Only the temporary files of processes that aren't running anymore are deleted, so an import running at the same time keeps its own.
+
+    Args:
+        directory: The directory the config files are written to.
+
+    Returns:
+        The number of files deleted.
+    """
+
+    removed = 0
+    try:
+        with os.scandir(directory) as it:
+            for entry in it:
+                match = _TEMP_RE.fullmatch(entry.name)
+                if not match or int(match.group(1)) == os.getpid() or _running(int(match.group(1))):
+                    continue
+                try:
+                    os.unlink(entry.path)
+                except FileNotFoundError:
+                    continue
+                removed += 1
+    except FileNotFoundError:
+        pass
+    return removed
+
+
+class ConfigTemplate():
+    """A precompiled game config, where only the main file changes from game to game.
+
+    Note:
+        Every config written during an import has the same `game: {main_file, core, ...}` shape, and only `main_file` differs. The rest of the document is rendered by the YAML emitter once when the template is created, so writing a config is just slotting the path into the template.
+        If the path needs quoting or escaping, the whole config is handed to the YAML emitter instead, so the output is always exactly what `yaml.dump` would produce.
+
+    Attributes:
+        options: The options written under the "game" key next to `main_file`.
+    """
+    options: dict
+
+    def __init__(self, options: dict | None = None):
+        """Compile the template.
+
+        Args:
+            options (optional): The options written under the "game" key next to `main_file`, like the libretro core and the `--game-options`.
+        """
+
+        self.options = dict(options or {})
+
+        # every option line is rendered by the real emitter once,
+        # the lines don't depend on each other, so they can be
+        # glued back together around main_file later. The emitter
+        # sorts the keys, so main_file goes between the options
+        # that sort before and after it
+        self._prefix = None
+        self._suffix = None
+        if 'main_file' not in self.options and all(type(key) == str for key in self.options):
+            lines = {key: dump_config({"game": {key: value}})[len("game:\n"):] for key, value in self.options.items()}
+            keys = sorted(lines)
+            self._prefix = "game:\n" + ''.join(lines[key] for key in keys if key < 'main_file')
+            self._suffix = ''.join(lines[key] for key in keys if key > 'main_file')
+
+    def config(self, main_file: str):
+        """Builds the config dictionary for a game.
+
+        Args:
+            main_file: Path of the ROM file.
+
+        Returns:
+            The config dictionary.
+        """
+
+        game = {"main_file": main_file}
+        game.update(self.options)
+        return {"game": game}
+
+    def render(self, main_file: str):
+        """Renders the YAML config for a game.
+
+        Args:
+            main_file: Path of the ROM file.
+
+        Returns:
+            The YAML document as a string, identical to `yaml.dump(config, default_flow_style=False)`.
+        """
+
+        if self._prefix is not None and plain_scalar(main_file, len("  main_file: ")):
+            return "{prefix}  main_file: {main_file}\n{suffix}".format(
+                prefix = self._prefix, main_file = main_file, suffix = self._suffix)
+        return dump_config(self.config(main_file))
+
+
+class ConfigWriter():
+    """Writes YML config files from a pool of threads, each one atomically through a temporary file and `os.replace`.
+
+    Note:
+        Writing a config is split into two steps. `stage` writes the contents into a hidden temporary file next to the final one, in the background. `commit` then renames the temporary files into place, which is atomic, so a crash never leaves a half written config behind.
+        The temporary files of an import that crashed are left over though, they carry the id of the process, so `sweep_temp_files` can tell them apart from the ones of an import that's still running.
+        The `GameWriter` only commits the configs of a batch after the database transaction of that batch went through, so every config file in the Lutris directory has its row in the database.
+
+    Attributes:
+        workers: The number of threads writing files.
+        files_written: The number of config files committed so far.
+        bytes_written: The number of bytes in the committed config files.
+    """
+    workers: int
+    files_written: int = 0
+    bytes_written: int = 0
+
+    def __init__(self, workers: int = DEFAULT_CONFIG_WORKERS):
+        """Start the thread pool of the writer.
+
+        Args:
+            workers (optional): The number of threads writing files. Default 8.
+
+        Raises:
+            ValueError: If the number of workers is smaller than 1.
+        """
+
+        if workers < 1:
+            raise ValueError("The number of config workers must be at least 1, got {}".format(workers))
+
+        self.workers = workers
+        self.files_written = 0
+        self.bytes_written = 0
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='config')
+
+    @staticmethod
+    def _write_temp(path: str, text: str):
+        """Writes the contents of a config into a temporary file in the directory of the final file.
+
+        Returns:
+            A tuple of the temporary path, the final path and the number of bytes written.
+        """
+
+        directory, name = os.path.split(path)
+        fd, temp_path = tempfile.mkstemp(prefix='.{}.{}.'.format(name, os.getpid()), suffix='.tmp', dir=directory or None)
+        try:
+            with os.fdopen(fd, 'w') as f:
+                f.write(text)
+            # mkstemp creates the file as 0600, the way open()
+            # would have created it is what Lutris is used to
+            os.chmod(temp_path, 0o666 & ~_UMASK)
+        except BaseException:
+            os.unlink(temp_path)
+            raise
+        return temp_path, path, len(text.encode())
+
+    def stage(self, path: str, text: str):
+        """Starts writing a config into its temporary file in the background.
+
+        Args:
+            path: The final path of the config file.
+            text: The contents of the config.
+
+        Returns:
+            A future to pass to `commit` or `discard`.
+        """
+
+        return self._executor.submit(self._write_temp, path, text)
+
+    def commit(self, staged: list[Future]):
+        """Waits for staged configs to be written, and moves them into place.
+
+        Args:
+            staged: Futures returned by `stage`.
+
+        Raises:
+            OSError: If a config couldn't be written or moved into place. The remaining temporary files are still moved into place.
+        """
+
+        error = None
+        for future in staged:
+            try:
+                temp_path, path, size = future.result()
+                os.replace(temp_path, path)
+            except OSError as err:
+                error = error or err
+                continue
+            self.files_written += 1
+            self.bytes_written += size
+        if error:
+            raise error
+
+    def discard(self, staged: list[Future]):
+        """Waits for staged configs to be written, and deletes their temporary files again.
+
+        Args:
+            staged: Futures returned by `stage`.
+        """
+
+        for future in staged:
+            try:
+                temp_path, _, _ = future.result()
+                os.unlink(temp_path)
+            except OSError:
+                pass
+
+    def wait(self, staged: list[Future]):
+        """Waits for staged configs to be written into their temporary files.
+
+        Args:
+            staged: Futures returned by `stage`.
+
+        Raises:
+            OSError: If a config couldn't be written.
+        """
+
+        for future in staged:
+            future.result()
+
+    def close(self):
+        """Shuts down the thread pool."""
+
+        self._executor.shutdown(wait=True)
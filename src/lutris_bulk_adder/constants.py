@@ -1,6 +1,8 @@
-from lutris_bulk_adder.classes import PlatformData
+from lutris_bulk_adder.classes import PlatformRegistry
 
-# I plan to put this into the platforms dict for each platform
+# the default for -f when importing a single platform. Every platform
+# also has its own list of extensions, used by -p auto to tell which
+# platform a file belongs to
 
 DEFAULT_ROM_FILE_EXTS = ['iso', 'zip', 'sfc', 'gba', 'gbc', 'gb', 'md', 'n64',
                          'nes', '32x', 'gg', 'sms', 'bin', 'chd']
@@ -13,8 +15,46 @@ KEY_ERR_MSG = """Error trying to {} platform {}; did you make a typo perhaps?
 Also note that Python is case-sensitive with dictionaries, so you must ensure proper case format in your input platform's name.
         For example, instead of 'sega genesis' try 'Sega Genesis'."""
         
+# Archive formats whose table of contents can be read without extracting anything.
+# 7z isn't one of them: its header is usually LZMA compressed itself, and
+# reading it means pulling in a decoder, so .7z files are treated like any other file
+ARCHIVE_EXTENSIONS = ['zip']
+
+# The platform name that makes the script detect the platform of every file,
+# by its extension and, where that's ambiguous, by its header
+AUTO_PLATFORM = 'auto'
+
 ARG_ERR_MSG = "Error trying to find the specified {selection} {arg} in the platform's list of {selection} known by the script; did you make a typo perhaps?"
 
+# Defaults and choices of the command line arguments. They live here
+# and not in the modules using them, so that building the argument parser
+# (and answering --help or -i) doesn't import SQLite, PyYAML or the
+# multiprocessing machinery
+
+# scanning
+DEFAULT_SCAN_WORKERS = 8
+
+# The side database lives right next to the Lutris database by default,
+# so it follows the Lutris data around if that is moved somewhere else
+DEFAULT_MANIFEST_NAME = 'lutris-bulk-adder.db'
+
+# hashing
+HASH_ALGORITHMS = ['crc32', 'md5', 'sha1']
+
+# the import pipeline
+DEFAULT_PREPARE_WORKERS = 2
+DEFAULT_QUEUE_SIZE = 256
+
+# writing
+DEFAULT_CONFIG_WORKERS = 8
+DEFAULT_BATCH_SIZE = 500
+DEFAULT_BUSY_TIMEOUT = 30.0
+JOURNAL_MODES = ['DELETE', 'TRUNCATE', 'PERSIST', 'MEMORY', 'WAL', 'OFF']
+SYNCHRONOUS_MODES = ['OFF', 'NORMAL', 'FULL', 'EXTRA']
+
+# What to do with a game that is already in the Lutris database
+DUPLICATE_ACTIONS = ['skip', 'update', 'force']
+
 # note from Hunter:
 # this is in no way an exhaustive list
 # or dictionary as it has become
@@ -40,26 +80,32 @@ ARG_ERR_MSG = "Error trying to find the specified {selection} {arg} in the platf
 #   just pick the standalone one obviously
 # - if it's very specific, like scummvm, even if
 #   there is a retroarch core, just use the standalone anyway
-PLATFORMS = {
-    '3DO': PlatformData(
+
+# these are the keyword arguments of PlatformData,
+# the registry only builds the platforms that are looked up
+PLATFORM_SPECS = {
+    '3DO': dict(
 		runners=['libretro'], 
 		default_runner='libretro', 
 		cores=['opera'], 
-		default_core='opera'
+		default_core='opera', 
+		extensions=['iso', 'bin', 'chd']
     ),
-    'Amstrad CPC': PlatformData(
+    'Amstrad CPC': dict(
 		runners=['libretro'], 
 		default_runner='libretro', 
 		cores=['cap32', 'crocods'], 
-		default_core='cap32'
+		default_core='cap32', 
+		extensions=['dsk', 'cdt']
     ),
-    'Amstrad GX4000': PlatformData(
+    'Amstrad GX4000': dict(
 		runners=['libretro'], 
 		default_runner='libretro', 
 		cores=['cap32'], 
-		default_core='cap32'
+		default_core='cap32', 
+		extensions=['cpr']
     ),
-    'Arcade': PlatformData(
+    'Arcade': dict(
 		runners=['mame', 'libretro'], 
 		default_runner='libretro', 
 		cores=[
@@ -72,448 +118,476 @@ PLATFORMS = {
         ], 
 		default_core='mame'
     ),
-    'Arduboy': PlatformData(
+    'Arduboy': dict(
 		runners=['libretro'], 
 		default_runner='libretro', 
 		cores=['ardens', 'arduous'], 
-		default_core='ardens'
+		default_core='ardens', 
+		extensions=['arduboy']
     ),
-    'Atari 2600': PlatformData(
+    'Atari 2600': dict(
 		runners=['libretro', 'stella'], 
 		default_runner='libretro', 
 		cores=['stella', 'stella2014', 'stella2023'], 
-		default_core='stella'
+		default_core='stella', 
+		extensions=['a26', 'bin']
     ),
-    'Atari 5200': PlatformData(
+    'Atari 5200': dict(
 		runners=['libretro', 'a5200'], 
 		default_runner='libretro', 
 		cores=['atari800', 'a5200'], 
-		default_core='atari800'
+		default_core='atari800', 
+		extensions=['a52']
     ),
-    'Atari 7800': PlatformData(
+    'Atari 7800': dict(
 		runners=['libretro'], 
 		default_runner='libretro', 
 		cores=['prosystem'], 
-		default_core='prosystem'
+		default_core='prosystem', 
+		extensions=['a78']
     ),
-    'Atari 400': PlatformData(
+    'Atari 400': dict(
 		runners=['libretro'], 
 		default_runner='libretro', 
 		cores=['atari800'], 
 		default_core='atari800'
     ),
-    'Atari 800': PlatformData(
+    'Atari 800': dict(
 		runners=['libretro'], 
 		default_runner='libretro', 
 		cores=['atari800'], 
 		default_core='atari800'
     ),
-    'Atari 600XL': PlatformData(
+    'Atari 600XL': dict(
 		runners=['libretro'], 
 		default_runner='libretro', 
 		cores=['atari800'], 
 		default_core='atari800'
     ),
-    'Atari 800XL': PlatformData(
+    'Atari 800XL': dict(
 		runners=['libretro'], 
 		default_runner='libretro', 
 		cores=['atari800'], 
 		default_core='atari800'
     ),
-    'Atari 130XE': PlatformData(
+    'Atari 130XE': dict(
 		runners=['libretro'], 
 		default_runner='libretro', 
 		cores=['atari800'], 
 		default_core='atari800'
     ),
-    'Atari Jaguar': PlatformData(
+    'Atari Jaguar': dict(
 		runners=['libretro', 'virtualjaguar'], 
 		default_runner='libretro', 
 		cores=['virtualjaguar'], 
-		default_core='virtualjaguar'
+		default_core='virtualjaguar', 
+		extensions=['j64', 'jag']
     ),
-    'Atari Lynx': PlatformData(
+    'Atari Lynx': dict(
 		runners=['libretro', 'mednafen'], 
 		default_runner='libretro', 
 		cores=['handy', 'holani', 'mednafen_lynx'], 
-		default_core='mednafen_lynx'
+		default_core='mednafen_lynx', 
+		extensions=['lnx']
     ),
-    'Atari ST': PlatformData(
+    'Atari ST': dict(
 		runners=['libretro', 'hatari'], 
 		default_runner='libretro', 
 		cores=['hatari'], 
-		default_core='hatari'
+		default_core='hatari', 
+		extensions=['st', 'stx', 'msa']
     ),
-    'Atari STE': PlatformData(
+    'Atari STE': dict(
 		runners=['libretro', 'hatari'], 
 		default_runner='libretro', 
 		cores=['hatari'], 
 		default_core='hatari'
     ),
-    'Atari TT': PlatformData(
+    'Atari TT': dict(
 		runners=['libretro'], 
 		default_runner='libretro', 
 		cores=['hatari'], 
 		default_core='hatari'
     ),
-    'Atari Falcon': PlatformData(
+    'Atari Falcon': dict(
 		runners=['libretro'], 
 		default_runner='libretro', 
 		cores=['hatari'], 
 		default_core='hatari'
     ),
-    'Bandai WonderSwan': PlatformData(
+    'Bandai WonderSwan': dict(
 		runners=['libretro'], 
 		default_runner='libretro', 
 		cores=['mednafen_wswan'], 
-		default_core='mednafen_wswan'
+		default_core='mednafen_wswan', 
+		extensions=['ws']
     ),
-    'Bandai WonderSwan Color': PlatformData(
+    'Bandai WonderSwan Color': dict(
 		runners=['libretro'], 
 		default_runner='libretro', 
 		cores=['mednafen_wswan'], 
-		default_core='mednafen_wswan'
+		default_core='mednafen_wswan', 
+		extensions=['wsc']
     ),
-    'Capcom CPS-1': PlatformData(
+    'Capcom CPS-1': dict(
 		runners=['libretro'], 
 		default_runner='libretro', 
 		cores=['fbalpha2012_cps1', 'fbneo_cps12'], 
 		default_core='fbneo_cps12'
     ),
-    'Capcom CPS-2': PlatformData(
+    'Capcom CPS-2': dict(
 		runners=['libretro'], 
 		default_runner='libretro', 
 		cores=['fbalpha2012_cps2', 'fbneo_cps12'], 
 		default_core='fbneo_cps12'
     ),
-    'Capcom CPS-3': PlatformData(
+    'Capcom CPS-3': dict(
 		runners=['libretro'], 
 		default_runner='libretro', 
 		cores=['fbalpha2012_cps3'], 
 		default_core='fbalpha2012_cps3'
     ),
-    'ChaiLove': PlatformData(
+    'ChaiLove': dict(
 		runners=['libretro'], 
 		default_runner='libretro', 
 		cores=['chailove'], 
 		default_core='chailove'
     ),
-    'CHIP-8': PlatformData(
+    'CHIP-8': dict(
 		runners=['libretro'], 
 		default_runner='libretro', 
 		cores=['jaxe'], 
 		default_core='jaxe'
     ),
-    'ColecoVision': PlatformData(
+    'ColecoVision': dict(
 		runners=['libretro', 'colem'], 
 		default_runner='libretro', 
 		cores=['gearcoleco', 'jollycv'], 
-		default_core='jollycv'
+		default_core='jollycv', 
+		extensions=['col']
     ),
-    'CreatiVision': PlatformData(
+    'CreatiVision': dict(
 		runners=['libretro'], 
 		default_runner='libretro', 
 		cores=['jollycv'], 
 		default_core='jollycv'
     ),
-    'MyVision': PlatformData(
+    'MyVision': dict(
 		runners=['libretro'], 
 		default_runner='libretro', 
 		cores=['jollycv'], 
 		default_core='jollycv'
     ),
-    'Commodore Amiga': PlatformData(
+    'Commodore Amiga': dict(
 		runners=['libretro', 'fsuae'], 
 		default_runner='libretro', 
 		cores=['puae', 'puae2021'], 
-		default_core='puae'
+		default_core='puae', 
+		extensions=['adf', 'ipf']
     ),
-    'Commodore 128': PlatformData(
+    'Commodore 128': dict(
 		runners=['libretro', 'vice'], 
 		default_runner='vice', 
 		cores=['vice_x128'], 
 		default_core=None
     ),
-    'Commodore 16/Plus/4': PlatformData(
+    'Commodore 16/Plus/4': dict(
 		runners=['libretro', 'vice'], 
 		default_runner='vice', 
 		cores=['vice_xplus4'], 
 		default_core=None
     ),
-    'Commodore 64': PlatformData(
+    'Commodore 64': dict(
 		runners=['libretro', 'vice'], 
 		default_runner='vice', 
 		cores=['vice_x64', 'vice_x64sc', 'x64sdl'], 
-		default_core=None
+		default_core=None, 
+		extensions=['d64', 't64', 'prg', 'crt']
     ),
-    'Commodore 64 Direct-to-TV': PlatformData(
+    'Commodore 64 Direct-to-TV': dict(
 		runners=['libretro', 'vice'], 
 		default_runner='vice', 
 		cores=['vice_x64dtv'], 
 		default_core=None
     ),
-    'Commodore 64 SuperCPU': PlatformData(
+    'Commodore 64 SuperCPU': dict(
 		runners=['libretro', 'vice'], 
 		default_runner='vice', 
 		cores=['vice_xscpu64'], 
 		default_core=None
     ),
-    'Commodore CBM-II 5x0': PlatformData(
+    'Commodore CBM-II 5x0': dict(
 		runners=['libretro', 'vice'], 
 		default_runner='vice', 
 		cores=['vice_xcbm5x0'], 
 		default_core=None
     ),
-    'Commodore CBM-II 6x0': PlatformData(
+    'Commodore CBM-II 6x0': dict(
 		runners=['libretro', 'vice'], 
 		default_runner='vice', 
 		cores=['vice_xcbm2'], 
 		default_core=None
     ),
-    'Commodore PET': PlatformData(
+    'Commodore PET': dict(
 		runners=['libretro', 'vice'], 
 		default_runner='vice', 
 		cores=['vice_xpet'], 
 		default_core=None
     ),
-    'Commodore VIC-20': PlatformData(
+    'Commodore VIC-20': dict(
 		runners=['libretro', 'vice'], 
 		default_runner='vice', 
 		cores=['vice_xvic'], 
 		default_core=None
     ),
-    'Elektronika BK-0010': PlatformData(
+    'Elektronika BK-0010': dict(
 		runners=['libretro'], 
 		default_runner='libretro', 
 		cores=['bk'], 
 		default_core='bk'
     ),
-    'Elektronika BK-0010.01': PlatformData(
+    'Elektronika BK-0010.01': dict(
 		runners=['libretro'], 
 		default_runner='libretro', 
 		cores=['bk'], 
 		default_core='bk'
     ),
-    'Elektronika BK-0011 (M)': PlatformData(
+    'Elektronika BK-0011 (M)': dict(
 		runners=['libretro'], 
 		default_runner='libretro', 
 		cores=['bk'], 
 		default_core='bk'
     ),
-    'Enterprise 64': PlatformData(
+    'Enterprise 64': dict(
 		runners=['libretro'], 
 		default_runner='libretro', 
 		cores=['ep128emu'], 
 		default_core='ep128emu'
     ),
-    'Enterprise 128': PlatformData(
+    'Enterprise 128': dict(
 		runners=['libretro'], 
 		default_runner='libretro', 
 		cores=['ep128emu'], 
 		default_core='ep128emu'
     ),
-    'Fairchild Channel F': PlatformData(
+    'Fairchild Channel F': dict(
 		runners=['libretro'], 
 		default_runner='libretro', 
 		cores=['freechaf'], 
-		default_core='freechaf'
+		default_core='freechaf', 
+		extensions=['chf']
     ),
-    'GAM4980': PlatformData(
+    'GAM4980': dict(
 		runners=['libretro'], 
 		default_runner='libretro', 
 		cores=['gam4980'], 
 		default_core='gam4980'
     ),
-    'GCE Vectrex': PlatformData(
+    'GCE Vectrex': dict(
 		runners=['libretro'], 
 		default_runner='libretro', 
 		cores=['vecx'], 
-		default_core='vecx'
+		default_core='vecx', 
+		extensions=['vec']
     ),
-    'Infocom Z-Machine': PlatformData(
+    'Infocom Z-Machine': dict(
 		runners=['libretro', 'frotz'], 
 		default_runner='libretro', 
 		cores=['mojozork'], 
 		default_core='mojozork'
     ),
-    'Java ME': PlatformData(
+    'Java ME': dict(
 		runners=['libretro'], 
 		default_runner='libretro', 
 		cores=['squirreljme'], 
 		default_core='squirreljme'
     ),
-    'Magnavox Odyssey 2': PlatformData(
+    'Magnavox Odyssey 2': dict(
 		runners=['libretro', 'o2em'], 
 		default_runner='libretro', 
 		cores=['o2em'], 
 		default_core='o2em'
     ),
-    'Philips Videopac+': PlatformData(
+    'Philips Videopac+': dict(
 		runners=['libretro', 'o2em'], 
 		default_runner='libretro', 
 		cores=['o2em'], 
 		default_core='o2em'
     ),
-    'Mattel Intellivision': PlatformData(
+    'Mattel Intellivision': dict(
 		runners=['libretro', 'jzintv'], 
 		default_runner='libretro', 
 		cores=['freeintv'], 
-		default_core='freeintv'
+		default_core='freeintv', 
+		extensions=['int']
     ),
-    'Mega Duck': PlatformData(
+    'Mega Duck': dict(
 		runners=['libretro'], 
 		default_runner='libretro', 
 		cores=['sameduck'], 
 		default_core='sameduck'
     ),
-    'Cougar Boy': PlatformData(
+    'Cougar Boy': dict(
 		runners=['libretro'], 
 		default_runner='libretro', 
 		cores=['sameduck'], 
 		default_core='sameduck'
     ),
-    'MS-DOS': PlatformData(
+    'MS-DOS': dict(
 		runners=['libretro', 'dosbox', '86box', 'pcem'], 
 		default_runner='libretro', 
 		cores=['dosbox_core', 'dosbox_pure', 'dosbox_svn', 'virtualxt'], 
 		default_core='dosbox_core'
     ),
-    'Microsoft MSX': PlatformData(
+    'Microsoft MSX': dict(
 		runners=['libretro', 'openmsx'], 
 		default_runner='libretro', 
 		cores=['fmsx'], 
-		default_core='fmsx'
+		default_core='fmsx', 
+		extensions=['mx1']
     ),
-    'Microsoft MSX2': PlatformData(
+    'Microsoft MSX2': dict(
 		runners=['libretro', 'openmsx'], 
 		default_runner='libretro', 
 		cores=['fmsx'], 
-		default_core='fmsx'
+		default_core='fmsx', 
+		extensions=['mx2']
     ),
-    'Microsoft MSX2+': PlatformData(
+    'Microsoft MSX2+': dict(
 		runners=['libretro', 'openmsx'], 
 		default_runner='libretro', 
 		cores=['fmsx'], 
 		default_core='fmsx'
     ),
-    'Microsoft XBOX': PlatformData(
+    'Microsoft XBOX': dict(
 		runners=['xemu'], 
 		default_runner='xemu', 
 		cores=None, 
 		default_core=None
     ),
-    'NEC PC Engine': PlatformData(
+    'NEC PC Engine': dict(
 		runners=['libretro', 'mednafen'], 
 		default_runner='libretro', 
 		cores=['geargrafx', 'mednafen_pce', 'mednafen_pce_fast'], 
-		default_core='mednafen_pce'
+		default_core='mednafen_pce', 
+		extensions=['pce']
     ),
-    'NEC PC Engine CD': PlatformData(
+    'NEC PC Engine CD': dict(
 		runners=['libretro', 'mednafen'], 
 		default_runner='libretro', 
 		cores=['geargrafx', 'mednafen_pce', 'mednafen_pce_fast'], 
 		default_core='mednafen_pce'
     ),
-    'NEC PC Engine SuperGrafx': PlatformData(
+    'NEC PC Engine SuperGrafx': dict(
 		runners=['libretro', 'mednafen'], 
 		default_runner='libretro', 
 		cores=['geargrafx', 'mednafen_pce', 'mednafen_supergrafx'], 
-		default_core='mednafen_pce'
+		default_core='mednafen_pce', 
+		extensions=['sgx']
     ),
-    'NEC PC-8000': PlatformData(
+    'NEC PC-8000': dict(
 		runners=['libretro'], 
 		default_runner='libretro', 
 		cores=['quasi88'], 
 		default_core='quasi88'
     ),
-    'NEC PC-8800': PlatformData(
+    'NEC PC-8800': dict(
 		runners=['libretro'], 
 		default_runner='libretro', 
 		cores=['quasi88'], 
 		default_core='quasi88'
     ),
-    'NEC PC-98': PlatformData(
+    'NEC PC-98': dict(
 		runners=['libretro'], 
 		default_runner='libretro', 
 		cores=['nekop2', 'np2kai'], 
 		default_core='nekop2'
     ),
-    'NEC PC-FX': PlatformData(
+    'NEC PC-FX': dict(
 		runners=['libretro', 'mednafen'], 
 		default_runner='libretro', 
 		cores=['mednafen_pcfx'], 
 		default_core='mednafen_pcfx'
     ),
-    'Nintendo 3DS': PlatformData(
+    'Nintendo 3DS': dict(
 		runners=['libretro', 'citra'], 
 		default_runner='libretro', 
 		cores=['citra', 'citra2018'], 
-		default_core='citra'
+		default_core='citra', 
+		extensions=['3ds', 'cia']
     ),
-    'Nintendo 64': PlatformData(
+    'Nintendo 64': dict(
 		runners=['libretro', 'mupen64plus', 'rosaliesmupengui'], 
 		default_runner='libretro', 
 		cores=['mupen64plus-next', 'parallei_n64'], 
-		default_core='parallei_n64'
+		default_core='parallei_n64', 
+		extensions=['n64', 'z64', 'v64']
     ),
-    'Nintendo DS': PlatformData(
+    'Nintendo DS': dict(
 		runners=['libretro', 'melonds', 'desmume'], 
 		default_runner='libretro', 
 		cores=[
             'desmume', 'desmume2015', 'melonds', 
             'melondsds', 'noods', 'skyemu'
         ], 
-		default_core='melonds'
+		default_core='melonds', 
+		extensions=['nds']
     ),
-    'Nintendo Famicom': PlatformData(
+    'Nintendo Famicom': dict(
 		runners=['libretro', 'mednafen'], 
 		default_runner='libretro', 
 		cores=['fceumm', 'mesen', 'nestopia', 'quicknes'], 
 		default_core='mesen'
     ),
-    'Nintendo Game Boy': PlatformData(
+    'Nintendo Game Boy': dict(
 		runners=['libretro'], 
 		default_runner='libretro', 
 		cores=[
             'DoubleCherryGB', 'gambatte', 'gearboy', 
             'mesen-s', 'sameboy', 'skyemu', 'tgbdual'
         ], 
-		default_core='gambatte'
+		default_core='gambatte', 
+		extensions=['gb']
     ),
-    'Nintendo Game Boy Advance': PlatformData(
+    'Nintendo Game Boy Advance': dict(
 		runners=['libretro', 'mednafen', 'mgba'], 
 		default_runner='libretro', 
 		cores=['gpsp', 'mgba', 'skyemu', 'vbam', 'vba_next'], 
-		default_core='mgba'
+		default_core='mgba', 
+		extensions=['gba']
     ),
-    'Nintendo Game Boy Color': PlatformData(
+    'Nintendo Game Boy Color': dict(
 		runners=['libretro'], 
 		default_runner='libretro', 
 		cores=[
             'DoubleCherryGB', 'gambatte', 'gearboy', 
             'mesen-s', 'sameboy', 'skyemu', 'tgbdual'
         ], 
-		default_core='gambatte'
+		default_core='gambatte', 
+		extensions=['gbc']
     ),
-    'Nintendo Gamecube': PlatformData(
+    'Nintendo Gamecube': dict(
 		runners=['libretro', 'dolphin'], 
 		default_runner='libretro', 
 		cores=['dolphin'], 
-		default_core='dolphin'
+		default_core='dolphin', 
+		extensions=['gcm', 'iso', 'gcz', 'rvz', 'ciso']
     ),
-    'Nintendo Pokemon Mini': PlatformData(
+    'Nintendo Pokemon Mini': dict(
 		runners=['libretro'], 
 		default_runner='libretro', 
 		cores=['pokemini'], 
-		default_core='pokemini'
+		default_core='pokemini', 
+		extensions=['min']
     ),
-    'Nintendo NES': PlatformData(
+    'Nintendo NES': dict(
 		runners=['libretro', 'mednafen'], 
 		default_runner='libretro', 
 		cores=['fceumm', 'mesen', 'nestopia', 'quicknes'], 
-		default_core='mesen'
+		default_core='mesen', 
+		extensions=['nes', 'fds', 'unf']
     ),
-    'Nintendo SNES': PlatformData(
+    'Nintendo SNES': dict(
 		runners=['libretro', 'mednafen', 'snes9x'], 
 		default_runner='libretro', 
 		cores=[
@@ -524,9 +598,10 @@ PLATFORMS = {
             'mednafen_supafaust', 'snes9x', 'snes9x2002', 
             'snes9x2005', 'snes9x2005_plus', 'snes9x2010', 'mesen-s'
         ], 
-		default_core='mednafen_supafaust'
+		default_core='mednafen_supafaust', 
+		extensions=['sfc', 'smc']
     ),
-    'Nintendo Super Famicom': PlatformData(
+    'Nintendo Super Famicom': dict(
 		runners=['libretro', 'mednafen'], 
 		default_runner='libretro',
 		cores=[
@@ -539,280 +614,320 @@ PLATFORMS = {
         ], 
 		default_core='mednafen_supafaust'
     ),
-    'Nintendo Switch': PlatformData(
+    'Nintendo Switch': dict(
 		runners=['yuzu', 'ryujinx'], 
 		default_runner='ryujinx', 
 		cores=None, 
-		default_core=None
+		default_core=None, 
+		extensions=['nsp', 'xci']
     ),
-    'Nintendo Virtual Boy': PlatformData(
+    'Nintendo Virtual Boy': dict(
 		runners=['libretro', 'mednafen'], 
 		default_runner='libretro', 
 		cores=['mednafen_vb'], 
-		default_core='mednafen_vb'
+		default_core='mednafen_vb', 
+		extensions=['vb', 'vboy']
     ),
-    'Nintendo Wii': PlatformData(
+    'Nintendo Wii': dict(
 		runners=['libretro', 'dolphin'], 
 		default_runner='libretro', 
 		cores=['dolphin'], 
-		default_core='dolphin'
+		default_core='dolphin', 
+		extensions=['wbfs', 'iso', 'gcz', 'rvz', 'ciso']
     ),
-    'Nintendo Wii U': PlatformData(
+    'Nintendo Wii U': dict(
 		runners=['cemu'], 
 		default_runner='cemu', 
 		cores=None, 
-		default_core=None
+		default_core=None, 
+		extensions=['wud', 'wux', 'wua', 'rpx']
     ),
-    'Philips CDi': PlatformData(
+    'Philips CDi': dict(
 		runners=['libretro'], 
 		default_runner='libretro', 
 		cores=['same_cdi', 'cdi2015'], 
 		default_core='same_cdi'
     ),
-    'Philips P2000T': PlatformData(
+    'Philips P2000T': dict(
 		runners=['libretro'], 
 		default_runner='libretro', 
 		cores=['m2000'], 
 		default_core='m2000'
     ),
-    'PICO-8': PlatformData(
+    'PICO-8': dict(
 		runners=['libretro', 'pico8'], 
 		default_runner='libretro', 
 		cores=['retro8'], 
-		default_core='retro8'
+		default_core='retro8', 
+		extensions=['p8']
     ),
-    'S-CHIP': PlatformData(
+    'S-CHIP': dict(
 		runners=['libretro'], 
 		default_runner='libretro', 
 		cores=['jaxe'], 
 		default_core='jaxe'
     ),
-    'ScummVM': PlatformData(
+    'ScummVM': dict(
 		runners=['libretro', 'scummvm'], 
 		default_runner='scummvm', 
 		cores=['scummvm'], 
-		default_core=None
+		default_core=None, 
+		extensions=['scummvm']
     ),
-    'Sega 32X': PlatformData(
+    'Sega 32X': dict(
 		runners=['libretro'], 
 		default_runner='libretro', 
 		cores=['picodrive'], 
-		default_core='picodrive'
+		default_core='picodrive', 
+		extensions=['32x', 'bin']
 	),
-    'Sega CD': PlatformData(
+    'Sega CD': dict(
 		runners=['libretro'], 
 		default_runner='libretro', 
 		cores=['clownmdemu', 'genesis_plus_gx', 'genesis_plus_gx_wide', 'picodrive'], 
-		default_core='picodrive'
+		default_core='picodrive', 
+		extensions=['iso', 'bin', 'chd']
     ),
-    'Sega Dreamcast': PlatformData(
+    'Sega Dreamcast': dict(
 		runners=['libretro', 'redream', 'reicast'], 
 		default_runner='libretro', 
 		cores=['flycast'], 
-		default_core='flycast'
+		default_core='flycast', 
+		extensions=['gdi', 'cdi', 'chd']
     ),
-    'Sega Game Gear': PlatformData(
+    'Sega Game Gear': dict(
 		runners=['libretro'], 
 		default_runner='libretro', 
 		cores=['smsplus', 'genesis_plus_gx', 'genesis_plus_gx_wide', 'picodrive', 'gearsystem'], 
-		default_core='picodrive'
+		default_core='picodrive', 
+		extensions=['gg']
     ),
-    'Sega Genesis': PlatformData(
+    'Sega Genesis': dict(
 		runners=['libretro', 'dgen'], 
 		default_runner='libretro', 
 		cores=['blastem', 'clownmdemu', 'genesis_plus_gx', 'genesis_plus_gx_wide', 'picodrive'], 
 		default_core='picodrive'
     ),
-    'Sega Mega CD': PlatformData(
+    'Sega Mega CD': dict(
 		runners=['libretro'], 
 		default_runner='libretro', 
 		cores=['clownmdemu', 'genesis_plus_gx', 'genesis_plus_gx_wide', 'picodrive'], 
 		default_core='picodrive'
     ),
-    'Sega Mega Drive': PlatformData(
+    'Sega Mega Drive': dict(
 		runners=['libretro'], 
 		default_runner='libretro', 
 		cores=['blastem', 'clownmdemu', 'genesis_plus_gx', 'genesis_plus_gx_wide', 'picodrive'], 
-		default_core='picodrive'
+		default_core='picodrive', 
+		extensions=['md', 'gen', 'smd', 'bin']
     ),
-    'Sega Master System': PlatformData(
+    'Sega Master System': dict(
 		runners=['libretro', 'osmose'], 
 		default_runner='libretro', 
 		cores=['smsplus', 'genesis_plus_gx', 'genesis_plus_gx_wide', 'picodrive', 'gearsystem'], 
-		default_core='picodrive'
+		default_core='picodrive', 
+		extensions=['sms']
     ),
-    'Sega Naomi': PlatformData(
+    'Sega Naomi': dict(
 		runners=['libretro', 'redream', 'reicast'], 
 		default_runner='libretro', 
 		cores=['flycast'], 
 		default_core='flycast'
     ),
-    'Sega PICO': PlatformData(
+    'Sega PICO': dict(
 		runners=['libretro'], 
 		default_runner='libretro', 
 		cores=['picodrive'], 
 		default_core='picodrive'
     ),
-    'Sega Saturn': PlatformData(
+    'Sega Saturn': dict(
 		runners=['libretro', 'mednafen'], 
 		default_runner='libretro', 
 		cores=['kronos', 'mednafen_saturn', 'yabasanshiro', 'yabause'], 
-		default_core='mednafen_saturn'
+		default_core='mednafen_saturn', 
+		extensions=['iso', 'bin', 'chd']
     ),
-    'Sega SG-1000': PlatformData(
+    'Sega SG-1000': dict(
 		runners=['libretro'], 
 		default_runner='libretro', 
 		cores=['gearsystem'], 
-		default_core='gearsystem'
+		default_core='gearsystem', 
+		extensions=['sg']
     ),
-    'Sega Titan Video': PlatformData(
+    'Sega Titan Video': dict(
 		runners=['libretro'], 
 		default_runner='libretro', 
 		cores=['kronos'], 
 		default_core='kronos'
     ),
-    'Sharp X1': PlatformData(
+    'Sharp X1': dict(
 		runners=['libretro'], 
 		default_runner='libretro', 
 		cores=['x1'], 
 		default_core='x1'
     ),
-    'Sharp X68000': PlatformData(
+    'Sharp X68000': dict(
 		runners=['libretro'], 
 		default_runner='libretro', 
 		cores=['px68k'], 
 		default_core='px68k'
     ),
-    'Sinclair ZX81': PlatformData(
+    'Sinclair ZX81': dict(
 		runners=['libretro'], 
 		default_runner='libretro', 
 		cores=['81'], 
-		default_core='81'
+		default_core='81', 
+		extensions=['p']
     ),
-    'Sinclair ZX Spectrum': PlatformData(
+    'Sinclair ZX Spectrum': dict(
 		runners=['libretro', 'speccy'], 
 		default_runner='libretro', 
 		cores=['fuse'], 
-		default_core='fuse'
+		default_core='fuse', 
+		extensions=['tzx', 'tap', 'z80']
     ),
-    'SNK Neo Geo AES': PlatformData(
+    'SNK Neo Geo AES': dict(
 		runners=['libretro'], 
 		default_runner='libretro', 
 		cores=['fbalpha2012_neogeo', 'fbneo_neogeo'], 
 		default_core='fbneo_neogeo'
     ),
-    'SNK Neo Geo CD': PlatformData(
+    'SNK Neo Geo CD': dict(
 		runners=['libretro'], 
 		default_runner='libretro', 
 		cores=['fbalpha2012_neogeo', 'fbneo_neogeo'], 
 		default_core='fbneo_neogeo'
     ),
-    'SNK Neo Geo MVS': PlatformData(
+    'SNK Neo Geo MVS': dict(
 		runners=['libretro'], 
 		default_runner='libretro', 
 		cores=['fbalpha2012_neogeo', 'fbneo_neogeo'], 
 		default_core='fbneo_neogeo'
     ),
-    'SNK Neo Geo Pocket': PlatformData(
+    'SNK Neo Geo Pocket': dict(
 		runners=['libretro', 'mednafen'], 
 		default_runner='libretro', 
 		cores=['mednafen_ngp', 'race'], 
-		default_core='mednafen_ngp'
+		default_core='mednafen_ngp', 
+		extensions=['ngp']
     ),
-    'SNK Neo Geo Pocket Color': PlatformData(
+    'SNK Neo Geo Pocket Color': dict(
 		runners=['libretro', 'mednafen'], 
 		default_runner='libretro', 
 		cores=['mednafen_ngp', 'race'], 
-		default_core='mednafen_ngp'
+		default_core='mednafen_ngp', 
+		extensions=['ngc']
     ),
-    'Sony PlayStation': PlatformData(
+    'Sony PlayStation': dict(
 		runners=['libretro', 'mednafen', 'duckstation'], 
 		default_runner='libretro', 
 		cores=['mednafen_psx', 'mednafen_psx_hw', 'pcsx_rearmed', 'swanstation'], 
-		default_core='mednafen_psx_hw'
+		default_core='mednafen_psx_hw', 
+		extensions=['iso', 'bin', 'chd', 'pbp']
     ),
-    'Sony PlayStation 2': PlatformData(
+    'Sony PlayStation 2': dict(
 		runners=['libretro', 'pcsx2'], 
 		default_runner='libretro', 
 		cores=['pcsx2'], 
-		default_core='pcsx2'
+		default_core='pcsx2', 
+		extensions=['iso', 'bin', 'chd']
     ),
-    'Sony PlayStation 3': PlatformData(
+    'Sony PlayStation 3': dict(
 		runners=['rpcs3'], 
 		default_runner='rpcs3', 
 		cores=None, 
 		default_core=None
     ),
-    'Sony PlayStation Portable': PlatformData(
+    'Sony PlayStation Portable': dict(
 		runners=['libretro', 'ppsspp'], 
 		default_runner='libretro', 
 		cores=['ppsspp'], 
-		default_core='ppsspp'
+		default_core='ppsspp', 
+		extensions=['iso', 'cso', 'pbp']
     ),
-    'Sony PlayStation Vita': PlatformData(
+    'Sony PlayStation Vita': dict(
 		runners=['vita3k'], 
 		default_runner='vita3k', 
 		cores=None, 
 		default_core=None
     ),
-    'Tamagachi P1': PlatformData(
+    'Tamagachi P1': dict(
 		runners=['libretro'], 
 		default_runner='libretro', 
 		cores=['tamalibretro'], 
 		default_core='tamalibretro'
     ),
-    'Texas Instruments TI-83': PlatformData(
+    'Texas Instruments TI-83': dict(
 		runners=['libretro'], 
 		default_runner='libretro', 
 		cores=['numero'], 
-		default_core='numero'
+		default_core='numero', 
+		extensions=['8xp']
     ),
-    'Thomson MO/TO': PlatformData(
+    'Thomson MO/TO': dict(
 		runners=['libretro'], 
 		default_runner='libretro', 
 		cores=['theodore'], 
 		default_core='theodore'
     ),
-    'TIC-80': PlatformData(
+    'TIC-80': dict(
 		runners=['libretro'], 
 		default_runner='libretro', 
 		cores=['tic80'], 
-		default_core='tic80'
+		default_core='tic80', 
+		extensions=['tic']
     ),
-    'Uzebox': PlatformData(
+    'Uzebox': dict(
 		runners=['libretro'], 
 		default_runner='libretro', 
 		cores=['uzem'], 
-		default_core='uzem'
+		default_core='uzem', 
+		extensions=['uze']
     ),
-    'VaporSpec': PlatformData(
+    'VaporSpec': dict(
 		runners=['libretro'], 
 		default_runner='libretro', 
 		cores=['vaporspec'], 
 		default_core='vaporspec'
     ),
-    'Vircon32': PlatformData(
+    'Vircon32': dict(
 		runners=['libretro'], 
 		default_runner='libretro', 
 		cores=['vircon32'], 
-		default_core='vircon32'
+		default_core='vircon32', 
+		extensions=['v32']
     ),
-    'WASM-4': PlatformData(
+    'WASM-4': dict(
 		runners=['libretro'], 
 		default_runner='libretro', 
 		cores=['wasm4'], 
-		default_core='wasm4'
+		default_core='wasm4', 
+		extensions=['wasm']
     ),
-    'Watara Supervision': PlatformData(
+    'Watara Supervision': dict(
 		runners=['libretro'], 
 		default_runner='libretro', 
 		cores=['potator'], 
-		default_core='potator'
+		default_core='potator', 
+		extensions=['sv']
     ),
-    'XO-CHIP': PlatformData(
+    'XO-CHIP': dict(
 		runners=['libretro'], 
 		default_runner='libretro', 
 		cores=['jaxe'], 
 		default_core='jaxe'
     )
-}
\ No newline at end of file
+}
+
+PLATFORMS = PlatformRegistry(PLATFORM_SPECS)
+
+
+if __name__ == '__main__':
+    # checking every platform is too slow to do on every start,
+    # so the tests do it instead (tests/test_constants.py), and
+    # this checks the list on its own after editing it
+    errors = PLATFORMS.validate()
+    for name, err in errors.items():
+        print("{}: {}".format(name, err))
+    print("{} platforms checked, {} invalid".format(len(PLATFORMS), len(errors)))
+    raise SystemExit(1 if errors else 0)
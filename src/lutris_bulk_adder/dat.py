@@ -0,0 +1,175 @@
+import os
+import sqlite3
+import threading
+import xml.etree.ElementTree as ElementTree
+
+# Digests the index can match on, strongest first
+DAT_HASHES = ['sha1', 'md5', 'crc32']
+
+
+def parse_dat(path: str):
+    """Parses a Logiqx XML DAT file, like the ones from No-Intro, Redump and TOSEC, one game at a time.
+
+    Note:
+        The file is parsed incrementally and every game element is thrown away once it's been read, so even huge DATs don't have to fit into memory as a tree.
+        MAME style DATs, which use `machine` elements instead of `game` elements, are read the same way.
+
+    Args:
+        path: Path to the DAT file.
+
+    Yields:
+        Tuples of (game name, rom name, size, crc32, md5, sha1). Missing values are None, digests are lowercase.
+
+    Raises:
+        xml.etree.ElementTree.ParseError: If the file isn't valid XML.
+    """
+
+    for _, element in ElementTree.iterparse(path, events=('end',)):
+        if element.tag not in ('game', 'machine'):
+            continue
+
+        game = element.get('name')
+        for rom in element.iter('rom'):
+            size = rom.get('size')
+            yield (
+                game, rom.get('name'),
+                int(size) if size and size.isdigit() else None,
+                (rom.get('crc') or '').lower() or None,
+                (rom.get('md5') or '').lower() or None,
+                (rom.get('sha1') or '').lower() or None,
+            )
+        element.clear()
+
+
+class DatIndex():
+    """An on-disk index of the ROMs listed in local DAT files, used to look up the canonical name of a game by its checksums.
+
+    Note:
+        The DATs are parsed once into SQLite tables with indexes on the digests. On later runs only the size and modification time of each DAT is compared, and unchanged DATs aren't read at all, so opening the index is practically instant even for big Redump DATs.
+        Lookups are answered by the indexes on disk, so the ROM list never has to be loaded into memory. The index can be shared between threads.
+
+    Attributes:
+        path: Path to the index database.
+        parsed: Paths of the DATs that had to be (re)parsed while opening the index.
+        hits: Number of successful lookups.
+    """
+    path: str
+    parsed: list[str]
+    hits: int = 0
+
+    def __init__(self, path: str, dats: list[str]):
+        """Open (and if needed create) the index, and bring it up to date with the given DAT files.
+
+        Args:
+            path: Path to the index database.
+            dats: Paths of the DAT files to index. DATs indexed earlier but not listed here are ignored for lookups.
+
+        Raises:
+            sqlite3.Error: If the index can't be opened or isn't a valid index database.
+            OSError: If a DAT file can't be read.
+            xml.etree.ElementTree.ParseError: If a DAT file isn't valid XML.
+        """
+
+        self.path = path
+        self.parsed = []
+        self.hits = 0
+
+        self._lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.executescript("""
+            CREATE TABLE IF NOT EXISTS dats (
+                id INTEGER PRIMARY KEY,
+                path TEXT UNIQUE NOT NULL,
+                size INTEGER NOT NULL,
+                mtime_ns INTEGER NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS dat_roms (
+                dat_id INTEGER NOT NULL,
+                game TEXT NOT NULL,
+                rom TEXT,
+                size INTEGER,
+                crc32 TEXT,
+                md5 TEXT,
+                sha1 TEXT
+            );
+            CREATE INDEX IF NOT EXISTS dat_roms_sha1 ON dat_roms (sha1);
+            CREATE INDEX IF NOT EXISTS dat_roms_md5 ON dat_roms (md5);
+            CREATE INDEX IF NOT EXISTS dat_roms_crc32 ON dat_roms (crc32, size);
+        """)
+
+        self._dat_ids = []
+        for dat in dats:
+            self._dat_ids.append(self._load(os.path.abspath(dat)))
+
+        # lookups are only done against the requested DATs,
+        # the first DAT given wins if several of them match
+        self._queries = {
+            digest: "SELECT game FROM dat_roms WHERE {digest} = ?{size} AND dat_id IN ({ids}) ORDER BY {order} LIMIT 1".format(
+                digest = digest,
+                size = " AND (size = ? OR size IS NULL)" if digest == 'crc32' else "",
+                ids = ','.join(str(dat_id) for dat_id in self._dat_ids),
+                order = "CASE dat_id {} END".format(' '.join(
+                    'WHEN {} THEN {}'.format(dat_id, position) for position, dat_id in enumerate(self._dat_ids)))
+            )
+            for digest in DAT_HASHES
+        }
+
+    def _load(self, dat: str):
+        """Makes sure a DAT file is indexed and up to date, parsing it only if it's new or changed.
+
+        Args:
+            dat: Absolute path of the DAT file.
+
+        Returns:
+            The id of the DAT in the index.
+        """
+
+        stat = os.stat(dat)
+        row = self.conn.execute("SELECT id, size, mtime_ns FROM dats WHERE path = ?", (dat,)).fetchone()
+        if row and row[1:] == (stat.st_size, stat.st_mtime_ns):
+            return row[0]
+
+        with self.conn:
+            if row:
+                dat_id = row[0]
+                self.conn.execute("DELETE FROM dat_roms WHERE dat_id = ?", (dat_id,))
+                self.conn.execute("UPDATE dats SET size = ?, mtime_ns = ? WHERE id = ?", (stat.st_size, stat.st_mtime_ns, dat_id))
+            else:
+                dat_id = self.conn.execute("INSERT INTO dats (path, size, mtime_ns) VALUES (?, ?, ?)", (dat, stat.st_size, stat.st_mtime_ns)).lastrowid
+
+            self.conn.executemany("INSERT INTO dat_roms (dat_id, game, rom, size, crc32, md5, sha1) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                                  ((dat_id, *rom) for rom in parse_dat(dat)))
+
+        self.parsed.append(dat)
+        return dat_id
+
+    def find(self, digests: dict, size: int | None = None):
+        """Looks up the name of the game a file belongs to.
+
+        Args:
+            digests: Dictionary of algorithm name to lowercase hex digest, e.g. from `hashing.FileHasher`.
+            size (optional): Size of the file in bytes. CRC32 matches are only trusted if the size matches as well.
+
+        Returns:
+            The name of the game as listed in the DAT, or None if nothing matched.
+        """
+
+        if not self._dat_ids or not digests:
+            return None
+
+        for digest in DAT_HASHES:
+            value = digests.get(digest)
+            if value is None or (digest == 'crc32' and size is None):
+                continue
+            params = (value, size) if digest == 'crc32' else (value,)
+            with self._lock:
+                row = self.conn.execute(self._queries[digest], params).fetchone()
+                if row:
+                    self.hits += 1
+                    return row[0]
+        return None
+
+    def close(self):
+        """Closes the index database."""
+
+        self.conn.close()
@@ -0,0 +1,662 @@
+import os
+import sqlite3
+import tempfile
+import time
+import random
+from collections import namedtuple
+from collections.abc import Callable
+
+from lutris_bulk_adder.config import ConfigWriter
+from lutris_bulk_adder.journal import ImportJournal, INSERTED, UPDATED, MOVED
+from lutris_bulk_adder.constants import JOURNAL_MODES, SYNCHRONOUS_MODES, DEFAULT_BATCH_SIZE, DEFAULT_BUSY_TIMEOUT, DUPLICATE_ACTIONS
+
+# Columns of the Lutris `games` table that the script fills in.
+# The order here is the order of the placeholders in the INSERT statement,
+# so every row handed to the writer has to follow it as well.
+# The id has to come first, the writer swaps in the ids it hands out.
+GAME_COLUMNS = (
+    "id", "name", "sortname", "slug", "installer_slug", "parent_slug",
+    "platform", "runner", "executable", "directory", "updated", "lastplayed",
+    "installed", "installed_at", "year", "configpath", "has_custom_banner",
+    "has_custom_icon", "has_custom_coverart_big", "playtime", "service",
+    "service_id", "discord_id"
+)
+
+# The columns that are refreshed on an existing row when updating a duplicate.
+# Everything else, like playtime and lastplayed, is left as it is
+UPDATE_COLUMNS = ("name", "slug", "runner", "directory", "installed")
+
+# The columns that are refreshed on an existing row when its ROM moved.
+# Everything else, like the playtime and when it was last played, stays
+MOVE_COLUMNS = ("directory",)
+
+# How long to wait before trying a locked database again, at first and at most.
+# The wait doubles with every try, with some jitter so that several
+# imports waiting on each other don't all try again at the same moment
+BUSY_BACKOFF_START = 0.05
+BUSY_BACKOFF_MAX = 2.0
+
+# The columns of an existing game that the duplicate index keeps in memory
+GameRow = namedtuple('GameRow', ['id', 'slug', 'name', 'platform', 'runner', 'configpath'])
+
+
+def build_insert_query(columns: tuple[str, ...] = GAME_COLUMNS):
+    """Builds the INSERT statement for the games table once, so it doesn't have to be formatted again for every single game.
+
+    Args:
+        columns: The column names in the order the row values will be supplied in.
+
+    Returns:
+        The INSERT statement with one `?` placeholder per column.
+    """
+
+    return "INSERT INTO games ({columns}) VALUES ({placeholders})".format(
+        columns = ','.join(columns),
+        placeholders = ','.join('?' * len(columns))
+    )
+
+
+def is_busy(err: sqlite3.Error):
+    """Checks whether an error means the database is locked by another connection (SQLITE_BUSY or SQLITE_LOCKED), so trying again later might work."""
+
+    code = getattr(err, 'sqlite_errorcode', None)
+    if code is not None:
+        # the extended codes keep the primary code in the lowest byte
+        return code & 0xff in (sqlite3.SQLITE_BUSY, sqlite3.SQLITE_LOCKED)
+    return 'locked' in str(err) or 'busy' in str(err)
+
+
+def build_update_query(columns: tuple[str, ...] = UPDATE_COLUMNS):
+    """Builds the UPDATE statement for refreshing an existing game once.
+
+    Args:
+        columns: The column names in the order the row values will be supplied in. The id of the game follows as the last value.
+
+    Returns:
+        The UPDATE statement with one `?` placeholder per column and one for the id.
+    """
+
+    return "UPDATE games SET {assignments} WHERE id = ?".format(
+        assignments = ','.join('{} = ?'.format(column) for column in columns)
+    )
+
+
+class DuplicateIndex():
+    """In-memory indexes of the games already in the Lutris database, used to spot games that were imported before.
+
+    Note:
+        All the rows are read with one query up front, after which every lookup is a dictionary lookup, instead of running a SELECT for every single file.
+        A game counts as a duplicate if a game with the same slug, or the same name, already exists for the same platform.
+        Games added during the run itself aren't put into the index, so for example every disc of a multi-disc set still gets imported.
+
+    Attributes:
+        rows: Every existing game.
+        by_slug: Existing games keyed by (slug, platform).
+        by_name: Existing games keyed by (name, platform).
+        by_configpath: Existing games keyed by their config file name.
+    """
+    rows: list[GameRow]
+    by_slug: dict[tuple[str, str], GameRow]
+    by_name: dict[tuple[str, str], GameRow]
+    by_configpath: dict[str, GameRow]
+
+    def __init__(self, conn: sqlite3.Connection):
+        """Load the existing games from the Lutris database into the indexes.
+
+        Args:
+            conn: The open connection to the Lutris database.
+
+        Raises:
+            sqlite3.OperationalError: If the database has no games table.
+        """
+
+        self.rows = []
+        self.by_slug = {}
+        self.by_name = {}
+        self.by_configpath = {}
+
+        for row in conn.execute("SELECT id, slug, name, platform, runner, configpath FROM games"):
+            game = GameRow(*row)
+            self.rows.append(game)
+            # the first one wins, if there are duplicates already
+            self.by_slug.setdefault((game.slug, game.platform), game)
+            self.by_name.setdefault((game.name, game.platform), game)
+            if game.configpath:
+                self.by_configpath.setdefault(game.configpath, game)
+
+    def __len__(self):
+        return len(self.by_slug)
+
+    def find(self, slug: str, name: str, platform: str):
+        """Looks up an existing game.
+
+        Args:
+            slug: The slug of the new game.
+            name: The name of the new game.
+            platform: The platform of the new game.
+
+        Returns:
+            The matching GameRow, or None if the game isn't in the database yet.
+        """
+
+        return self.by_slug.get((slug, platform)) or self.by_name.get((name, platform))
+
+
+class GameWriter():
+    """Collects rows for the Lutris `games` table and writes them out in batches with `executemany`, each batch inside one explicit transaction.
+
+    Note:
+        Committing once per game means one fsync per game, and with it grabbing and releasing the write lock of the Lutris database for every single ROM. Batching the rows up keeps that down to one commit per `batch_size` games.
+        A batch size of 1 behaves like committing every row on its own, which is handy for comparing the two.
+        The ids of new games are handed out per batch, inside the batch's `BEGIN IMMEDIATE` transaction, which holds the write lock: the batch gets the contiguous range right after the highest id in the table at that moment. So other imports, or Lutris itself, can add games to the same database at the same time without two games ending up with the same id, and none of them holds the lock for longer than a batch takes. The ids in the rows handed to `add` are ignored.
+        If the database is locked by another connection, the batch is tried again after a short wait, which doubles with every try, until `busy_timeout` seconds have passed.
+        If a `ConfigWriter` is given, the config file of every game is written in the background while the batch fills up, and only moved into place once the batch is committed. If the batch fails, its config files are thrown away.
+
+    Attributes:
+        conn: The open connection to the Lutris database.
+        batch_size: The number of rows written per transaction.
+        rows_written: The number of new rows committed so far.
+        rows_updated: The number of existing rows updated so far.
+        rows_moved: The number of existing rows pointed to a moved ROM so far.
+        rows_deleted: The number of rows deleted so far.
+        configs: The writer of the YML config files, if any.
+        journal: The journal every batch is recorded in before it's committed, if any.
+        elapsed: The time in seconds spent inside the writer, measured from opening until closing.
+        busy_timeout: The seconds to keep trying a batch while the database is locked.
+        busy_retries: The number of times a batch had to wait for the database.
+        lock_seconds: The time in seconds the write lock on the database was held, summed up over all transactions.
+        last_ids: The ids given to the new games of the last batch written, in the order they were added.
+    """
+    conn: sqlite3.Connection
+    batch_size: int
+    busy_timeout: float
+    busy_retries: int = 0
+    lock_seconds: float = 0.0
+    last_ids: range = range(0)
+    rows_written: int = 0
+    rows_updated: int = 0
+    rows_moved: int = 0
+    rows_deleted: int = 0
+    configs: ConfigWriter | None = None
+    journal: ImportJournal | None = None
+    elapsed: float = 0.0
+
+    def __init__(
+            self,
+            conn: sqlite3.Connection, batch_size: int = DEFAULT_BATCH_SIZE,
+            journal_mode: str | None = None, synchronous: str | None = None,
+            configs: ConfigWriter | None = None, busy_timeout: float = DEFAULT_BUSY_TIMEOUT,
+            journal: ImportJournal | None = None
+    ):
+        """Initialize the writer and apply the requested pragmas for the duration of the import.
+
+        Args:
+            conn: The open connection to the Lutris database.
+            batch_size: The number of rows written per transaction. Must be at least 1.
+            journal_mode (optional): One of the JOURNAL_MODES to switch the database to until the writer is closed.
+            synchronous (optional): One of the SYNCHRONOUS_MODES to use until the writer is closed.
+            configs (optional): The ConfigWriter to write the YML config files of the games with.
+            busy_timeout (optional): The seconds to keep trying a batch while another connection has the database locked. Default 30.
+            journal (optional): The ImportJournal to record every batch in, with a run begun or resumed.
+
+        Raises:
+            ValueError: If the batch size is smaller than 1, or a pragma value isn't a known one.
+        """
+
+        if batch_size < 1:
+            raise ValueError("The batch size must be at least 1, got {}".format(batch_size))
+        if journal_mode and journal_mode.upper() not in JOURNAL_MODES:
+            raise ValueError("Unknown journal mode {}".format(journal_mode))
+        if synchronous and synchronous.upper() not in SYNCHRONOUS_MODES:
+            raise ValueError("Unknown synchronous mode {}".format(synchronous))
+
+        self.conn = conn
+        self.batch_size = batch_size
+        self.rows_written = 0
+        self.rows_updated = 0
+        self.rows_moved = 0
+        self.rows_deleted = 0
+        self.configs = configs
+        self.journal = journal
+        self.elapsed = 0.0
+        self.busy_timeout = busy_timeout
+        self.busy_retries = 0
+        self.lock_seconds = 0.0
+        self.last_ids = range(0)
+
+        self._query = build_insert_query()
+        self._update_query = build_update_query()
+        self._move_query = build_update_query(MOVE_COLUMNS)
+        self._pending: list[tuple] = []
+        self._pending_updates: list[tuple] = []
+        self._pending_moves: list[tuple] = []
+        # (configpath, file) of the new rows, whose ids are only
+        # known in the transaction, and the finished entries of the rest
+        self._journal_inserts: list[tuple] = []
+        self._journal_changes: list[tuple] = []
+        self._staged_configs: list = []
+        self._restore_pragmas: list[str] = []
+        self._started = time.perf_counter()
+
+        # we take over transaction handling ourselves
+        # so sqlite3 doesn't open one behind our back
+        self.conn.isolation_level = None
+
+        # remember the old pragma values, so the database
+        # is left the way we found it once the import is done
+        if journal_mode:
+            previous = self.conn.execute("PRAGMA journal_mode").fetchone()[0]
+            self.conn.execute("PRAGMA journal_mode = {}".format(journal_mode.upper()))
+            self._restore_pragmas.append("PRAGMA journal_mode = {}".format(previous.upper()))
+        if synchronous:
+            previous = self.conn.execute("PRAGMA synchronous").fetchone()[0]
+            self.conn.execute("PRAGMA synchronous = {}".format(synchronous.upper()))
+            self._restore_pragmas.append("PRAGMA synchronous = {}".format(previous))
+
+    def _stage_config(self, config_path: str | None, config: str | None):
+        if config_path is None:
+            return
+        if self.configs is None:
+            raise ValueError("A config file can't be written without a ConfigWriter")
+        self._staged_configs.append(self.configs.stage(config_path, config))
+
+    def add(self, values: dict, config_path: str | None = None, config: str | None = None, file: str | None = None):
+        """Queues a row for insertion, and writes out the batch if it is full.
+
+        Args:
+            values: The row as a dictionary keyed by the names in GAME_COLUMNS.
+            config_path (optional): Path of the YML config file of the game.
+            config (optional): The contents of the YML config file.
+            file (optional): Path of the ROM file of the game, for the journal.
+        """
+
+        self._stage_config(config_path, config)
+        self._pending.append(tuple(values[column] for column in GAME_COLUMNS))
+        if self.journal:
+            self._journal_inserts.append((values['configpath'], file))
+        if len(self._pending) + len(self._pending_updates) + len(self._pending_moves) >= self.batch_size:
+            self.flush()
+
+    def update(self, game_id: int, values: dict, config_path: str | None = None, config: str | None = None, file: str | None = None):
+        """Queues an update of an existing row, and writes out the batch if it is full.
+
+        Args:
+            game_id: The id of the existing game.
+            values: The new row as a dictionary keyed by the names in GAME_COLUMNS. Only the UPDATE_COLUMNS are used.
+            config_path (optional): Path of the YML config file of the game, which is replaced.
+            config (optional): The new contents of the YML config file.
+            file (optional): Path of the ROM file of the game, for the journal.
+        """
+
+        self._stage_config(config_path, config)
+        self._pending_updates.append(tuple(values[column] for column in UPDATE_COLUMNS) + (game_id,))
+        if self.journal:
+            self._journal_changes.append((game_id, UPDATED, values['configpath'], file))
+        if len(self._pending) + len(self._pending_updates) + len(self._pending_moves) >= self.batch_size:
+            self.flush()
+
+    def move(self, game_id: int, directory: str, config_path: str, config: str, file: str | None = None):
+        """Queues pointing an existing game to the new path of its ROM, and writes out the batch if it is full.
+
+        Note:
+            Unlike `update`, only the directory and the YML config file change, so the playtime, when it was last played and everything else about the game stays.
+
+        Args:
+            game_id: The id of the existing game.
+            directory: The directory of the game.
+            config_path: Path of the YML config file of the game, which is replaced.
+            config: The new contents of the YML config file, with the new `main_file`.
+            file (optional): The new path of the ROM file, for the journal.
+        """
+
+        self._stage_config(config_path, config)
+        self._pending_moves.append((directory, game_id))
+        if self.journal:
+            self._journal_changes.append((game_id, MOVED, os.path.splitext(os.path.basename(config_path))[0], file))
+        if len(self._pending) + len(self._pending_updates) + len(self._pending_moves) >= self.batch_size:
+            self.flush()
+
+    def _transaction(self, work: Callable):
+        """Runs `work` inside a `BEGIN IMMEDIATE` transaction, trying again while the database is locked, and returns what it returned."""
+
+        deadline = time.monotonic() + self.busy_timeout
+        delay = BUSY_BACKOFF_START
+        while True:
+            locked = None
+            try:
+                # IMMEDIATE takes the write lock right away,
+                # instead of only at the first write
+                self.conn.execute("BEGIN IMMEDIATE")
+                locked = time.perf_counter()
+                result = work()
+                self.conn.execute("COMMIT")
+                self.lock_seconds += time.perf_counter() - locked
+                return result
+            except sqlite3.Error as err:
+                if self.conn.in_transaction:
+                    self.conn.execute("ROLLBACK")
+                if locked is not None:
+                    self.lock_seconds += time.perf_counter() - locked
+                if is_busy(err) and time.monotonic() + delay < deadline:
+                    self.busy_retries += 1
+                    time.sleep(delay * random.uniform(0.5, 1.5))
+                    delay = min(delay * 2, BUSY_BACKOFF_MAX)
+                    continue
+                raise
+
+    def _write_batch(self):
+        """Writes the queued rows, with the ids of the new rows handed out under the write lock of the transaction."""
+
+        # nobody else can add a game between reading
+        # the highest id and inserting the rows after it
+        ids = range(0)
+        if self._pending:
+            first = (self.conn.execute("SELECT max(id) FROM games").fetchone()[0] or 0) + 1
+            ids = range(first, first + len(self._pending))
+            self.conn.executemany(self._query, [(game_id,) + row[1:] for game_id, row in zip(ids, self._pending)])
+        if self._pending_updates:
+            self.conn.executemany(self._update_query, self._pending_updates)
+        if self._pending_moves:
+            self.conn.executemany(self._move_query, self._pending_moves)
+
+        # the journal is committed first, so everything
+        # that makes it into Lutris is in there. If the
+        # transaction is tried again, the entries that were
+        # recorded already are ignored by the journal
+        if self.journal:
+            self.journal.record([(game_id, INSERTED, configpath, file)
+                                 for game_id, (configpath, file) in zip(ids, self._journal_inserts)] + self._journal_changes)
+        return ids
+
+    def flush(self):
+        """Writes every queued row inside a single transaction, then moves the config files of the batch into place.
+
+        Raises:
+            sqlite3.Error: If the insert or update fails, or the database stayed locked for longer than `busy_timeout`. The transaction is rolled back before the error is passed on.
+            OSError: If a config file couldn't be written. Nothing of the batch is written to the database in that case.
+        """
+
+        if not self._pending and not self._pending_updates and not self._pending_moves:
+            return
+
+        staged = self._staged_configs
+        self._staged_configs = []
+
+        # every config of the batch has to be on disk
+        # before the rows go into the database
+        if staged:
+            try:
+                self.configs.wait(staged)
+            except OSError:
+                self.configs.discard(staged)
+                raise
+
+        try:
+            self.last_ids = self._transaction(self._write_batch)
+        except sqlite3.Error:
+            if staged:
+                self.configs.discard(staged)
+            raise
+
+        self.rows_written += len(self._pending)
+        self.rows_updated += len(self._pending_updates)
+        self.rows_moved += len(self._pending_moves)
+        self._pending = []
+        self._pending_updates = []
+        self._pending_moves = []
+        self._journal_inserts = []
+        self._journal_changes = []
+
+        if staged:
+            self.configs.commit(staged)
+
+    def _has_categories(self):
+        """Whether the database has the table Lutris keeps the categories of the games in."""
+
+        return self.conn.execute(
+            "SELECT 1 FROM main.sqlite_master WHERE type = 'table' AND name = 'games_categories'").fetchone() is not None
+
+    def delete(self, game_ids: list[int], config_paths: list[str] | None = None):
+        """Deletes games in one transaction, along with their categories, and then their config files.
+
+        Note:
+            The rows still queued are written out first, so the deletions come after everything added before them.
+
+        Args:
+            game_ids: The ids of the games to delete.
+            config_paths (optional): Paths of the YML config files of the games, removed once the rows are gone.
+
+        Raises:
+            sqlite3.Error: If the delete fails, or the database stayed locked for longer than `busy_timeout`. Nothing is deleted in that case.
+        """
+
+        self.flush()
+        if not game_ids:
+            return
+
+        has_categories = self._has_categories()
+
+        def work():
+            self.conn.executemany("DELETE FROM games WHERE id = ?", ((game_id,) for game_id in game_ids))
+            if has_categories:
+                self.conn.executemany("DELETE FROM games_categories WHERE game_id = ?", ((game_id,) for game_id in game_ids))
+        self._transaction(work)
+        self.rows_deleted += len(game_ids)
+
+        for path in config_paths or []:
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+    def close(self):
+        """Writes out the remaining rows and puts the pragmas back to what they were before."""
+
+        try:
+            self.flush()
+        finally:
+            for pragma in self._restore_pragmas:
+                self.conn.execute(pragma)
+            self._restore_pragmas = []
+            self.elapsed = time.perf_counter() - self._started
+
+    def rows_per_second(self):
+        """Returns the write throughput of the writer, or 0 if no time has been measured yet."""
+
+        if self.elapsed <= 0:
+            return 0.0
+        return (self.rows_written + self.rows_updated) / self.elapsed
+
+
+class StagingWriter(GameWriter):
+    """A GameWriter that collects everything in a staging database first, and moves it into the Lutris database in one short transaction when it's closed.
+
+    Note:
+        The batches go into a throwaway SQLite database in the temp directory, with no journal and no syncing, so filling it up never touches the Lutris database. When the writer is closed, the staging database is attached to the Lutris database, and the new rows are copied over with a single `INSERT ... SELECT`, the updates, moves and deletions applied the same way, all in one `BEGIN IMMEDIATE` transaction. That's the only time the Lutris database is locked, and it takes milliseconds even for very large imports, so Lutris itself doesn't run into `database is locked`.
+        The ids of the new games are only handed out then, and the journal is only written then. The YML config files are written while the batches fill up, but only moved into place once the transaction is committed.
+        If the import dies before the writer is closed, nothing was written to Lutris.
+
+    Attributes:
+        staging_path: Path of the staging database, which is removed once the writer is closed.
+    """
+    staging_path: str
+
+    def __init__(
+            self,
+            conn: sqlite3.Connection, batch_size: int = DEFAULT_BATCH_SIZE,
+            journal_mode: str | None = None, synchronous: str | None = None,
+            configs: ConfigWriter | None = None, busy_timeout: float = DEFAULT_BUSY_TIMEOUT,
+            journal: ImportJournal | None = None
+    ):
+        """Initialize the writer and create the staging database. See `GameWriter` for the arguments.
+
+        Raises:
+            ValueError: If the batch size is smaller than 1, or a pragma value isn't a known one.
+            OSError: If the staging database can't be created.
+        """
+
+        super().__init__(conn, batch_size, journal_mode, synchronous, configs, busy_timeout, journal)
+
+        fd, self.staging_path = tempfile.mkstemp(prefix='lutris-bulk-adder-staging-', suffix='.db')
+        os.close(fd)
+        self._staging = sqlite3.connect(self.staging_path)
+        # nothing in here has to survive a crash
+        self._staging.executescript("""
+            PRAGMA journal_mode = OFF;
+            PRAGMA synchronous = OFF;
+            CREATE TABLE staged_games (seq INTEGER PRIMARY KEY, {columns}, file);
+            CREATE TABLE staged_updates (seq INTEGER PRIMARY KEY, game_id, {updates});
+            CREATE TABLE staged_moves (seq INTEGER PRIMARY KEY, game_id, {moves});
+            CREATE TABLE staged_deletes (game_id INTEGER PRIMARY KEY);
+        """.format(columns = ', '.join(GAME_COLUMNS[1:]), updates = ', '.join(UPDATE_COLUMNS), moves = ', '.join(MOVE_COLUMNS)))
+
+        self._staged = {'games': 0, 'updates': 0, 'moves': 0}
+        self._deleted: list[int] = []
+        self._delete_configs: list[str] = []
+        self._merge_configs: list = []
+        self._merge_journal: list[tuple] = []
+
+    def flush(self):
+        """Writes the queued rows into the staging database. Nothing reaches the Lutris database before `merge`."""
+
+        if not self._pending and not self._pending_updates and not self._pending_moves:
+            return
+
+        files = [file for _, file in self._journal_inserts] if self.journal else [None] * len(self._pending)
+        with self._staging:
+            self._staging.executemany(
+                "INSERT INTO staged_games ({columns}, file) VALUES ({placeholders})".format(
+                    columns = ', '.join(GAME_COLUMNS[1:]), placeholders = ', '.join('?' * len(GAME_COLUMNS))),
+                [row[1:] + (file,) for row, file in zip(self._pending, files)])
+            self._staging.executemany(
+                "INSERT INTO staged_updates ({columns}, game_id) VALUES ({placeholders})".format(
+                    columns = ', '.join(UPDATE_COLUMNS), placeholders = ', '.join('?' * (len(UPDATE_COLUMNS) + 1))),
+                self._pending_updates)
+            self._staging.executemany(
+                "INSERT INTO staged_moves ({columns}, game_id) VALUES ({placeholders})".format(
+                    columns = ', '.join(MOVE_COLUMNS), placeholders = ', '.join('?' * (len(MOVE_COLUMNS) + 1))),
+                self._pending_moves)
+
+        self._staged['games'] += len(self._pending)
+        self._staged['updates'] += len(self._pending_updates)
+        self._staged['moves'] += len(self._pending_moves)
+        self._merge_configs.extend(self._staged_configs)
+        self._merge_journal.extend(self._journal_changes)
+        self._staged_configs = []
+        self._pending = []
+        self._pending_updates = []
+        self._pending_moves = []
+        self._journal_inserts = []
+        self._journal_changes = []
+
+    def delete(self, game_ids: list[int], config_paths: list[str] | None = None):
+        """Queues deleting games, along with their categories and config files, for the `merge`.
+
+        Args:
+            game_ids: The ids of the games to delete.
+            config_paths (optional): Paths of the YML config files of the games, removed once the rows are gone.
+        """
+
+        self.flush()
+        with self._staging:
+            self._staging.executemany("INSERT OR IGNORE INTO staged_deletes (game_id) VALUES (?)", ((game_id,) for game_id in game_ids))
+        self._deleted.extend(game_ids)
+        self._delete_configs.extend(config_paths or [])
+
+    def _merge(self):
+        """Copies everything from the attached staging database into the Lutris database, inside the transaction of the merge."""
+
+        columns = ', '.join(GAME_COLUMNS[1:])
+        ids = range(0)
+        if self._staged['games']:
+            # the staged rows are numbered from 1 up,
+            # so the ids are that number shifted past the highest id
+            first = (self.conn.execute("SELECT max(id) FROM main.games").fetchone()[0] or 0) + 1
+            ids = range(first, first + self._staged['games'])
+            self.conn.execute("INSERT INTO main.games (id, {columns}) SELECT seq + ?, {columns} FROM staging.staged_games ORDER BY seq".format(
+                columns = columns), (first - 1,))
+
+        # the last change of a game wins
+        for table, changed in (('staged_updates', UPDATE_COLUMNS), ('staged_moves', MOVE_COLUMNS)):
+            self.conn.execute("""
+                UPDATE main.games SET ({columns}) = (
+                    SELECT {columns} FROM staging.{table} AS staged WHERE staged.game_id = games.id ORDER BY staged.seq DESC LIMIT 1
+                ) WHERE id IN (SELECT game_id FROM staging.{table})""".format(columns = ', '.join(changed), table = table))
+
+        if self._deleted:
+            self.conn.execute("DELETE FROM main.games WHERE id IN (SELECT game_id FROM staging.staged_deletes)")
+            if self._has_categories():
+                self.conn.execute("DELETE FROM main.games_categories WHERE game_id IN (SELECT game_id FROM staging.staged_deletes)")
+
+        if self.journal:
+            self.journal.record([(game_id, INSERTED, configpath, file) for game_id, configpath, file in self.conn.execute(
+                "SELECT seq + ?, configpath, file FROM staging.staged_games ORDER BY seq", (ids.start - 1,))] + self._merge_journal)
+        return ids
+
+    def merge(self):
+        """Moves everything staged so far into the Lutris database in one transaction, then the config files into place, and removes the config files of the deleted games.
+
+        Raises:
+            sqlite3.Error: If the merge fails, or the database stayed locked for longer than `busy_timeout`. Nothing is written to Lutris in that case.
+            OSError: If a config file couldn't be written. Nothing is written to Lutris in that case either.
+        """
+
+        self.flush()
+        if not any(self._staged.values()) and not self._deleted:
+            return
+
+        staged = self._merge_configs
+        self._merge_configs = []
+        if staged:
+            try:
+                self.configs.wait(staged)
+            except OSError:
+                self.configs.discard(staged)
+                raise
+
+        # attaching can't be done inside a transaction
+        self.conn.execute("ATTACH DATABASE ? AS staging", (self.staging_path,))
+        try:
+            self.last_ids = self._transaction(self._merge)
+        except sqlite3.Error:
+            if staged:
+                self.configs.discard(staged)
+            raise
+        finally:
+            self.conn.execute("DETACH DATABASE staging")
+
+        self.rows_written += self._staged['games']
+        self.rows_updated += self._staged['updates']
+        self.rows_moved += self._staged['moves']
+        self.rows_deleted += len(self._deleted)
+
+        # start over, in case more is staged after this
+        with self._staging:
+            for table in ('staged_games', 'staged_updates', 'staged_moves', 'staged_deletes'):
+                self._staging.execute("DELETE FROM {}".format(table))
+        self._staged = {'games': 0, 'updates': 0, 'moves': 0}
+        self._deleted = []
+        self._merge_journal = []
+        delete_configs = self._delete_configs
+        self._delete_configs = []
+
+        if staged:
+            self.configs.commit(staged)
+        for path in delete_configs:
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+    def close(self):
+        """Merges everything into the Lutris database, puts the pragmas back to what they were before and removes the staging database."""
+
+        try:
+            self.merge()
+            super().close()
+        finally:
+            self._staging.close()
+            try:
+                os.remove(self.staging_path)
+            except FileNotFoundError:
+                pass
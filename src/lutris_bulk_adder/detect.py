@@ -0,0 +1,275 @@
+import os
+import struct
+import zipfile
+import threading
+
+from lutris_bulk_adder.classes import PlatformRegistry
+from lutris_bulk_adder.archive import ArchiveMember
+
+# How much of a file is read to look at its header. The furthest a signature
+# sits in is the ISO 9660 volume descriptor of a raw (2352 byte sector) disc
+# image, at sector 16, so this is a bit over 16 raw sectors
+HEADER_SIZE = 16 * 2352 + 24 + 2048
+
+# Atari 2600 cartridges are 64 KiB at most, bigger .bin files are something else
+_ATARI_2600_MAX_SIZE = 64 * 1024
+
+# The ways a sector of a disc image is laid out: the size of a sector
+# and where its 2048 bytes of data start. Plain .iso files use 2048 byte
+# sectors, raw .bin files 2352 byte sectors in mode 1 or mode 2
+_SECTOR_LAYOUTS = ((2048, 0), (2352, 16), (2352, 24))
+
+# Signatures at the start of the boot sector of Sega's disc based consoles
+_SEGA_DISCS = {
+    b'SEGADISCSYSTEM': 'Sega CD',
+    b'SEGA SEGASATURN': 'Sega Saturn',
+    b'SEGA SEGAKATANA': 'Sega Dreamcast',
+}
+
+# The start of the volume header of a 3DO disc (the Opera file system)
+_3DO_MAGIC = b'\x01\x5a\x5a\x5a\x5a\x5a\x01'
+
+# The magic words in the disc header of GameCube and Wii discs
+_GAMECUBE_MAGIC = b'\xc2\x33\x9f\x3d'
+_WII_MAGIC = b'\x5d\x1c\x9e\xa3'
+
+# WIA and RVZ images keep the type of the disc in their header,
+# CISO images keep the first block uncompressed right after their header
+_WIA_MAGICS = (b'WIA\x01', b'RVZ\x01')
+_WIA_DISC_TYPES = {1: 'Nintendo Gamecube', 2: 'Nintendo Wii'}
+_CISO_HEADER_SIZE = 0x8000
+
+
+def _read_at(f, offset: int, size: int):
+    f.seek(offset)
+    return f.read(size)
+
+
+def _sniff_gamecube_wii(header: bytes):
+    """Tells GameCube and Wii discs apart by the magic words in the disc header, for plain, CISO and WIA/RVZ images."""
+
+    if header[:4] == b'CISO':
+        header = header[_CISO_HEADER_SIZE:]
+    elif header[:4] in _WIA_MAGICS and len(header) >= 0x4c:
+        return _WIA_DISC_TYPES.get(struct.unpack('>I', header[0x48:0x4c])[0])
+
+    if header[0x1c:0x20] == _GAMECUBE_MAGIC:
+        return 'Nintendo Gamecube'
+    if header[0x18:0x1c] == _WII_MAGIC:
+        return 'Nintendo Wii'
+    return None
+
+
+def _sniff_sega(header: bytes):
+    """Recognizes Mega Drive and 32X cartridges by the header at 0x100, and Sega's CD based consoles by their boot sector."""
+
+    if header[0x100:0x108] == b'SEGA 32X':
+        return 'Sega 32X'
+    # some dumps have the console name shifted by a space
+    if header[0x100:0x104] == b'SEGA' or header[0x101:0x105] == b'SEGA':
+        return 'Sega Mega Drive'
+
+    for _, data_offset in _SECTOR_LAYOUTS:
+        boot = header[data_offset:data_offset + 16]
+        for magic, platform in _SEGA_DISCS.items():
+            if boot.startswith(magic):
+                return platform
+    return None
+
+
+def _sniff_3do(header: bytes):
+    for _, data_offset in _SECTOR_LAYOUTS:
+        if header[data_offset:data_offset + len(_3DO_MAGIC)] == _3DO_MAGIC:
+            return '3DO'
+    return None
+
+
+def _find_system_cnf(f, sector_size: int, data_offset: int, root: bytes):
+    """Looks up SYSTEM.CNF in the root directory of an ISO 9660 image, and returns its contents, or None if there isn't one."""
+
+    extent, length = struct.unpack('<I', root[2:6])[0], struct.unpack('<I', root[10:14])[0]
+    # the root directory of a PlayStation disc is a sector or two
+    length = min(length, 4 * 2048)
+    directory = b''.join(
+        _read_at(f, (extent + sector) * sector_size + data_offset, 2048)
+        for sector in range((length + 2047) // 2048)
+    )
+
+    position = 0
+    while position < len(directory):
+        record_length = directory[position]
+        if record_length == 0:
+            # records don't cross sector boundaries, skip to the next sector
+            position = (position // 2048 + 1) * 2048
+            continue
+        record = directory[position:position + record_length]
+        name = record[33:33 + record[32]]
+        if name.upper().startswith(b'SYSTEM.CNF'):
+            cnf_extent, cnf_length = struct.unpack('<I', record[2:6])[0], struct.unpack('<I', record[10:14])[0]
+            return _read_at(f, cnf_extent * sector_size + data_offset, min(cnf_length, 2048))
+        position += record_length
+    return None
+
+
+def _sniff_iso9660(header: bytes, f):
+    """Recognizes PlayStation, PlayStation 2 and PSP discs by the system identifier of the ISO 9660 volume descriptor.
+
+    Note:
+        PlayStation and PlayStation 2 discs both say PLAYSTATION, so they're told apart by SYSTEM.CNF, which points to the boot file with `BOOT2` on a PlayStation 2 disc and with `BOOT` on a PlayStation disc. That takes a couple more sectors to read.
+    """
+
+    for sector_size, data_offset in _SECTOR_LAYOUTS:
+        start = 16 * sector_size + data_offset
+        descriptor = header[start:start + 2048]
+        if descriptor[:6] != b'\x01CD001':
+            continue
+
+        system = descriptor[8:40].strip()
+        if system.startswith(b'PSP GAME'):
+            return 'Sony PlayStation Portable'
+        if system.startswith(b'PLAYSTATION'):
+            cnf = _find_system_cnf(f, sector_size, data_offset, descriptor[156:190])
+            if cnf and b'BOOT2' in cnf.upper():
+                return 'Sony PlayStation 2'
+            return 'Sony PlayStation'
+        return None
+    return None
+
+
+def _sniff_pbp(header: bytes):
+    """Tells PlayStation classics and PSP games in EBOOT.PBP files apart, by the CATEGORY in their PARAM.SFO."""
+
+    if header[:4] != b'\x00PBP':
+        return None
+
+    sfo_offset = struct.unpack('<I', header[8:12])[0]
+    sfo = header[sfo_offset:]
+    if sfo[:4] != b'\x00PSF':
+        return None
+
+    keys_start, values_start, count = struct.unpack('<III', sfo[8:20])
+    for entry in range(count):
+        key_offset, _, length, _, value_offset = struct.unpack('<HHIII', sfo[20 + entry * 16:36 + entry * 16])
+        key = sfo[keys_start + key_offset:sfo.index(b'\x00', keys_start + key_offset)]
+        if key == b'CATEGORY':
+            value = sfo[values_start + value_offset:values_start + value_offset + length].rstrip(b'\x00')
+            # ME is a PlayStation game converted for the PSP
+            return 'Sony PlayStation' if value == b'ME' else 'Sony PlayStation Portable'
+    return None
+
+
+class PlatformDetector():
+    """Tells which platform a ROM belongs to, by its extension and, where that's ambiguous, by the header of the file.
+
+    Note:
+        Most extensions belong to a single platform, and those files are never opened. Files with ambiguous extensions, like .bin, .iso or .pbp, get the first few KB read and checked against the header signatures of the candidate platforms: Mega Drive and 32X cartridges, Sega CD, Saturn and Dreamcast discs, 3DO discs, GameCube and Wii discs (also CISO, WIA and RVZ), and PlayStation, PlayStation 2 and PSP discs.
+        For a zip archive, the ROM inside is detected by its extension, and its header is only read if it's stored uncompressed.
+        CHD and GCZ images are compressed all the way through, so they can only be detected if their extension leaves a single candidate.
+        The detector can be shared between threads.
+
+    Attributes:
+        registry: The platforms to detect, with their extensions.
+        index: The reverse index of extension to candidate platforms.
+        sniffed: The number of files whose header had to be read.
+        unknown: The number of files no platform was found for.
+    """
+    registry: PlatformRegistry
+    index: dict[str, tuple[str, ...]]
+    sniffed: int = 0
+    unknown: int = 0
+
+    def __init__(self, registry: PlatformRegistry):
+        """Initialize the detector.
+
+        Args:
+            registry: The platforms to detect, usually `constants.PLATFORMS`.
+        """
+
+        self.registry = registry
+        self.index = registry.extension_index()
+        self.sniffed = 0
+        self.unknown = 0
+        self._lock = threading.Lock()
+
+    def extensions(self):
+        """The extensions the detector knows about, for scanning.
+
+        Returns:
+            A sorted list of extensions.
+        """
+
+        return sorted(self.index)
+
+    def detect(self, path: str, member: ArchiveMember | None = None):
+        """Detects the platform of a file, or of the ROM inside an archive.
+
+        Args:
+            path: Path to the file.
+            member (optional): The ROM inside the archive at `path`, see `archive.main_member`. Its header can only be read if it's stored uncompressed.
+
+        Returns:
+            The platform name, or None if the extension is unknown, or the header matches none of the candidates.
+        """
+
+        extension = os.path.splitext(member.name if member else path)[1][1:].lower()
+        candidates = self.index.get(extension, ())
+        if len(candidates) == 1:
+            return candidates[0]
+
+        platform = None
+        if candidates and (member is None or member.stored):
+            with self._lock:
+                self.sniffed += 1
+            try:
+                platform = self.sniff(path, candidates, member)
+            except (OSError, struct.error, ValueError, zipfile.BadZipFile):
+                platform = None
+
+        if platform is None:
+            with self._lock:
+                self.unknown += 1
+        return platform
+
+    def sniff(self, path: str, candidates: tuple[str, ...], member: ArchiveMember | None = None):
+        """Reads the header of a file and checks it against the signatures of the candidate platforms.
+
+        Args:
+            path: Path to the file.
+            candidates: The platforms the file could belong to.
+            member (optional): The file inside the archive at `path` to read instead. It should be stored uncompressed, so reading its header doesn't mean decompressing it.
+
+        Returns:
+            The platform name, or None if nothing matched.
+
+        Raises:
+            OSError: If the file can't be read.
+        """
+
+        if member:
+            with zipfile.ZipFile(path) as archive, archive.open(member.name) as f:
+                return self._sniff_stream(f, member.size, candidates)
+        with open(path, 'rb') as f:
+            return self._sniff_stream(f, os.fstat(f.fileno()).st_size, candidates)
+
+    def _sniff_stream(self, f, size: int, candidates: tuple[str, ...]):
+        """Checks the header of an open, seekable file against the signatures of the candidate platforms."""
+
+        header = f.read(HEADER_SIZE)
+        # the CISO header pushes the disc header back
+        if header[:4] == b'CISO':
+            header += f.read(_CISO_HEADER_SIZE)
+
+        for sniffer in (_sniff_sega, _sniff_gamecube_wii, _sniff_3do, _sniff_pbp):
+            platform = sniffer(header)
+            if platform:
+                return platform if platform in candidates else None
+
+        platform = _sniff_iso9660(header, f)
+        if platform:
+            return platform if platform in candidates else None
+
+        # the Atari 2600 has no header at all, so a small .bin
+        # that isn't anything else is most likely a 2600 cartridge
+        if 'Atari 2600' in candidates and size <= _ATARI_2600_MAX_SIZE:
+            return 'Atari 2600'
+        return None
@@ -0,0 +1,67 @@
+import sys
+import json
+
+# How much output is collected before it's written out in one go
+DEFAULT_BUFFER_SIZE = 1024 * 1024
+
+
+class JsonlWriter():
+    """Writes the games of a dry run as JSON Lines, one JSON object per game, for tools like `jq`.
+
+    Note:
+        Every object has the keys `action` ("insert", "update", or "delete" for a game `--sync` would remove), `file`, `row` (the row of the Lutris `games` table), `config_path` and `config` (the contents of the YML file).
+        The output goes through a large buffer and is written in big chunks, instead of several unbuffered prints per game, so previewing a huge import isn't slowed down by the terminal or the pipe.
+
+    Attributes:
+        path: The file the output goes to, or "-" for stdout.
+        games: The number of games written so far.
+    """
+    path: str
+    games: int = 0
+
+    def __init__(self, path: str = '-', buffer_size: int = DEFAULT_BUFFER_SIZE):
+        """Open the output.
+
+        Args:
+            path (optional): The file to write to, or "-" for stdout. Default "-".
+            buffer_size (optional): The number of bytes collected before they're written out. Default 1 MiB.
+
+        Raises:
+            OSError: If the file can't be opened.
+        """
+
+        self.path = path
+        self.games = 0
+        if path == '-':
+            # whatever was printed before has to come out first
+            sys.stdout.flush()
+            self._file = open(sys.stdout.fileno(), 'w', buffering=buffer_size, encoding='utf-8', closefd=False)
+        else:
+            self._file = open(path, 'w', buffering=buffer_size, encoding='utf-8')
+        self._encoder = json.JSONEncoder(ensure_ascii=False, separators=(',', ':'))
+
+    def write(self, file: str, row: dict, config_path: str, config: str | None, action: str = 'insert'):
+        """Writes out a game.
+
+        Args:
+            file: Path of the ROM file.
+            row: The row of the Lutris `games` table.
+            config_path: Path of the YML config file.
+            config: The contents of the YML config file, None for a deleted game.
+            action (optional): What would happen to the game, "insert", "update" or "delete". Default "insert".
+        """
+
+        self._file.write(self._encoder.encode({
+            "action": action,
+            "file": file,
+            "row": row,
+            "config_path": config_path,
+            "config": config,
+        }))
+        self._file.write('\n')
+        self.games += 1
+
+    def close(self):
+        """Flushes the buffer and closes the output (but not stdout)."""
+
+        self._file.close()
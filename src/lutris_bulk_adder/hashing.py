@@ -0,0 +1,318 @@
+import os
+import mmap
+import zlib
+import hashlib
+import sqlite3
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+from lutris_bulk_adder.constants import HASH_ALGORITHMS
+
+# files at least this big are hashed through mmap,
+# everything smaller is read in large blocks
+MMAP_THRESHOLD = 64 * 1024 * 1024
+READ_BLOCK_SIZE = 4 * 1024 * 1024
+
+# files smaller than this are hashed in the calling thread, as sending
+# them to another process would cost more than hashing them
+INLINE_THRESHOLD = 1024 * 1024
+
+# how many cache entries are collected before they're written out
+CACHE_COMMIT_INTERVAL = 1000
+
+
+def _new_hashers(algorithms: list[str]):
+    """Creates a fresh hasher for every requested algorithm.
+
+    Args:
+        algorithms: List of names from HASH_ALGORITHMS.
+
+    Returns:
+        A dictionary of algorithm name to an object with `update` and `hexdigest`.
+    """
+
+    hashers = {}
+    for algorithm in algorithms:
+        if algorithm == 'crc32':
+            hashers[algorithm] = _Crc32()
+        else:
+            hashers[algorithm] = hashlib.new(algorithm)
+    return hashers
+
+
+class _Crc32():
+    """Gives `zlib.crc32` the same `update`/`hexdigest` interface as the hashlib hashers."""
+
+    def __init__(self):
+        self.value = 0
+
+    def update(self, data):
+        self.value = zlib.crc32(data, self.value)
+
+    def hexdigest(self):
+        return '{:08x}'.format(self.value)
+
+
+def hash_file(path: str, algorithms: list[str] = HASH_ALGORITHMS):
+    """Computes the digests of a file for every requested algorithm in a single pass over its contents.
+
+    Note:
+        Big files, like ISOs and CHDs, are mapped into memory instead of read, so the data goes straight from the page cache into the hashers without being copied into Python objects first. Smaller files are read in large blocks into one reused buffer.
+
+    Args:
+        path: Path of the file to hash.
+        algorithms (optional): List of names from HASH_ALGORITHMS. Defaults to all of them.
+
+    Returns:
+        A dictionary of algorithm name to lowercase hex digest.
+
+    Raises:
+        OSError: If the file can't be read.
+    """
+
+    hashers = _new_hashers(algorithms)
+    update = [hasher.update for hasher in hashers.values()]
+
+    with open(path, 'rb') as f:
+        size = os.fstat(f.fileno()).st_size
+        if size >= MMAP_THRESHOLD:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                mapped.madvise(mmap.MADV_SEQUENTIAL)
+                view = memoryview(mapped)
+                try:
+                    for offset in range(0, size, READ_BLOCK_SIZE):
+                        block = view[offset:offset + READ_BLOCK_SIZE]
+                        for fn in update:
+                            fn(block)
+                        block.release()
+                finally:
+                    view.release()
+        else:
+            buffer = bytearray(READ_BLOCK_SIZE)
+            view = memoryview(buffer)
+            while True:
+                read = f.readinto(buffer)
+                if not read:
+                    break
+                for fn in update:
+                    fn(view[:read])
+
+    return {algorithm: hasher.hexdigest() for algorithm, hasher in hashers.items()}
+
+
+def _hash_job(path: str, algorithms: list[str]):
+    """Runs `hash_file` inside a worker process, turning read errors into a None result."""
+
+    try:
+        return hash_file(path, algorithms)
+    except OSError:
+        return None
+
+
+class HashCache():
+    """A persistent cache of file digests, stored in the same SQLite side database as the scan manifest.
+
+    Note:
+        Entries are keyed on (device, inode, size, mtime), so a file that is renamed or moved within the same filesystem keeps its cached digests, while a file that's been changed is hashed again.
+        The cache can be shared between threads.
+
+    Attributes:
+        path: Path to the cache database.
+        hits: Number of lookups answered from the cache.
+        misses: Number of lookups that had to be hashed.
+    """
+    path: str
+    hits: int = 0
+    misses: int = 0
+
+    def __init__(self, path: str):
+        """Open (and if needed create) the cache database and load its entries.
+
+        Args:
+            path: Path to the cache database.
+
+        Raises:
+            sqlite3.Error: If the cache can't be opened or isn't a valid cache database.
+        """
+
+        self.path = path
+        self.hits = 0
+        self.misses = 0
+
+        self._lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS hashes (
+                device INTEGER NOT NULL,
+                inode INTEGER NOT NULL,
+                size INTEGER NOT NULL,
+                mtime_ns INTEGER NOT NULL,
+                crc32 TEXT,
+                md5 TEXT,
+                sha1 TEXT,
+                PRIMARY KEY (device, inode, size, mtime_ns)
+            )""")
+        self.conn.commit()
+
+        self._entries = {
+            row[:4]: dict(zip(HASH_ALGORITHMS, row[4:]))
+            for row in self.conn.execute("SELECT device, inode, size, mtime_ns, crc32, md5, sha1 FROM hashes")
+        }
+        self._pending: list[tuple] = []
+        self._by_inode = None
+
+    @staticmethod
+    def key(stat: os.stat_result):
+        """Returns the cache key for the result of an `os.stat` call."""
+
+        return (stat.st_dev, stat.st_ino, stat.st_size, stat.st_mtime_ns)
+
+    def get(self, key: tuple, algorithms: list[str]):
+        """Looks up the digests of a file.
+
+        Args:
+            key: The cache key of the file, see `key`.
+            algorithms: The digests that are needed.
+
+        Returns:
+            A dictionary with the requested digests, or None if any of them isn't cached.
+        """
+
+        with self._lock:
+            digests = self._entries.get(key)
+            if digests is None or any(digests.get(algorithm) is None for algorithm in algorithms):
+                self.misses += 1
+                return None
+            self.hits += 1
+            return {algorithm: digests[algorithm] for algorithm in algorithms}
+
+    def find(self, inode: int, size: int, mtime_ns: int):
+        """Looks up the digests of a file that may be gone, by what the scan manifest remembers of it.
+
+        Note:
+            The manifest doesn't know the device of a file, so the first lookup builds an index of the entries without it.
+
+        Args:
+            inode: The inode the file had.
+            size: The size the file had.
+            mtime_ns: The modification time the file had, in nanoseconds.
+
+        Returns:
+            A dictionary of the cached digests (some may be None), or None if the file was never hashed.
+        """
+
+        with self._lock:
+            if self._by_inode is None:
+                self._by_inode = {key[1:]: digests for key, digests in self._entries.items()}
+            return self._by_inode.get((inode, size, mtime_ns))
+
+    def put(self, key: tuple, digests: dict):
+        """Stores the digests of a file, merged with any digests that are already cached for it.
+
+        Args:
+            key: The cache key of the file, see `key`.
+            digests: Dictionary of algorithm name to hex digest.
+        """
+
+        with self._lock:
+            merged = dict(self._entries.get(key) or {})
+            merged.update(digests)
+            self._entries[key] = merged
+            if self._by_inode is not None:
+                self._by_inode[key[1:]] = merged
+            self._pending.append(key + tuple(merged.get(algorithm) for algorithm in HASH_ALGORITHMS))
+            if len(self._pending) >= CACHE_COMMIT_INTERVAL:
+                self._commit()
+
+    def _commit(self):
+        if self._pending:
+            with self.conn:
+                self.conn.executemany("INSERT OR REPLACE INTO hashes (device, inode, size, mtime_ns, crc32, md5, sha1) VALUES (?, ?, ?, ?, ?, ?, ?)", self._pending)
+            self._pending = []
+
+    def commit(self):
+        """Writes the new entries into the cache database in one transaction."""
+
+        with self._lock:
+            self._commit()
+
+    def close(self):
+        """Writes out the remaining entries and closes the cache database."""
+
+        self.commit()
+        self.conn.close()
+
+
+class FileHasher():
+    """Hashes single files in a pool of processes, for callers that hash from several threads at once, like the stages of a `pipeline.Pipeline`.
+
+    Note:
+        Small files are hashed right in the calling thread instead, since hashlib and zlib let go of the GIL while they work, and handing a small file to another process costs more than hashing it.
+
+    Attributes:
+        algorithms: The names from HASH_ALGORITHMS to compute.
+        cache: The HashCache digests are looked up in and stored into, if any.
+        workers: The number of hashing processes.
+        bytes_hashed: The number of bytes read by the hashing processes.
+    """
+    algorithms: list[str]
+    cache: HashCache | None
+    workers: int
+    bytes_hashed: int = 0
+
+    def __init__(self, algorithms: list[str] = HASH_ALGORITHMS, cache: HashCache | None = None, workers: int | None = None):
+        """Start the process pool of the hasher.
+
+        Args:
+            algorithms (optional): List of names from HASH_ALGORITHMS. Defaults to all of them.
+            cache (optional): The HashCache to look digests up in and store new ones into.
+            workers (optional): The number of hashing processes. Defaults to the number of CPUs.
+        """
+
+        self.algorithms = list(algorithms)
+        self.cache = cache
+        self.workers = workers or os.cpu_count() or 1
+        self.bytes_hashed = 0
+        self._lock = threading.Lock()
+        self._executor = ProcessPoolExecutor(max_workers=self.workers)
+        # the processes are started right away from this thread,
+        # before the pipeline starts threads of its own, forking
+        # later from one of them could deadlock the new process
+        self._executor.submit(int).result()
+
+    def hash(self, path: str):
+        """Hashes a file, or takes its digests from the cache. Blocks until the digests are known.
+
+        Args:
+            path: Path of the file to hash.
+
+        Returns:
+            A dictionary of algorithm name to hex digest, or None if the file couldn't be read.
+        """
+
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return None
+
+        key = HashCache.key(stat)
+        if self.cache is not None:
+            cached = self.cache.get(key, self.algorithms)
+            if cached is not None:
+                return cached
+
+        if stat.st_size < INLINE_THRESHOLD:
+            digests = _hash_job(path, self.algorithms)
+        else:
+            digests = self._executor.submit(_hash_job, path, self.algorithms).result()
+        if digests is not None:
+            with self._lock:
+                self.bytes_hashed += stat.st_size
+            if self.cache is not None:
+                self.cache.put(key, digests)
+        return digests
+
+    def close(self):
+        """Shuts down the process pool."""
+
+        self._executor.shutdown(wait=True)
@@ -0,0 +1,608 @@
+import os
+import sys
+import sqlite3
+import argparse
+import xml.etree.ElementTree as ElementTree
+from datetime import datetime, timezone
+
+from concurrent.futures.process import BrokenProcessPool
+
+from lutris_bulk_adder.classes import GameRecord, ImportJob
+from lutris_bulk_adder.scanner import scan_directory
+from lutris_bulk_adder.manifest import ScanManifest, default_manifest_path
+from lutris_bulk_adder.hashing import HashCache, FileHasher
+from lutris_bulk_adder.dat import DatIndex
+from lutris_bulk_adder.config import ConfigTemplate, ConfigWriter, sweep_temp_files
+from lutris_bulk_adder.database import GameWriter, StagingWriter, DuplicateIndex
+from lutris_bulk_adder.pipeline import Pipeline
+from lutris_bulk_adder.dryrun import JsonlWriter
+from lutris_bulk_adder.profiling import StageProfiler
+from lutris_bulk_adder.progress import ProgressReporter
+from lutris_bulk_adder.preparer import GamePreparer, PreparePool
+from lutris_bulk_adder.sync import SyncPlan, load_main_files
+from lutris_bulk_adder.moves import MoveDetector, moved_config
+from lutris_bulk_adder.journal import ImportJournal, INSERTED, RUNNING, ROLLED_BACK
+from lutris_bulk_adder.archive import is_archive
+from lutris_bulk_adder.constants import AUTO_PLATFORM
+
+
+def build_values(record: GameRecord, game_id: int, game_dir: str):
+    """Builds the row of the Lutris `games` table for a game.
+
+    Args:
+        record: The prepared game.
+        game_id: The id of the game in the database.
+        game_dir: The Lutris games install directory.
+
+    Returns:
+        The row as a dictionary keyed by the column names.
+    """
+
+    return {
+        "id": game_id,
+        "name": record.name,
+        "sortname": None,
+        "slug": record.slug,
+        "installer_slug": None,
+        "parent_slug": None,
+        "platform": record.platform,
+        "runner": record.runner,
+        "executable": None,
+        "directory": game_dir,
+        "updated": None,
+        "lastplayed": 0,
+        "installed": 1,
+        "installed_at": record.installed_at,
+        "year": None,
+        "configpath": record.config_file,
+        "has_custom_banner": None,
+        "has_custom_icon": None,
+        "has_custom_coverart_big": None,
+        "playtime": None,
+        "service": None,
+        "service_id": None,
+        "discord_id": None
+    }
+
+
+def content_key(record: GameRecord):
+    """The key two files with the same contents have in common.
+
+    Note:
+        The ROMs inside archives only come with a CRC32, so that and the size are what's compared whenever there is a CRC32, which makes a zipped ROM and the same ROM unzipped a match.
+
+    Args:
+        record: The prepared game, with its digests.
+
+    Returns:
+        A hashable key.
+    """
+
+    if 'crc32' in record.digests:
+        return ('crc32', record.digests['crc32'], record.size)
+    return tuple(sorted(record.digests.items()))
+
+
+def open_journal(args: argparse.Namespace):
+    """Opens the import journal, exiting the script with an error message if it can't be opened.
+
+    Args:
+        args: The parsed command line arguments.
+
+    Returns:
+        The ImportJournal.
+    """
+
+    journal_path = args.run_journal or default_manifest_path(args.lutris_database)
+    try:
+        return ImportJournal(journal_path)
+    except sqlite3.Error as err:
+        print("Error opening import journal {}: {}".format(journal_path, err), file=sys.stderr)
+        sys.exit(1)
+
+
+def rollback_import(args: argparse.Namespace, run_id: int):
+    """Undoes a run of the import: deletes the games it added, and their YML files, in a single transaction.
+
+    Note:
+        Only games that are still in Lutris with the config file the run gave them are deleted. Games the run updated or moved were there before the run, so they're left as they are.
+        Exits the script with an error message if the run is unknown, or was an import into another database.
+
+    Args:
+        args: The parsed command line arguments, for the Lutris database and YML directory, and -n.
+        run_id: The id of the run to undo.
+    """
+
+    if not os.path.isfile(args.lutris_database):
+        print("Error opening database {}".format(args.lutris_database))
+        sys.exit(1)
+    conn = sqlite3.connect(args.lutris_database)
+
+    journal = open_journal(args)
+    run = journal.run(run_id)
+    if run is None:
+        print("Error rolling back: there's no import run {} in the journal {}".format(run_id, journal.path), file=sys.stderr)
+        sys.exit(1)
+    if run.lutris_database != os.path.abspath(args.lutris_database):
+        print("Error rolling back: import run {} was into {}".format(run.id, run.lutris_database), file=sys.stderr)
+        sys.exit(1)
+    if run.status == ROLLED_BACK:
+        print("Import run {} was rolled back already".format(run.id))
+        return
+
+    try:
+        games = {game_id: configpath for game_id, configpath in conn.execute("SELECT id, configpath FROM games")}
+    except sqlite3.OperationalError:
+        print("SQLite error, is {} a valid Lutris database?".format(args.lutris_database))
+        sys.exit(1)
+    entries = ImportJournal.committed(journal.entries(run.id), games)
+    added = [entry for entry in entries if entry.action == INSERTED]
+    config_paths = [os.path.join(args.lutris_yml_dir, "{}.yml".format(entry.configpath)) for entry in added]
+
+    if args.no_write:
+        for entry, config_path in zip(added, config_paths):
+            print("Would delete game {id} for {file}, and {config}".format(id = entry.game_id, file = entry.file, config = config_path))
+    else:
+        swept = sweep_temp_files(args.lutris_yml_dir)
+        if swept:
+            print("Removed {} temporary config files left behind by an earlier import".format(swept))
+        writer = GameWriter(conn, busy_timeout = args.busy_timeout)
+        writer.delete([entry.game_id for entry in added], config_paths)
+        writer.close()
+        journal.finish(ROLLED_BACK, run.id)
+        print("Rolled back import run {}: deleted {} games".format(run.id, writer.rows_deleted))
+    if len(entries) > len(added):
+        print("Left {} games the run updated or moved as they are".format(len(entries) - len(added)))
+    journal.close()
+    conn.close()
+
+
+def run_import(args: argparse.Namespace, jobs: list[ImportJob]):
+    """Imports the ROMs of one or more directories into Lutris, as a pipeline of stages connected by bounded queues.
+
+    Note:
+        The stages are: scanning the directories (and dropping files unchanged since the last import), hashing, generating names and configs, and writing to the database and the YML directory. All of them run at the same time, each in its own threads, while the writing happens in the calling thread, which owns the database connection.
+        The directories are scanned one after the other into the same pipeline, so they share the database connection, the batches of the writer, the duplicate index and the caches, and the next directory is already being scanned while the last games of the one before are written.
+        Exits the script with an error message if one of the databases can't be opened.
+
+    Args:
+        args: The parsed command line arguments, for the options that apply to the whole run.
+        jobs: The directories to import, with their platform, runner, core and scan options.
+    """
+
+    # with the JSON Lines on stdout, everything else goes
+    # to stderr so the output can be piped straight into jq
+    log = sys.stderr if args.jsonl == '-' else sys.stdout
+
+    # the stages are only wrapped for measuring if asked for,
+    # otherwise the profiler hands the functions back as they are
+    profiler = StageProfiler(args.profile, args.profile_output)
+
+    # Lutris SQLite db
+    if os.path.isfile(args.lutris_database):
+        conn = sqlite3.connect(args.lutris_database)
+        cur = conn.cursor()
+    else:
+        print("Error opening database {}".format(args.lutris_database))
+        sys.exit(1)
+
+    # Get max game ID to increment from
+    # this is only what the ids would be for the dry run,
+    # the writer hands out the real ids batch by batch under
+    # the write lock, in case someone else adds games meanwhile
+    try:
+        cur.execute("select max(id) from games")
+    except sqlite3.OperationalError:
+        print("SQLite error, is {} a valid Lutris database?".format(args.lutris_database))
+        sys.exit(1)
+
+    # credit to @ronicaltech for this patch
+    # link to pr on original repo: https://github.com/hwangeug/lutris-bulk-adder/pull/4
+    new_id = cur.fetchone()[0]
+    if new_id is None:
+        new_id = 0
+
+    game_id = new_id + 1
+
+    # every game already in Lutris is loaded up front,
+    # so checking for duplicates is a dictionary lookup per file
+    duplicates = DuplicateIndex(conn)
+    duplicates_skipped = 0
+
+    # the manifest remembers what was imported before,
+    # so unchanged files can be skipped on a re-run
+    manifest = None
+    if args.incremental:
+        manifest_path = args.manifest or default_manifest_path(args.lutris_database)
+        try:
+            manifest = ScanManifest(manifest_path)
+        except sqlite3.Error as err:
+            print("Error opening scan manifest {}: {}".format(manifest_path, err), file=sys.stderr)
+            sys.exit(1)
+
+    # every batch is recorded in the journal before it's committed,
+    # so a run can be resumed or rolled back if it dies halfway
+    journal = None
+    resumed = None
+    if not args.no_write:
+        journal = open_journal(args)
+        if args.resume is not None:
+            run = journal.run(args.resume) if args.resume else journal.last_unfinished(args.lutris_database)
+            if run is None:
+                print("Error resuming: there's no import run {}to resume in the journal {}".format(
+                    '{} '.format(args.resume) if args.resume else '', journal.path), file=sys.stderr)
+                sys.exit(1)
+            if run.status != RUNNING or run.lutris_database != os.path.abspath(args.lutris_database):
+                print("Error resuming: import run {} into {} is {}".format(run.id, run.lutris_database, run.status), file=sys.stderr)
+                sys.exit(1)
+            # only what really made it into Lutris counts as done
+            games = {row.id: row.configpath for row in duplicates.rows}
+            # by absolute path, the run may have been started
+            # with the directory given another way
+            resumed = {os.path.abspath(entry.file) for entry in ImportJournal.committed(journal.entries(run.id), games) if entry.file}
+            journal.resume(run.id)
+            print("Resuming import run {}, {} files were imported before".format(run.id, len(resumed)), file=log)
+        else:
+            journal.begin(args.lutris_database)
+            print("Import run {id}, undo it with --rollback {id}".format(id = journal.run_id), file=log)
+    resumed_skipped = 0
+
+    # DATs are parsed into an on-disk index once,
+    # after that only changed DATs are read again
+    dat_index = None
+    if args.dat:
+        dat_index_path = args.dat_index or default_manifest_path(args.lutris_database)
+        try:
+            dat_index = DatIndex(dat_index_path, args.dat)
+        except (sqlite3.Error, OSError, ElementTree.ParseError) as err:
+            print("Error loading DAT files into {}: {}".format(dat_index_path, err), file=sys.stderr)
+            sys.exit(1)
+        for dat in dat_index.parsed:
+            print("Indexed DAT {}".format(dat), file=log)
+
+    # matching against DATs needs the checksums,
+    # so hash files even if it wasn't asked for
+    hashing = args.hash or dat_index is not None
+    hash_algorithms = args.hash_algorithms
+    if dat_index and not args.hash:
+        hash_algorithms = ['crc32', 'sha1']
+
+    # digests of unchanged files are cached between runs,
+    # so every file only has to be hashed once (and moved
+    # files can be recognized by the digests they had)
+    hash_cache = None
+    hasher = None
+    if hashing or args.detect_moves:
+        hash_cache_path = args.hash_cache or default_manifest_path(args.lutris_database)
+        try:
+            hash_cache = HashCache(hash_cache_path)
+        except sqlite3.Error as err:
+            print("Error opening hash cache {}: {}".format(hash_cache_path, err), file=sys.stderr)
+            sys.exit(1)
+        # with a pool of processes the files are hashed in there,
+        # along with everything else that's done with them
+        if hashing and args.processes is None:
+            hasher = FileHasher(hash_algorithms, hash_cache, args.hash_workers)
+    seen_contents = set()
+    contents_skipped = 0
+
+    # the YML files of a job only differ in main_file,
+    # so everything else is rendered once up front
+    # (once per core if the platforms are detected)
+    config_renderers = {}
+    def config_renderer(job: ImportJob, core: str | None):
+        render = config_renderers.get((job, core))
+        if render is None:
+            config_options = {}
+            if core:
+                config_options['core'] = core
+            if job.game_options is not None:
+                config_options.update(job.game_options)
+            render = config_renderers.setdefault(
+                (job, core), profiler.timed('config', ConfigTemplate(config_options).render, size=len))
+        return render
+
+    imported = {}
+
+    # a sync and the move detection compare every file found
+    # by the scan with the ROMs the games in Lutris point to
+    scanned = None
+    games = None
+    if args.sync or args.detect_moves:
+        scanned = set()
+        games = load_main_files(duplicates.rows, args.lutris_yml_dir, [job.directory for job in jobs],
+                                [None if job.platform == AUTO_PLATFORM else job.platform for job in jobs])
+    sync = None
+    moves = MoveDetector(games, manifest, hash_cache) if args.detect_moves else None
+
+    # the platform, checksums and name of every file are worked
+    # out either in the threads of the pipeline, or in a pool of
+    # processes to use every core, while the database stays here
+    preparer = None
+    pool = None
+    if args.processes is None:
+        preparer = GamePreparer(jobs, hashing, dat_index = dat_index, profiler = profiler)
+        detection = preparer.detector
+    else:
+        try:
+            pool = PreparePool(jobs, args.processes or os.cpu_count() or 1, hashing, hash_algorithms,
+                               cache = hash_cache, dat_index = dat_index, dats = args.dat)
+        except BrokenProcessPool as err:
+            print("Error starting the processes: {}".format(err), file=sys.stderr)
+            sys.exit(1)
+        detection = pool if pool.detecting else None
+
+    # rows are collected and written in batches,
+    # one transaction per batch instead of one per game,
+    # or all of them staged and moved over in one go
+    writer = None
+    if not args.no_write:
+        writer_class = StagingWriter if args.staging else GameWriter
+        try:
+            writer = writer_class(conn, args.batch_size, args.journal_mode, args.synchronous,
+                                  configs = ConfigWriter(args.config_workers), busy_timeout = args.busy_timeout,
+                                  journal = journal)
+        except OSError as err:
+            print("Error creating the staging database: {}".format(err), file=sys.stderr)
+            sys.exit(1)
+        # an import that crashed can have left configs
+        # it never moved into place, this one is starting over
+        swept = sweep_temp_files(args.lutris_yml_dir)
+        if swept:
+            print("Removed {} temporary config files left behind by an earlier import".format(swept), file=log)
+        add_game = profiler.timed('write', writer.add)
+        update_game = profiler.timed('write', writer.update)
+        move_game = profiler.timed('write', writer.move)
+
+    # a dry run can be written as JSON Lines, one object per game
+    jsonl = None
+    if args.jsonl:
+        try:
+            jsonl = JsonlWriter(args.jsonl)
+        except OSError as err:
+            print("Error opening {}: {}".format(args.jsonl, err), file=sys.stderr)
+            sys.exit(1)
+        write_jsonl = profiler.timed('write', jsonl.write)
+
+    # Stage 1: scan dirs for ROMs
+    # paths are streamed in while the scan is still running
+    # and unchanged files are dropped before they're hashed
+    def scan():
+        nonlocal resumed_skipped
+        for job in jobs:
+            files = scan_directory(job.directory, job.file_types,
+                                   max_depth = job.max_depth, follow_symlinks = args.follow_symlinks,
+                                   include = job.include, exclude = job.exclude,
+                                   workers = args.scan_workers)
+            for file in files:
+                # a sync needs every file that's there,
+                # including the ones the manifest skips
+                if scanned is not None:
+                    scanned.add(os.path.abspath(file))
+                if manifest:
+                    try:
+                        if manifest.check(file) is None:
+                            continue
+                    except OSError:
+                        # deleted or replaced since it was listed
+                        continue
+                # done by the run that's being resumed
+                if resumed and os.path.abspath(file) in resumed:
+                    resumed_skipped += 1
+                    continue
+                # a new file may be a moved one, but that's only
+                # known once the scan found which files vanished
+                if moves and moves.hold(job, file):
+                    continue
+                yield (job, file, None)
+        if moves:
+            for job, file in moves.resolve(scanned):
+                yield (job, file, None)
+
+    # Stage 2: hash files in a pool of processes
+    # archives aren't hashed, the checksums of
+    # the ROMs inside are read from the archive
+    def hash_item(item):
+        job, file, _ = item
+        if is_archive(file):
+            return item
+        return (job, file, hasher.hash(file))
+
+    # Stage 3: generate the game name, slug and YML config
+    def prepare(item):
+        job, file, digests = item
+        ts = int(datetime.now(timezone.utc).timestamp())
+
+        # find out the platform, checksums and name,
+        # and drop the file if its platform can't be told
+        prepared = (pool or preparer).prepare(job, file, digests)
+        if prepared.platform is None:
+            return None
+        platform, runner, core = prepared.platform, prepared.runner, prepared.core
+        digests, size, game, slug = prepared.digests, prepared.size, prepared.name, prepared.slug
+
+        # Check if the game is in Lutris already
+        existing = None
+        if args.on_duplicate != 'force':
+            existing = duplicates.find(slug, game, platform)
+            if existing and args.on_duplicate == 'skip':
+                return GameRecord(job, platform, runner, file, digests, size, game, slug, existing, ts, existing.configpath, None)
+
+        # Data for YML file
+        # an updated game keeps its existing YML file
+        config_file = existing.configpath if existing else '{slug}-{ts}'.format(slug=slug, ts=ts)
+        return GameRecord(job, platform, runner, file, digests, size, game, slug, existing, ts, config_file,
+                          config_renderer(job, core)(file))
+
+    pipeline = Pipeline(profiler.timed_iter('scan', scan()), args.queue_size)
+    if hasher:
+        pipeline.add_stage('hash', profiler.timed('hash', hash_item), hasher.workers)
+    # a thread per process waits for its results, and one more
+    # per process has the next file ready when a process is done
+    pipeline.add_stage('prepare', profiler.timed('prepare', prepare), pool.workers * 2 if pool else args.prepare_workers)
+
+    # the progress is read off the counters of the pipeline on a timer,
+    # and left out of a dry run that prints the games to the console
+    progress = None
+    if not args.no_progress and (jsonl or not args.no_write):
+        bytes_hashed = None
+        if hashing:
+            bytes_hashed = (lambda: pool.bytes_hashed) if pool else (lambda: hasher.bytes_hashed)
+        progress = ProgressReporter(pipeline, log, bytes_hashed)
+        progress.start()
+
+    # Stage 4: write to DB/filesystem
+    # this runs in this thread, which owns the database connection
+    try:
+        for record in pipeline:
+            # the same contents under a different file name,
+            # e.g. the same ROM sitting in two subdirectories,
+            # or once zipped and once not
+            if args.hash and record.digests:
+                content = content_key(record)
+                if content in seen_contents:
+                    contents_skipped += 1
+                    continue
+                seen_contents.add(content)
+
+            existing = record.existing
+            if existing and args.on_duplicate == 'skip':
+                duplicates_skipped += 1
+                continue
+
+            # Data for Lutris DB
+            values = build_values(record, existing.id if existing else game_id, args.lutris_game_dir)
+            config_file_path = os.path.join(args.lutris_yml_dir, "{}.yml".format(record.config_file))
+
+            # Output to console
+            if jsonl:
+                write_jsonl(record.file, values, config_file_path, record.config,
+                            action = 'update' if existing else 'insert')
+            elif args.no_write:
+                print("file: {}".format(record.file))
+                print("SQLite:\n{}".format(values)),
+                print("YML at {ymlfile}:\n{config}\n".format(ymlfile=config_file_path,
+                                                             config=record.config))
+
+            # Write to DB/filesystem
+            else:
+                # the YML file is written in the background, and
+                # only moved into place once its row is committed
+                if existing:
+                    update_game(existing.id, values, config_file_path, record.config, record.file)
+                else:
+                    add_game(values, config_file_path, record.config, record.file)
+
+            key = (record.job.directory, record.platform)
+            imported[key] = imported.get(key, 0) + 1
+            if not existing:
+                game_id += 1
+
+        # the moved games keep their rows, only their
+        # YML file is pointed to the new path of the ROM
+        if moves:
+            for move in moves.moved:
+                config = moved_config(move.game.config_path, move.file)
+                if config is None:
+                    continue
+                if jsonl:
+                    write_jsonl(move.file, move.game.row._asdict(), move.game.config_path, config, action = 'move')
+                elif args.no_write:
+                    print("Would move {name} ({platform}) from {old} to {new}".format(
+                        name = move.game.row.name, platform = move.game.row.platform,
+                        old = move.game.main_file, new = move.file))
+                else:
+                    move_game(move.game.row.id, args.lutris_game_dir, move.game.config_path, config, move.file)
+
+        # the games whose ROMs are gone are removed
+        # all at once, in a single transaction
+        if args.sync:
+            moved = {move.game.main_file: os.path.abspath(move.file) for move in moves.moved} if moves else None
+            sync = SyncPlan(games, scanned, moved)
+            if jsonl:
+                for game in sync.removed:
+                    write_jsonl(game.main_file, game.row._asdict(), game.config_path, None, action = 'delete')
+            elif args.no_write:
+                for game in sync.removed:
+                    print("Would remove {name} ({platform}), {file} is gone".format(
+                        name = game.row.name, platform = game.row.platform, file = game.main_file))
+            else:
+                profiler.timed('write', writer.delete)([game.row.id for game in sync.removed],
+                                                      [game.config_path for game in sync.removed])
+    finally:
+        if progress:
+            progress.close()
+        if hasher:
+            hasher.close()
+        if pool:
+            pool.close()
+        if jsonl:
+            jsonl.close()
+
+    if len(imported) > 1 or detection:
+        for (directory, platform), count in imported.items():
+            print("{platform}: {count} games from {directory}".format(
+                platform = platform, count = count, directory = directory), file=log)
+    if detection:
+        print("Detected platforms by reading the headers of {sniffed} files, {unknown} files skipped for an unknown platform".format(
+            sniffed = detection.sniffed, unknown = detection.unknown), file=log)
+    if writer:
+        profiler.timed('write', writer.close)()
+        writer.configs.close()
+        profiler.add_bytes('write', writer.configs.bytes_written)
+        print("Wrote {rows} games and updated {updated} in {elapsed:.2f}s ({rate:.0f} rows/s)".format(
+            rows = writer.rows_written, updated = writer.rows_updated,
+            elapsed = writer.elapsed, rate = writer.rows_per_second()), file=log)
+        print("Held the write lock on the Lutris database for {:.1f} ms".format(writer.lock_seconds * 1000), file=log)
+        if writer.busy_retries:
+            print("Waited {} times for another program to let go of the Lutris database".format(writer.busy_retries), file=log)
+    if moves:
+        by_inode = sum(move.by == 'inode' for move in moves.moved)
+        print("Moves: {moved} games {verb} to their new path ({by_inode} by inode, {by_hash} by contents), {held} new files checked".format(
+            moved = len(moves.moved), verb = 'would be moved' if args.no_write else 'moved',
+            by_inode = by_inode, by_hash = len(moves.moved) - by_inode, held = moves.held), file=log)
+    if sync:
+        print("Sync: {removed} games {verb} for ROMs that are gone, {kept} kept, {added} files not in Lutris before".format(
+            removed = len(sync.removed), verb = 'would be removed' if args.no_write else 'removed',
+            kept = sync.kept, added = len(sync.added)), file=log)
+    if duplicates_skipped:
+        print("Skipped {} games already in Lutris".format(duplicates_skipped), file=log)
+    if hasher:
+        profiler.add_bytes('hash', hasher.bytes_hashed)
+    elif pool:
+        profiler.add_bytes('prepare', pool.bytes_hashed)
+    if hash_cache:
+        hash_cache.close()
+    if hashing:
+        print("Hashed {misses} files, {hits} taken from the hash cache".format(
+            misses = hash_cache.misses, hits = hash_cache.hits), file=log)
+    if dat_index:
+        dat_index.close()
+        print("Named {} games from DAT files".format(dat_index.hits + (pool.dat_hits if pool else 0)), file=log)
+    if contents_skipped:
+        print("Skipped {} files with the same contents as another file".format(contents_skipped), file=log)
+    conn.close()
+
+    # only remember the files once they are safely in Lutris
+    if manifest:
+        if not args.no_write:
+            manifest.commit()
+        manifest.close()
+        print("Incremental scan: {skipped} skipped, {added} added, {changed} changed".format(
+            skipped = manifest.skipped, added = manifest.added, changed = manifest.changed), file=log)
+
+    # only a run that got all the way here is done,
+    # anything else can still be resumed
+    if journal:
+        journal.finish()
+        journal.close()
+        if resumed_skipped:
+            print("Skipped {} files imported before the run was resumed".format(resumed_skipped), file=log)
+
+    if profiler.enabled:
+        print(profiler.summary(), file=log)
+        try:
+            if profiler.dump_stats():
+                print("Wrote the profile to {}, read it with python -m pstats {}".format(args.profile_output, args.profile_output), file=log)
+        except OSError as err:
+            print("Error writing the profile to {}: {}".format(args.profile_output, err), file=sys.stderr)
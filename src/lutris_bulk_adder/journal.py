@@ -0,0 +1,192 @@
+import os
+import sqlite3
+import time
+from collections import namedtuple
+
+# What a run did to a game
+INSERTED = 'insert'
+UPDATED = 'update'
+MOVED = 'move'
+
+# The states of a run
+RUNNING = 'running'
+FINISHED = 'finished'
+ROLLED_BACK = 'rolled back'
+
+# A run of the import, as the journal remembers it
+ImportRun = namedtuple('ImportRun', ['id', 'started_at', 'finished_at', 'status', 'lutris_database'])
+
+# A game a run wrote, with the config file name it had then,
+# which tells it apart from a game that got the same id later
+JournalEntry = namedtuple('JournalEntry', ['game_id', 'action', 'configpath', 'file'])
+
+
+class ImportJournal():
+    """A write-ahead journal of the batches an import wrote to Lutris, stored in the same SQLite side database as the scan manifest.
+
+    Note:
+        Every batch is recorded in the journal, with the ids, config file names and ROM files of its games, inside the transaction of the batch and right before it's committed to the Lutris database. So whatever made it into Lutris is in the journal, even if the import dies right after.
+        A batch that's in the journal but never made it into Lutris is told apart by looking its games up: an entry only counts if there's a game with that id and config file name, see `committed`.
+        That's one small insert and commit in the side database per batch, next to the commit of the batch itself, so it doesn't take away from writing in batches.
+        Recording is idempotent: a batch that's tried again because Lutris was busy records its games again, and whatever was recorded already is left out.
+
+    Attributes:
+        path: Path to the journal database.
+        run_id: The id of the run being recorded, once `begin` or `resume` was called.
+    """
+    path: str
+    run_id: int | None = None
+
+    def __init__(self, path: str):
+        """Open (and if needed create) the journal database.
+
+        Args:
+            path: Path to the journal database.
+
+        Raises:
+            sqlite3.Error: If the journal can't be opened or isn't a valid journal database.
+        """
+
+        self.path = path
+        self.run_id = None
+
+        self.conn = sqlite3.connect(path)
+        self.conn.executescript("""
+            CREATE TABLE IF NOT EXISTS runs (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                started_at INTEGER NOT NULL,
+                finished_at INTEGER,
+                status TEXT NOT NULL,
+                lutris_database TEXT NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS run_games (
+                run_id INTEGER NOT NULL,
+                game_id INTEGER NOT NULL,
+                action TEXT NOT NULL,
+                configpath TEXT,
+                file TEXT
+            );
+            CREATE INDEX IF NOT EXISTS run_games_run ON run_games (run_id);
+        """)
+
+        # journals from before recording was idempotent can have
+        # a batch recorded twice, only the first one is kept
+        if not self.conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'index' AND name = 'run_games_entry'").fetchone():
+            with self.conn:
+                self.conn.execute("""
+                    DELETE FROM run_games WHERE rowid NOT IN (
+                        SELECT min(rowid) FROM run_games GROUP BY run_id, game_id, action, configpath)""")
+                self.conn.execute("CREATE UNIQUE INDEX run_games_entry ON run_games (run_id, game_id, action, configpath)")
+
+    def run(self, run_id: int):
+        """Looks up a run.
+
+        Args:
+            run_id: The id of the run.
+
+        Returns:
+            The ImportRun, or None if there's no such run.
+        """
+
+        row = self.conn.execute("SELECT id, started_at, finished_at, status, lutris_database FROM runs WHERE id = ?", (run_id,)).fetchone()
+        return ImportRun(*row) if row else None
+
+    def last_unfinished(self, lutris_database: str):
+        """Looks up the last run into a Lutris database that didn't finish.
+
+        Args:
+            lutris_database: Path of the Lutris database.
+
+        Returns:
+            The ImportRun, or None if every run finished.
+        """
+
+        row = self.conn.execute(
+            "SELECT id, started_at, finished_at, status, lutris_database FROM runs WHERE status = ? AND lutris_database = ? ORDER BY id DESC LIMIT 1",
+            (RUNNING, os.path.abspath(lutris_database))).fetchone()
+        return ImportRun(*row) if row else None
+
+    def begin(self, lutris_database: str):
+        """Starts recording a new run.
+
+        Args:
+            lutris_database: Path of the Lutris database the run writes to.
+
+        Returns:
+            The id of the new run.
+        """
+
+        with self.conn:
+            self.run_id = self.conn.execute("INSERT INTO runs (started_at, status, lutris_database) VALUES (?, ?, ?)",
+                                            (int(time.time()), RUNNING, os.path.abspath(lutris_database))).lastrowid
+        return self.run_id
+
+    def resume(self, run_id: int):
+        """Goes on recording a run that didn't finish.
+
+        Args:
+            run_id: The id of the run.
+        """
+
+        self.run_id = run_id
+
+    def record(self, entries: list[tuple]):
+        """Records the games of a batch, and commits them to the journal. Called right before the batch is committed to Lutris.
+
+        Note:
+            Entries that are in the journal already are ignored, so a batch can be recorded again every time its transaction is tried again.
+
+        Args:
+            entries: (game_id, action, configpath, file) tuples, with the action one of INSERTED, UPDATED or MOVED. The files are stored by their absolute path.
+        """
+
+        if not entries:
+            return
+        with self.conn:
+            self.conn.executemany("INSERT OR IGNORE INTO run_games (run_id, game_id, action, configpath, file) VALUES (?, ?, ?, ?, ?)",
+                                  [(self.run_id, game_id, action, configpath, os.path.abspath(file) if file else file)
+                                   for game_id, action, configpath, file in entries])
+
+    def entries(self, run_id: int):
+        """Reads what a run recorded.
+
+        Args:
+            run_id: The id of the run.
+
+        Returns:
+            A list of JournalEntry, in the order they were written.
+        """
+
+        return [JournalEntry(*row) for row in self.conn.execute(
+            "SELECT game_id, action, configpath, file FROM run_games WHERE run_id = ? ORDER BY rowid", (run_id,))]
+
+    @staticmethod
+    def committed(entries: list[JournalEntry], games: dict[int, str]):
+        """Picks the entries whose batch was committed to Lutris, and whose game is still there.
+
+        Args:
+            entries: The entries of a run, see `entries`.
+            games: The config file name of every game in Lutris, by id.
+
+        Returns:
+            The entries whose game is in Lutris with the same config file name.
+        """
+
+        return [entry for entry in entries if games.get(entry.game_id) == entry.configpath]
+
+    def finish(self, status: str = FINISHED, run_id: int | None = None):
+        """Marks a run as done.
+
+        Args:
+            status (optional): FINISHED, or ROLLED_BACK. Default FINISHED.
+            run_id (optional): The id of the run. Defaults to the run being recorded.
+        """
+
+        with self.conn:
+            self.conn.execute("UPDATE runs SET finished_at = ?, status = ? WHERE id = ?",
+                              (int(time.time()), status, run_id or self.run_id))
+
+    def close(self):
+        """Closes the journal database."""
+
+        self.conn.close()
@@ -50,28 +50,24 @@ def directory(path: str):
 def scan_for_filetypes(dir: directory, types: list[str]):
     """Scans a directory for all files matching a list of extension types.
 
+    Note:
+        Kept for backwards compatibility; the script itself streams paths from `scanner.scan_directory` instead, which can also descend into subdirectories.
+
     Args:
         dir: Directory location to scan.
         types: List of file extensions to include.
 
     Returns:
-        A list of file paths.
+        A set of file paths.
 
     Raises:
         FileNotFoundError: Directory does not exist.
     """
 
-    files = set()
-    with os.scandir(dir) as it:
-        for entity in it:
-            if entity.is_file():
-                fn_delimited = entity.name.split(os.extsep)
-                try:
-                    if(fn_delimited[len(fn_delimited) - 1].lower() in types):
-                        files.add(os.path.join(dir, entity.name))
-                except IndexError:
-                    pass
-    return files
+    # the scanner pulls in the thread pool machinery,
+    # which the help and info paths have no use for
+    from lutris_bulk_adder.scanner import scan_directory
+    return set(scan_directory(dir, types))
 
 def split_list(list: list, nested_list_size: int):
     """Takes a list and converts it into a list of nested lists with n number of items in said nested lists. This function will take n number of items from the original list, put them into a new list of n items, and nest that into a new list that will be returned. Should the original list run out of items before the n amount of items is achieved, the nested list will be n-k items smaller than required, where k is the amount of items missing.
@@ -0,0 +1,99 @@
+import os
+
+# The keys an entry of a library file may have, and the types of their values.
+# Every key except directory falls back to the command line argument of the same name
+LIBRARY_KEYS = {
+    'platform': str,
+    'directory': str,
+    'runner': str,
+    'core': str,
+    'file_types': list,
+    'game_options': dict,
+    'strip_filename': list,
+    'recursive': bool,
+    'max_depth': int,
+    'include': list,
+    'exclude': list,
+}
+
+# how the types are called in the error messages
+_TYPE_NAMES = {str: 'a string', list: 'a list of strings', dict: 'a table', bool: 'true or false', int: 'a whole number'}
+
+
+def _parse(path: str):
+    """Reads a library file as TOML if its name ends in .toml, as YAML otherwise."""
+
+    if path.lower().endswith('.toml'):
+        # tomllib only ships with Python 3.11 and newer
+        try:
+            import tomllib
+        except ImportError:
+            raise ValueError("reading TOML files needs Python 3.11 or newer, use a YAML file instead")
+        with open(path, 'rb') as f:
+            return tomllib.load(f)
+
+    import yaml
+    with open(path) as f:
+        try:
+            return yaml.safe_load(f)
+        except yaml.YAMLError as err:
+            raise ValueError(str(err))
+
+
+def load_library(path: str):
+    """Reads a library file, which lists many directories to import in one run, each with its own platform and options.
+
+    Note:
+        The file is either YAML or TOML (if its name ends in .toml), with a list of entries under the `libraries` key. In YAML:
+
+            libraries:
+              - platform: Nintendo SNES
+                directory: ~/ROMs/SNES
+              - platform: Nintendo Wii
+                directory: ~/ROMs/Wii
+                runner: dolphin
+                game_options: {platform: 1}
+
+        Or in TOML, every entry is a `[[libraries]]` table with the same keys. Only `directory` is required, every other key of `LIBRARY_KEYS` falls back to the command line argument of the same name.
+
+    Args:
+        path: Path to the library file.
+
+    Returns:
+        The entries as a list of dictionaries, with `~` expanded in the directories and the game options turned into strings.
+
+    Raises:
+        OSError: If the file can't be read.
+        ValueError: If the file isn't valid TOML or YAML, or it or one of its entries isn't laid out as described above.
+    """
+
+    data = _parse(path)
+    if not isinstance(data, dict) or not isinstance(data.get('libraries'), list) or not data['libraries']:
+        raise ValueError("expected a non-empty list of entries under the 'libraries' key")
+
+    entries = []
+    for number, entry in enumerate(data['libraries'], start=1):
+        if not isinstance(entry, dict):
+            raise ValueError("entry {} is not a table of keys and values".format(number))
+
+        for key, value in entry.items():
+            if key not in LIBRARY_KEYS:
+                raise ValueError("entry {}: unknown key '{}', expected one of: {}".format(number, key, ', '.join(LIBRARY_KEYS)))
+            # bools are ints in Python, but a max depth of True is surely a mistake
+            expected = LIBRARY_KEYS[key]
+            if not isinstance(value, expected) or (expected is int and isinstance(value, bool)):
+                raise ValueError("entry {}: '{}' should be {}".format(number, key, _TYPE_NAMES[expected]))
+            if expected is list and not all(isinstance(item, str) for item in value):
+                raise ValueError("entry {}: '{}' should be a list of strings".format(number, key))
+
+        if 'directory' not in entry:
+            raise ValueError("entry {}: the 'directory' key is required".format(number))
+
+        entry = dict(entry)
+        entry['directory'] = os.path.expanduser(entry['directory'])
+        # the same as -o, where every value is a string
+        if 'game_options' in entry:
+            entry['game_options'] = {str(key): str(value) for key, value in entry['game_options'].items()}
+        entries.append(entry)
+
+    return entries
@@ -1,12 +1,121 @@
 #!/usr/bin/env python3
 
 import sys
-import yaml
-import sqlite3
-from datetime import datetime, timezone
 
-from lutris_bulk_adder.constants import DEFAULT_ROM_FILE_EXTS, KEY_ERR_MSG, ARG_ERR_MSG
+# only light modules are imported up here, so --help and -i
+# answer right away. The import itself, with SQLite, PyYAML
+# and the worker pools, is only loaded once it actually runs
+from lutris_bulk_adder.constants import DEFAULT_ROM_FILE_EXTS, KEY_ERR_MSG, ARG_ERR_MSG, AUTO_PLATFORM, ARCHIVE_EXTENSIONS
+from lutris_bulk_adder.constants import (DEFAULT_SCAN_WORKERS, DEFAULT_MANIFEST_NAME, HASH_ALGORITHMS,
+                                         DEFAULT_PREPARE_WORKERS, DEFAULT_QUEUE_SIZE, DEFAULT_CONFIG_WORKERS,
+                                         DEFAULT_BATCH_SIZE, DEFAULT_BUSY_TIMEOUT, JOURNAL_MODES, SYNCHRONOUS_MODES, DUPLICATE_ACTIONS)
 from lutris_bulk_adder.lib import *
+from lutris_bulk_adder.classes import ImportJob
+
+def make_job(args: argparse.Namespace, entry: dict, where: str | None = None):
+    """Puts together a directory to import from an entry of the library file, and the command line arguments for everything the entry doesn't set.
+
+    Note:
+        Exits the script with an error message if the platform, runner or directory are unknown or missing.
+
+    Args:
+        args: The parsed command line arguments.
+        entry: The platform, directory and options of the job, keyed like the command line arguments. See `library.LIBRARY_KEYS`.
+        where (optional): Where the entry comes from, for the error messages.
+
+    Returns:
+        The ImportJob.
+    """
+
+    def fail(message: str, code: int = -1):
+        if where:
+            print("In {}:".format(where), file=sys.stderr)
+        print(message, file=sys.stderr)
+        sys.exit(code)
+
+    arg_platform = entry.get('platform', args.platform)
+    dir = entry.get('directory')
+    if not arg_platform:
+        fail("ERROR: Missing platform; it is required for this script to function")
+    if not os.path.isdir(dir):
+        fail("ERROR: {} is not a directory".format(dir))
+
+    # setup scan depth
+    # the top directory only by default
+    # no limit if recursive without a max depth
+    max_depth = 0
+    arg_max_depth = entry.get('max_depth', args.max_depth)
+    if arg_max_depth is not None:
+        if arg_max_depth < 0:
+            fail("ERROR: The max depth can't be negative")
+        max_depth = arg_max_depth
+    elif entry.get('recursive', args.recursive):
+        max_depth = None
+
+    game_options = args.game_options
+    if 'game_options' in entry:
+        game_options = dict(game_options or {})
+        game_options.update(entry['game_options'])
+
+    options = dict(
+        game_options = game_options,
+        strip_filename = entry.get('strip_filename', args.strip_filename),
+        max_depth = max_depth,
+        include = entry.get('include', args.include),
+        exclude = entry.get('exclude', args.exclude)
+    )
+
+    # the platform of every file is detected on its own,
+    # the runner and core are only used where the platform has them
+    file_types = entry.get('file_types', args.file_types)
+    if arg_platform == AUTO_PLATFORM:
+        return ImportJob(AUTO_PLATFORM, dir, entry.get('runner', args.runner), entry.get('core', args.core),
+                         file_types = file_types or sorted(PLATFORMS.extension_index()) + ARCHIVE_EXTENSIONS, **options)
+
+    # Ensure platform can be found in the dictionary
+    platform = ''
+    try:
+        platform = PLATFORMS[arg_platform]
+    except KeyError as err:
+        fail(KEY_ERR_MSG.format("find", err))
+
+    # Safety double check to see if somehow platform 
+    # ended up being empty for some reason still
+    if not platform:
+        fail("""There was an unknown error trying to grab the exact platform from the built-in dictionary.
+              
+This shouldn't have happened, because in such event, the attempt at getting an unknown key value platform from the dictionary will throw a Python KeyError which is handled in code via an error message and the program should be exiting right then and there.
+              
+If you see this message, then you have found a bug.""", -999)
+
+    # setup runner
+    # use default runner first
+    # if available use arg provided runner
+    # test if runner is known for this platform
+    runner = platform.default_runner
+    arg_runner = entry.get('runner', args.runner)
+    if arg_runner:
+        if arg_runner not in platform.runners:
+            fail(ARG_ERR_MSG.format(selection = "runner", arg = arg_runner))
+        runner = arg_runner
+
+    # setup core
+    # check if selected runner is libretro
+    # use default core first
+    # if available use arg provided core
+    # test if core is known for this platform
+    core = None
+    if runner == 'libretro':
+        core = platform.default_core
+        arg_core = entry.get('core', args.core)
+        if arg_core:
+            if arg_core not in platform.cores:
+                print(ARG_ERR_MSG.format(selection = "core", arg = arg_core))
+            core = arg_core
+
+    return ImportJob(arg_platform, dir, runner, core,
+                     file_types = file_types or DEFAULT_ROM_FILE_EXTS, **options)
+
 
 def main():
     parser = argparse.ArgumentParser(description='Scan a directory for ROMs to add to Lutris.', add_help=False)
@@ -16,10 +125,12 @@ def main():
                         help="show this help message and exit")
     
     # Required arguments
-    parser.add_argument('-p', '--platform', type=str, choices=PLATFORMS,
-                        help='Platform name.')
+    parser.add_argument('-p', '--platform', type=str, choices=[AUTO_PLATFORM, *PLATFORMS],
+                        help='Platform name, or auto to detect the platform of every file.')
     parser.add_argument('-d', '--directory', type=directory,
                         help='Directory to scan for games.')
+    parser.add_argument('-L', '--library', type=str,
+                        help='YAML or TOML file listing many directories to import in one run, each with its own platform and options.')
     
     # Optional arguments
     parser.add_argument('-r', '--runner', type=str,
@@ -38,6 +149,80 @@ def main():
                         default=os.path.join(os.path.expanduser('~'), 'Games'),
                         help='Lutris games install dir.')
 
+    # Scan options
+    parser.add_argument('-R', '--recursive', action='store_true',
+                        help='Also scan the subdirectories of the given directory.')
+    parser.add_argument('--max-depth', type=int,
+                        help='How many levels of subdirectories to descend into when scanning recursively.')
+    parser.add_argument('--follow-symlinks', action='store_true',
+                        help='Descend into symlinked directories while scanning.')
+    parser.add_argument('--include', type=str, nargs='*', default=[],
+                        help='Space-separated list of glob patterns a file has to match to be included.')
+    parser.add_argument('--exclude', type=str, nargs='*', default=[],
+                        help='Space-separated list of glob patterns for files and directories to skip.')
+    parser.add_argument('--scan-workers', type=int, default=DEFAULT_SCAN_WORKERS,
+                        help='Number of directories scanned concurrently.')
+
+    # Incremental import options
+    parser.add_argument('-u', '--incremental', action='store_true',
+                        help='Only import files that were added or changed since the last successful import.')
+    parser.add_argument('--manifest', type=str,
+                        help='Path to the scan manifest database used by --incremental.')
+    parser.add_argument('--detect-moves', action='store_true',
+                        help='Point the games of moved or renamed ROMs to their new path instead of importing them again. Implies --incremental.')
+    parser.add_argument('--sync', action='store_true',
+                        help='Also remove the games whose ROMs are gone from the scanned directories.')
+
+    # Pipeline options
+    parser.add_argument('--prepare-workers', type=int, default=DEFAULT_PREPARE_WORKERS,
+                        help='Number of threads generating game names and configs.')
+    parser.add_argument('--processes', type=int, nargs='?', const=0, default=None,
+                        help='Hash, detect and name the files in a pool of this many processes instead of threads (all CPUs if no number is given).')
+    parser.add_argument('--queue-size', type=int, default=DEFAULT_QUEUE_SIZE,
+                        help='Number of files buffered between two stages of the import.')
+
+    # Hashing options
+    parser.add_argument('-H', '--hash', action='store_true',
+                        help='Hash every file, and skip files whose contents were already seen during the run.')
+    parser.add_argument('--hash-algorithms', type=str.lower, nargs='+', choices=HASH_ALGORITHMS, default=HASH_ALGORITHMS,
+                        help='Space-separated list of hash algorithms to compute.')
+    parser.add_argument('--hash-workers', type=int,
+                        help='Number of processes hashing files in parallel.')
+    parser.add_argument('--hash-cache', type=str,
+                        help='Path to the database caching the hashes of unchanged files.')
+
+    # DAT options
+    parser.add_argument('--dat', type=str, nargs='+', default=[],
+                        help='Space-separated list of Logiqx XML DAT files (No-Intro, Redump, TOSEC) to name games by.')
+    parser.add_argument('--dat-index', type=str,
+                        help='Path to the database the DAT files are indexed into.')
+
+    # Duplicate handling
+    parser.add_argument('--on-duplicate', type=str, choices=DUPLICATE_ACTIONS, default='skip',
+                        help='What to do with a game that is already in the Lutris database.')
+
+    # Database write options
+    parser.add_argument('-b', '--batch-size', type=int, default=DEFAULT_BATCH_SIZE,
+                        help='Number of games written to the Lutris database per transaction.')
+    parser.add_argument('--journal-mode', type=str.upper, choices=JOURNAL_MODES,
+                        help='SQLite journal mode to use for the duration of the import.')
+    parser.add_argument('--synchronous', type=str.upper, choices=SYNCHRONOUS_MODES,
+                        help='SQLite synchronous mode to use for the duration of the import.')
+    parser.add_argument('--config-workers', type=int, default=DEFAULT_CONFIG_WORKERS,
+                        help='Number of YML config files written concurrently.')
+    parser.add_argument('--busy-timeout', type=float, default=DEFAULT_BUSY_TIMEOUT,
+                        help='Seconds to keep trying to write a batch while another program has the Lutris database locked.')
+    parser.add_argument('--staging', action='store_true',
+                        help='Collect all games in a staging database, and move them into the Lutris database in one short transaction at the end.')
+
+    # Journal options
+    parser.add_argument('--resume', type=int, nargs='?', const=0, default=None, metavar='RUN_ID',
+                        help='Continue an import run that died halfway (the last unfinished one if no id is given), skipping the files it already imported.')
+    parser.add_argument('--rollback', type=int, metavar='RUN_ID',
+                        help='Delete the games an import run added, and their YML files, then exit.')
+    parser.add_argument('--run-journal', type=str,
+                        help='Path to the database the import runs are journaled in.')
+
     # Info options
     parser.add_argument('-i', "--platform-info", type=str,
                         help='List information for a given platform (runners, cores if libretro is an option and defaults)')
@@ -45,7 +230,7 @@ def main():
                         help='Dump all available information related to every and all known platforms')
     
     # Other options
-    parser.add_argument('-f', '--file-types', type=str, nargs='*', default=DEFAULT_ROM_FILE_EXTS,
+    parser.add_argument('-f', '--file-types', type=str, nargs='*',
                         help='Space-separated list of file types to scan for.')
     parser.add_argument('-o', '--game-options', type=option_list,
                         help='Additional options to write to the YAML file under the "game" key (e.g. platform number as required for Dolphin)')
@@ -55,17 +240,36 @@ def main():
                         help="""
 Do not write YML files or alter Lutris database, only print data to be written out to stdout. (i.e. dry run)
     """)
+    parser.add_argument('--no-progress', action='store_true',
+                        help="Don't report the progress while importing.")
+    parser.add_argument('--profile', action='store_true',
+                        help='Measure the time, calls and bytes of every stage of the import, and print them as a table at the end.')
+    parser.add_argument('--profile-output', type=str, default=None, metavar='FILE',
+                        help='Also profile the stages with cProfile, and write the stats to FILE for pstats. Implies --profile.')
+    parser.add_argument('--jsonl', type=str, nargs='?', const='-', metavar='FILE',
+                        help='Dry run, writing one JSON object per game to FILE (or stdout if no FILE is given). Implies --no-write.')
 
     args = parser.parse_args()
 
     help = args.help
     if help:
         print("""usage: lutris_bulk_adder.py [-h] 
-                            -p PLATFORM (see choices below) -d DIRECTORY
+                            -p PLATFORM (see choices below) -d DIRECTORY | -L LIBRARY
                             [-r RUNNER] [-c CORE]
                             [-ld LUTRIS_DATABASE] [-ly LUTRIS_YML_DIR] [-lg LUTRIS_GAME_DIR]
+                            [-R] [--max-depth MAX_DEPTH] [--follow-symlinks]
+                            [--include [INCLUDE ...]] [--exclude [EXCLUDE ...]] [--scan-workers SCAN_WORKERS]
+                            [-u] [--manifest MANIFEST] [--detect-moves] [--sync]
+                            [--prepare-workers PREPARE_WORKERS] [--processes [PROCESSES]] [--queue-size QUEUE_SIZE]
+                            [-H] [--hash-algorithms HASH_ALGORITHMS ...] [--hash-workers HASH_WORKERS] [--hash-cache HASH_CACHE]
+                            [--dat DAT ...] [--dat-index DAT_INDEX]
+                            [--on-duplicate {{skip,update,force}}]
+                            [-b BATCH_SIZE] [--journal-mode JOURNAL_MODE] [--synchronous SYNCHRONOUS]
+                            [--config-workers CONFIG_WORKERS] [--busy-timeout BUSY_TIMEOUT] [--staging]
+                            [--resume [RUN_ID]] [--rollback RUN_ID] [--run-journal RUN_JOURNAL]
                             [-i PLATFORM_INFO] [-a]
-                            [-f [FILE_TYPES ...]] [-o GAME_OPTIONS] [-s [STRIP_FILENAME ...]] [-n]
+                            [-f [FILE_TYPES ...]] [-o GAME_OPTIONS] [-s [STRIP_FILENAME ...]] [-n] [--jsonl [FILE]]
+                            [--no-progress] [--profile] [--profile-output FILE]
 
 Scan a directory for ROMs to add to Lutris.
 
@@ -77,8 +281,17 @@ options:
   -p, --platform PLATFORM
                         Platform name.
                         The following platforms are available:
-                        {}
+                        {platforms}
                         The script will exit with an error if the given platform is unknown by the built-in dictionary.
+                        auto: detect the platform of every file, so a folder of mixed platforms can be imported in one go.
+                        Files are matched by their extension, and where an extension is shared (like .bin, .iso or .pbp)
+                        by the header signatures of the candidate platforms. Files no platform is found for are skipped.
+                        Every platform gets its default runner and core, unless -r and -c name one it has.
+  -L, --library LIBRARY
+                        YAML or TOML (.toml) file listing many directories to import in one run, instead of -p and -d.
+                        Every entry under its "libraries" key needs a directory, and may set platform, runner, core, file_types,
+                        game_options, strip_filename, recursive, max_depth, include and exclude. Anything not set falls back
+                        to the command line arguments. All the directories share one database connection and one duplicate index.
               
   -r, --runner RUNNER   Name of Lutris runner to use.
                         The script will exit with an error if the given runner is unknown by the built-in dictionary for the specified platform.
@@ -94,6 +307,93 @@ options:
   -lg, --lutris-game-dir LUTRIS_GAME_DIR
                         Lutris games install dir.
               
+  -R, --recursive       Also scan the subdirectories of the given directory.
+  --max-depth MAX_DEPTH
+                        How many levels of subdirectories to descend into when scanning recursively. Implies -R.
+                        Default: no limit
+  --follow-symlinks     Descend into symlinked directories while scanning.
+  --include [INCLUDE ...]
+                        Space-separated list of glob patterns a file (name or path relative to DIRECTORY) has to match to be included.
+  --exclude [EXCLUDE ...]
+                        Space-separated list of glob patterns for files and directories to skip.
+  --scan-workers SCAN_WORKERS
+                        Number of directories scanned concurrently. Default: {scan_workers}
+              
+  -u, --incremental     Only import files that were added or changed since the last successful import.
+                        Unchanged files are recognized by their path, size, modification time and inode.
+  --manifest MANIFEST
+                        Path to the scan manifest database used by --incremental.
+                        Default: {manifest_name} next to the Lutris database
+  --detect-moves        Point the games of moved or renamed ROMs to their new path, keeping their playtime and history,
+                        instead of importing them again. New files are matched with the ROMs that vanished by their inode,
+                        size and modification time, or by their contents if the vanished ROMs were hashed before (-H or --dat).
+                        Implies --incremental, as the manifest is what remembers the files that vanished.
+  --sync                Also remove the games whose ROMs are gone from the scanned directories, along with their YML files,
+                        all in one transaction. Only games whose YML file points into a scanned directory are looked at.
+                        With -n or --jsonl, the games that would be removed are only listed.
+              
+  --prepare-workers PREPARE_WORKERS
+                        Number of threads generating game names and configs. Default: {prepare_workers}
+  --processes [PROCESSES]
+                        Hash the files, detect their platforms and generate their names in a pool of this many processes
+                        instead of threads, to use every core. All CPUs if no number is given.
+                        The database and the YML files are still written by this process alone.
+  --queue-size QUEUE_SIZE
+                        Number of files buffered between two stages of the import. Default: {queue_size}
+                        Scanning, hashing, name generation and writing run at the same time, and the memory use stays flat no matter how big the library is.
+              
+  -H, --hash            Hash every file, and skip files whose contents were already seen during the run.
+                        Large files are hashed through mmap, spread across a pool of processes.
+  --hash-algorithms HASH_ALGORITHMS ...
+                        Space-separated list of hash algorithms to compute. Default: {hash_algorithms}
+  --hash-workers HASH_WORKERS
+                        Number of processes hashing files in parallel. Default: the number of CPUs
+  --hash-cache HASH_CACHE
+                        Path to the database caching the hashes of unchanged files.
+                        Default: {manifest_name} next to the Lutris database
+              
+  --dat DAT ...         Space-separated list of Logiqx XML DAT files (No-Intro, Redump, TOSEC) to name games by.
+                        Files are matched by their checksums, and a match replaces the filename when generating the game name.
+                        Files are hashed for this even without -H.
+  --dat-index DAT_INDEX
+                        Path to the database the DAT files are indexed into. DATs are only parsed again when they change.
+                        Default: {manifest_name} next to the Lutris database
+              
+  --on-duplicate {{skip,update,force}}
+                        What to do with a game that is already in the Lutris database for the same platform, judged by its slug or name.
+                        skip: leave the existing game alone and don't import the file (default)
+                        update: point the existing game, and its YML file, to the new file
+                        force: import the file as a new game anyway
+              
+  -b, --batch-size BATCH_SIZE
+                        Number of games written to the Lutris database per transaction. Default: {batch_size}
+                        A batch size of 1 commits every game on its own.
+  --journal-mode JOURNAL_MODE
+                        SQLite journal mode to use for the duration of the import.
+                        One of: {journal_modes}
+  --synchronous SYNCHRONOUS
+                        SQLite synchronous mode to use for the duration of the import.
+                        One of: {synchronous_modes}
+  --config-workers CONFIG_WORKERS
+                        Number of YML config files written concurrently. Default: {config_workers}
+                        Config files are written to a temporary file first, and only moved into place once their games are in the database.
+  --busy-timeout BUSY_TIMEOUT
+                        Seconds to keep trying to write a batch while another program (Lutris, or another import) has the Lutris database locked.
+                        Default: {busy_timeout}
+                        The ids of new games are handed out batch by batch while holding the write lock, so imports can run at the same time.
+  --staging             Collect all games in a staging database in the temp directory first, and move them into the Lutris database
+                        with a single INSERT ... SELECT in one short transaction at the end, so the Lutris database is only locked
+                        for milliseconds, even while Lutris is running. The time the lock was held is reported after the import.
+              
+  --resume [RUN_ID]     Continue an import run that died halfway, the last unfinished one into the Lutris database if no id is given.
+                        The files the run already imported are skipped before they're hashed. Give it the same directories as before.
+  --rollback RUN_ID     Delete the games an import run added, and their YML files, in one transaction, then exit.
+                        Games the run updated or moved are left as they are. With -n, the games are only listed.
+                        Every run prints its id when it starts, and every batch it writes is journaled before it's committed.
+  --run-journal RUN_JOURNAL
+                        Path to the database the import runs are journaled in.
+                        Default: {manifest_name} next to the Lutris database
+              
   -i, --platform-info PLATFORM
                         List information for a given platform (runners, cores if libretro is an option and defaults)
   -a, --dump-platform-info
@@ -101,12 +401,35 @@ options:
               
   -f, --file-types [FILE_TYPES ...]
                         Space-separated list of file types to scan for.
+                        Default: {file_types}
+                        With -p auto: every extension of a known platform, and zip archives
   -o, --game-options GAME_OPTIONS
                         Additional options to write to the YAML file under the "game" key (e.g. platform number as required for Dolphin)
   -s, --strip-filename [STRIP_FILENAME ...]
                         Space-separated list of strings to strip from filenames when generating game names.
-  -n, --no-write        Do not write YML files or alter Lutris database, only print data to be written out to stdout. (i.e. dry run)"""
-              .format(format_list(list(PLATFORMS.keys()), '\t\t\t', multiple_items_per_line=True)))
+  -n, --no-write        Do not write YML files or alter Lutris database, only print data to be written out to stdout. (i.e. dry run)
+  --jsonl [FILE]        Dry run, writing one JSON object per game to FILE (or stdout if no FILE is given) as JSON Lines.
+                        Every line has the action (insert, update, move with --detect-moves, or delete with --sync), the file, the database row, and the path and contents of the YML config.
+                        With stdout, the other messages go to stderr, so the output can be piped into a tool like jq. Implies --no-write.
+
+  --no-progress         Don't report the progress while importing. By default the files found, the files processed, the throughput
+                        and the time left are shown on a line redrawn twice a second, or logged every 10 seconds if the output isn't a terminal.
+  --profile             Measure the time, calls and bytes of every stage of the import (scan, hash, prepare, detect, dat, name, config, write),
+                        and print them as a table at the end. The stages run at the same time, so their times add up to more than the whole import.
+  --profile-output FILE
+                        Also profile the stages with cProfile, and write the stats to FILE, to be read with python -m pstats FILE. Implies --profile."""
+              .format(platforms = format_list(list(PLATFORMS.keys()), '\t\t\t', multiple_items_per_line=True),
+                      file_types = ' '.join(DEFAULT_ROM_FILE_EXTS),
+                      scan_workers = DEFAULT_SCAN_WORKERS,
+                      manifest_name = DEFAULT_MANIFEST_NAME,
+                      prepare_workers = DEFAULT_PREPARE_WORKERS,
+                      queue_size = DEFAULT_QUEUE_SIZE,
+                      hash_algorithms = ' '.join(HASH_ALGORITHMS),
+                      batch_size = DEFAULT_BATCH_SIZE,
+                      busy_timeout = DEFAULT_BUSY_TIMEOUT,
+                      journal_modes = ', '.join(JOURNAL_MODES),
+                      synchronous_modes = ', '.join(SYNCHRONOUS_MODES),
+                      config_workers = DEFAULT_CONFIG_WORKERS))
         sys.exit(0)
 
     # Dump all information related to platforms
@@ -126,170 +449,77 @@ options:
             sys.exit(-1)
         sys.exit(0);
     
-    # Ensure platform and directory is supplied from arguments
-    arg_platform = args.platform
-    dir = args.directory
-    if not arg_platform or not dir:
-        print("ERROR: Missing {} argument inputs; they are required for this script to function"
-              .format("platform and directory" if not arg_platform and not dir else ("platform" if not arg_platform else "directory")),
-              file=sys.stderr)
+    if args.batch_size < 1:
+        print("ERROR: The batch size must be at least 1", file=sys.stderr)
         sys.exit(-1)
 
-    # Ensure platform can be found in the dictionary
-    platform = ''
-    try:
-        platform = PLATFORMS[arg_platform]
-    except KeyError as err:
-        print(KEY_ERR_MSG.format("find", err))
+    if args.busy_timeout < 0:
+        print("ERROR: The busy timeout can't be negative", file=sys.stderr)
         sys.exit(-1)
 
-    # Safety double check to see if somehow platform 
-    # ended up being empty for some reason still
-    if not platform:
-        print("""There was an unknown error trying to grab the exact platform from the built-in dictionary.
-              
-This shouldn't have happened, because in such event, the attempt at getting an unknown key value platform from the dictionary will throw a Python KeyError which is handled in code via an error message and the program should be exiting right then and there.
-              
-If you see this message, then you have found a bug.""")
-        sys.exit(-999)
+    if args.config_workers < 1:
+        print("ERROR: The number of config workers must be at least 1", file=sys.stderr)
+        sys.exit(-1)
 
-    # setup runner
-    # use default runner first
-    # if available use arg provided runner
-    # test if runner is known for this platform
-    runner = platform.default_runner
-    arg_runner = args.runner
-    if arg_runner:
-        if arg_runner not in platform.runners:
-            print(ARG_ERR_MSG.format(selection = "runner", arg = arg_runner))
-            sys.exit(-1)
-        runner = arg_runner
+    if args.prepare_workers < 1 or args.queue_size < 1:
+        print("ERROR: The number of prepare workers and the queue size must be at least 1", file=sys.stderr)
+        sys.exit(-1)
 
-    # setup core
-    # check if selected runner is libretro
-    # use default core first
-    # if available use arg provided core
-    # test if core is known for this platform
-    core = None
-    if runner == 'libretro':
-        core = platform.default_core
-        arg_core = args.core
-        if arg_core:
-            if arg_core not in platform.cores:
-                print(ARG_ERR_MSG.format(selection = "core", arg = arg_core))
-            core = arg_core
-    
-    # Lutris SQLite db
-    if os.path.isfile(args.lutris_database):
-        conn = sqlite3.connect(args.lutris_database)
-        cur = conn.cursor()
+    if args.scan_workers < 1:
+        print("ERROR: The number of scan workers must be at least 1", file=sys.stderr)
+        sys.exit(-1)
+
+    if args.processes is not None and args.processes < 0:
+        print("ERROR: The number of processes can't be negative", file=sys.stderr)
+        sys.exit(-1)
+
+    if args.hash_workers is not None and args.hash_workers < 1:
+        print("ERROR: The number of hash workers must be at least 1", file=sys.stderr)
+        sys.exit(-1)
+
+    # the JSON Lines are a dry run too
+    if args.jsonl:
+        args.no_write = True
+
+    # the manifest remembers what the moved files were like
+    if args.detect_moves:
+        args.incremental = True
+
+    if args.resume is not None and args.no_write:
+        print("ERROR: A dry run can't resume an import run", file=sys.stderr)
+        sys.exit(-1)
+
+    # rolling back only needs the journal and the database
+    if args.rollback is not None:
+        from lutris_bulk_adder.importer import rollback_import
+        rollback_import(args, args.rollback)
+        sys.exit(0)
+
+    # every directory to import is a job, either
+    # the one from the command line, or every entry
+    # of the library file, all imported in one run
+    if args.library:
+        from lutris_bulk_adder.library import load_library
+        try:
+            entries = load_library(args.library)
+        except (OSError, ValueError) as err:
+            print("ERROR: Couldn't read the library file {}: {}".format(args.library, err), file=sys.stderr)
+            sys.exit(-1)
+        jobs = [make_job(args, entry, "entry {} of {}".format(number, args.library))
+                for number, entry in enumerate(entries, start=1)]
     else:
-        print("Error opening database {}".format(args.lutris_database))
-        sys.exit(1)
+        # Ensure platform and directory is supplied from arguments
+        if not args.platform or not args.directory:
+            print("ERROR: Missing {} argument inputs; they are required for this script to function"
+                  .format("platform and directory" if not args.platform and not args.directory else ("platform" if not args.platform else "directory")),
+                  file=sys.stderr)
+            sys.exit(-1)
+        jobs = [make_job(args, {'platform': args.platform, 'directory': args.directory})]
 
-    # Get max game ID to increment from
-    try:
-        cur.execute("select max(id) from games")
-    except sqlite3.OperationalError:
-        print("SQLite error, is {} a valid Lutris database?".format(args.lutris_database))
-        sys.exit(1)
-
-    # credit to @ronicaltech for this patch
-    # link to pr on original repo: https://github.com/hwangeug/lutris-bulk-adder/pull/4
-    new_id = cur.fetchone()[0]
-    if new_id is None:
-        new_id = 0
-
-    game_id = new_id + 1
-    
-    # Scan dir for ROMs
-    files = scan_for_filetypes(dir, args.file_types)
-    for file in files:
-        ts = int(datetime.now(timezone.utc).timestamp())
-
-        # Generate game name and slug from filename
-        game = re.sub(r"\..*", "", os.path.basename(file))  # Strip extension
-        for token in args.strip_filename:
-            game = game.replace(token, "")                  # Strip tokens
-
-        # credit to @ronicaltech for this patch
-        # link to pr on his own repo: https://github.com/ronicaltech/lutris-bulk-adder/pull/2
-        # small fix by @speedrunhunter:
-        # regex string was missing the prefixed 'r' character
-        # which would result in a warning at script runtime
-        game = re.sub(r"\(.*?\)|\[.*?\]","",game)            # Strip any textin () or []
-
-        game = re.sub(r"\s+", " ", game).strip(" ")         # Remove excess whitespace
-
-        slug = re.sub(r"[^0-9A-Za-z']", " ", game)          # Split on nonword characters
-        slug = slug.replace("'", "")                        # Strip apostrophe
-        slug = re.sub(r"\s+", "-", slug).strip("-").lower() # Replace whitespace with dashes
-
-        # Data for YML file
-        config_file = '{slug}-{ts}'.format(slug=slug, ts=ts)
-        config_file_path = os.path.join(args.lutris_yml_dir, "{}.yml".format(config_file))
-        config = {
-            "game": {
-                "main_file": file
-            },
-        }
-        
-        if core:
-            config['game']['core'] = core
-
-        if args.game_options is not None:
-            config['game'].update(args.game_options)
-
-        # Data for Lutris DB
-        values = {
-            "id": game_id,
-            "name": game,
-            "sortname": None,
-            "slug": slug,
-            "installer_slug": None,
-            "parent_slug": None,
-            "platform": arg_platform,
-            "runner": runner,
-            "executable": None,
-            "directory": args.lutris_game_dir,
-            "updated": None,
-            "lastplayed": 0,
-            "installed": 1,
-            "installed_at": ts,
-            "year": None,
-            "configpath": config_file,
-            "has_custom_banner": None,
-            "has_custom_icon": None,
-            "has_custom_coverart_big": None,
-            "playtime": None,
-            "service": None,
-            "service_id": None,
-            "discord_id": None
-        }
-
-        # Output to console
-        if args.no_write:
-            print("file: {}".format(file))
-            print("SQLite:\n{}".format(values)),
-            print("YML at {ymlfile}:\n{config}\n".format(ymlfile=config_file_path,
-                                                         config=yaml.dump(config, default_flow_style=False)))
-        
-        # Write to DB/filesystem
-        else:
-            with open(config_file_path, 'w') as f:
-                yaml.dump(config, f, default_flow_style=False)
-            
-            query = "INSERT INTO games ({columns}) VALUES ({placeholders})".format(
-                columns = ','.join(values.keys()),
-                placeholders = ','.join('?' * len(values))
-            )
-
-            cur.execute(query, list(values.values()))
-            conn.commit()
-
-        game_id += 1
+    from lutris_bulk_adder.importer import run_import
+    run_import(args, jobs)
         
-    print("Success? Check on Lutris now")
+    print("Success? Check on Lutris now", file=sys.stderr if args.jsonl == '-' else sys.stdout)
 
 
 if __name__ == '__main__':
@@ -0,0 +1,147 @@
+import os
+import sqlite3
+import time
+
+from lutris_bulk_adder.constants import DEFAULT_MANIFEST_NAME
+
+ADDED = 'added'
+CHANGED = 'changed'
+
+
+def default_manifest_path(lutris_database: str):
+    """Returns the default location of the scan manifest for a given Lutris database.
+
+    Args:
+        lutris_database: Path to the Lutris SQLite database.
+
+    Returns:
+        The path of the manifest database in the same directory.
+    """
+
+    return os.path.join(os.path.dirname(os.path.abspath(lutris_database)), DEFAULT_MANIFEST_NAME)
+
+
+class ScanManifest():
+    """A persistent record of every file that was successfully imported, stored in a small SQLite side database.
+
+    Note:
+        The whole manifest is read into memory once when it's opened, so checking a file costs one `stat` call and a dictionary lookup instead of a query per file.
+        Files are only written back into the manifest with `commit`, which should be called after the games were written to Lutris, so a failed import is simply retried on the next run.
+        Files are kept by their absolute path, so a directory given as a relative path matches the same entries as the absolute one, and the game configs, whose `main_file` is absolute.
+
+    Attributes:
+        path: Path to the manifest database.
+        skipped: Number of checked files that are unchanged since the last import.
+        added: Number of checked files that weren't imported before.
+        changed: Number of checked files that were imported before, but changed since.
+    """
+    path: str
+    skipped: int = 0
+    added: int = 0
+    changed: int = 0
+
+    def __init__(self, path: str):
+        """Open (and if needed create) the manifest database and load its entries.
+
+        Args:
+            path: Path to the manifest database.
+
+        Raises:
+            sqlite3.Error: If the manifest can't be opened or isn't a valid manifest database.
+        """
+
+        self.path = path
+        self.skipped = 0
+        self.added = 0
+        self.changed = 0
+
+        self.conn = sqlite3.connect(path)
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS files (
+                path TEXT PRIMARY KEY,
+                size INTEGER NOT NULL,
+                mtime_ns INTEGER NOT NULL,
+                inode INTEGER NOT NULL,
+                imported_at INTEGER NOT NULL
+            )""")
+        self.conn.commit()
+
+        # manifests written before the paths were made absolute
+        # can have relative ones, those were relative to where
+        # the import was started, just like they are now
+        self._entries = {
+            os.path.abspath(path): (size, mtime_ns, inode)
+            for path, size, mtime_ns, inode in self.conn.execute("SELECT path, size, mtime_ns, inode FROM files")
+        }
+        self._pending: dict[str, tuple[int, int, int]] = {}
+
+    def check(self, path: str):
+        """Checks whether a file has to be imported, and remembers its current state for the next `commit`.
+
+        Args:
+            path: Path of the file to check.
+
+        Returns:
+            ADDED or CHANGED if the file needs to be imported, None if it is unchanged since the last import.
+
+        Raises:
+            OSError: If the file can't be stat'ed.
+        """
+
+        path = os.path.abspath(path)
+        stat = os.stat(path)
+        state = (stat.st_size, stat.st_mtime_ns, stat.st_ino)
+        previous = self._entries.get(path)
+
+        if previous == state:
+            self.skipped += 1
+            return None
+
+        self._pending[path] = state
+        if previous is None:
+            self.added += 1
+            return ADDED
+        self.changed += 1
+        return CHANGED
+
+    def recorded(self, path: str):
+        """Looks up what the manifest remembers of a file from the last import, even if it's gone since.
+
+        Args:
+            path: Path of the file.
+
+        Returns:
+            A tuple of the size, the modification time in nanoseconds and the inode, or None if the file wasn't imported before.
+        """
+
+        return self._entries.get(os.path.abspath(path))
+
+    def commit(self, paths = None):
+        """Writes the state of checked files into the manifest in one transaction.
+
+        Args:
+            paths (optional): The paths to commit. Defaults to every file that was checked and not committed yet.
+        """
+
+        if paths is None:
+            paths = list(self._pending)
+        else:
+            paths = [os.path.abspath(path) for path in paths]
+
+        now = int(time.time())
+        rows = []
+        for path in paths:
+            state = self._pending.pop(path, None)
+            if state is None:
+                continue
+            self._entries[path] = state
+            rows.append((path, *state, now))
+
+        if rows:
+            with self.conn:
+                self.conn.executemany("INSERT OR REPLACE INTO files (path, size, mtime_ns, inode, imported_at) VALUES (?, ?, ?, ?, ?)", rows)
+
+    def close(self):
+        """Closes the manifest database without committing anything that is still pending."""
+
+        self.conn.close()
@@ -0,0 +1,175 @@
+import os
+from collections import namedtuple
+
+import yaml
+
+from lutris_bulk_adder.classes import ImportJob
+from lutris_bulk_adder.config import dump_config
+from lutris_bulk_adder.hashing import HashCache, hash_file
+from lutris_bulk_adder.manifest import ScanManifest
+from lutris_bulk_adder.sync import SyncedGame, ConfigLoader
+
+# The strongest digest the hash cache has for a file is the one compared
+MOVE_HASH_ALGORITHMS = ('sha1', 'md5', 'crc32')
+
+# A game whose ROM moved from `game.main_file` to `file`, found
+# by the inode (`by` is 'inode') or by the contents ('hash')
+MovedGame = namedtuple('MovedGame', ['game', 'job', 'file', 'by'])
+
+
+def moved_config(config_path: str, main_file: str):
+    """Renders the config of a game with its `main_file` pointing somewhere else, keeping everything else in it.
+
+    Args:
+        config_path: Path of the YML config file of the game.
+        main_file: The new path of the ROM file.
+
+    Returns:
+        The new contents of the config file, or None if it can't be read.
+    """
+
+    try:
+        with open(config_path, encoding='utf-8') as f:
+            config = yaml.load(f, Loader=ConfigLoader)
+    except (OSError, UnicodeDecodeError, yaml.YAMLError):
+        return None
+    if not isinstance(config, dict) or not isinstance(config.get('game'), dict):
+        return None
+    config['game']['main_file'] = main_file
+    return dump_config(config)
+
+
+class MoveDetector():
+    """Tells ROMs that were moved or renamed apart from new ones, so their games can be pointed to the new path instead of imported again.
+
+    Note:
+        A moved file looks like a new file at the new path, and a vanished one at the old path. Which files vanished is only known once the scan is done, so the new files that could be a moved one (there's a game whose ROM had the same size) are held back during the scan, and matched at the end:
+        first by their inode, size and modification time, which a rename or a move within the same filesystem keeps, then by their contents, which takes the digests of the vanished file from the hash cache, so it only works for files that were hashed by an earlier import (with -H or --dat).
+        What a file looked like when it was imported comes from the scan manifest, so games imported without --incremental can't be matched.
+        Every vanished file is matched to one new file at most. The held back files that weren't matched are imported as usual.
+
+    Attributes:
+        games: The games in the scanned directories, by the absolute path of their ROM.
+        moved: The games found to be moved, once `resolve` was called.
+        held: The number of files held back during the scan.
+    """
+    games: dict[str, SyncedGame]
+    moved: list[MovedGame]
+    held: int = 0
+
+    def __init__(self, games: dict[str, SyncedGame], manifest: ScanManifest, hash_cache: HashCache | None = None):
+        """Index what the manifest remembers of the ROMs of the games.
+
+        Args:
+            games: The games in the scanned directories, by the absolute path of their ROM, see `sync.load_main_files`.
+            manifest: The scan manifest of the earlier imports.
+            hash_cache (optional): The hash cache to take the digests of the vanished files from.
+        """
+
+        self.games = games
+        self.moved = []
+        self.held = 0
+        self._hash_cache = hash_cache
+        self._held: list[tuple[ImportJob, str, os.stat_result]] = []
+
+        # (inode, size, mtime_ns) -> path, and size -> paths
+        self._recorded = {}
+        self._by_inode = {}
+        self._by_size = {}
+        for path in games:
+            state = manifest.recorded(path)
+            if state is None:
+                continue
+            size, mtime_ns, inode = state
+            self._recorded[path] = state
+            self._by_inode[(inode, size, mtime_ns)] = path
+            self._by_size.setdefault(size, []).append(path)
+
+    def hold(self, job: ImportJob, file: str):
+        """Holds back a new file during the scan if it could be a moved one.
+
+        Args:
+            job: The directory the file was found in.
+            file: Path of the new file.
+
+        Returns:
+            True if the file was held back until `resolve`, False if it can be imported right away.
+        """
+
+        if not self._by_size:
+            return False
+        try:
+            stat = os.stat(file)
+        except OSError:
+            return False
+        if stat.st_size not in self._by_size:
+            return False
+        self._held.append((job, file, stat))
+        self.held += 1
+        return True
+
+    def _digests(self, path: str):
+        """The strongest cached digest of a vanished file, as an (algorithm, digest) tuple, or None."""
+
+        if self._hash_cache is None:
+            return None
+        size, mtime_ns, inode = self._recorded[path]
+        digests = self._hash_cache.find(inode, size, mtime_ns)
+        if not digests:
+            return None
+        for algorithm in MOVE_HASH_ALGORITHMS:
+            if digests.get(algorithm):
+                return algorithm, digests[algorithm]
+        return None
+
+    def resolve(self, scanned: set[str]):
+        """Matches the held back files with the ROMs that vanished, once the scan is done.
+
+        Args:
+            scanned: The absolute paths of all the files found by the scan.
+
+        Returns:
+            The held back files that aren't a moved ROM, as (job, file) tuples, to be imported as usual. The moved ones are put in `moved`.
+        """
+
+        vanished = self._recorded.keys() - scanned
+        unmatched = []
+        by_hash = []
+
+        # a rename keeps the inode, which costs nothing to compare
+        for job, file, stat in self._held:
+            path = self._by_inode.get((stat.st_ino, stat.st_size, stat.st_mtime_ns))
+            if path in vanished and not os.path.lexists(path):
+                vanished.discard(path)
+                self.moved.append(MovedGame(self.games[path], job, file, 'inode'))
+            else:
+                by_hash.append((job, file, stat))
+
+        # a copy to another disk only keeps the contents,
+        # so the file is hashed if a vanished ROM of
+        # the same size has its digests in the cache
+        for job, file, stat in by_hash:
+            candidates = [(path, self._digests(path)) for path in self._by_size[stat.st_size] if path in vanished]
+            candidates = [(path, digest) for path, digest in candidates if digest and not os.path.lexists(path)]
+            match = None
+            if candidates:
+                digests = {}
+                for path, (algorithm, digest) in candidates:
+                    if algorithm not in digests:
+                        try:
+                            digests.update(hash_file(file, [algorithm]))
+                        except OSError:
+                            break
+                    if digests.get(algorithm) == digest:
+                        match = path
+                        break
+                if digests:
+                    self._hash_cache.put(HashCache.key(stat), digests)
+            if match:
+                vanished.discard(match)
+                self.moved.append(MovedGame(self.games[match], job, file, 'hash'))
+            else:
+                unmatched.append((job, file))
+
+        self._held = []
+        return unmatched
@@ -0,0 +1,110 @@
+import re
+import os
+from functools import lru_cache
+
+# How many distinct stems are remembered per normalizer.
+# Multi-disc sets and the same game across regions
+# share stems, so repeats are common in big libraries
+DEFAULT_CACHE_SIZE = 65536
+
+# credit to @ronicaltech for the bracket stripping
+# link to pr on his own repo: https://github.com/ronicaltech/lutris-bulk-adder/pull/2
+# small fix by @speedrunhunter:
+# regex string was missing the prefixed 'r' character
+# which would result in a warning at script runtime
+BRACKETS_RE = re.compile(r"\(.*?\)|\[.*?\]")     # Any text in () or []
+WHITESPACE_RE = re.compile(r"\s+")               # Runs of whitespace
+SLUG_SEPARATOR_RE = re.compile(r"[^0-9A-Za-z]+") # Runs of nonword characters
+
+# apostrophes are dropped from slugs instead of splitting on them
+APOSTROPHE_TABLE = str.maketrans('', '', "'")
+
+
+def filename_stem(path: str):
+    """Returns the part of a file name before its first dot, which is what game names are generated from.
+
+    Args:
+        path: Path or name of the file.
+
+    Returns:
+        The file name without any extensions.
+    """
+
+    return os.path.basename(path).split('.', 1)[0]
+
+
+class Normalizer():
+    """Turns file name stems (or names from a DAT) into game names and slugs.
+
+    Note:
+        Every rule is compiled once when the normalizer is created, and the slug is built with a translation table and a single substitution.
+        The user supplied strip tokens are removed one after the other in the order they were given, so overlapping tokens behave exactly like they always did.
+        Results are memoized, so a stem that shows up again, like the discs of a multi-disc set, is only normalized once.
+
+    Attributes:
+        strip_tokens: The strings removed from every stem before anything else.
+    """
+    strip_tokens: list[str]
+
+    def __init__(self, strip_tokens: list[str] | None = None, cache_size: int | None = DEFAULT_CACHE_SIZE):
+        """Compile the rules of the normalizer.
+
+        Args:
+            strip_tokens (optional): Strings to remove from every stem, e.g. `(USA)`.
+            cache_size (optional): How many results to memoize. None means no limit, 0 turns memoizing off.
+        """
+
+        self.strip_tokens = list(strip_tokens or [])
+
+        # tokens are not joined into one pattern: removing one token
+        # can change what a later one matches, so the order counts.
+        # empty tokens would not remove anything anyway
+        self._strip_tokens = tuple(token for token in self.strip_tokens if token)
+
+        if cache_size == 0:
+            self.normalize = self._normalize
+        else:
+            self.normalize = lru_cache(maxsize=cache_size)(self._normalize)
+
+    def _normalize(self, stem: str):
+        """Normalizes a single stem, see `normalize`."""
+
+        game = stem
+        for token in self._strip_tokens:
+            game = game.replace(token, '')                   # Strip tokens
+        game = BRACKETS_RE.sub('', game)                     # Strip any text in () or []
+        game = WHITESPACE_RE.sub(' ', game).strip(' ')       # Remove excess whitespace
+
+        slug = game.translate(APOSTROPHE_TABLE)              # Strip apostrophe
+        slug = SLUG_SEPARATOR_RE.sub('-', slug).strip('-').lower() # Replace nonword characters with dashes
+
+        return game, slug
+
+    # replaced by the memoized version in __init__,
+    # defined here for the sake of the docstring
+    def normalize(self, stem: str):
+        """Generates the game name and slug for a stem.
+
+        Args:
+            stem: A file name without extensions, or a game name from a DAT.
+
+        Returns:
+            A tuple of the game name and its slug.
+        """
+
+        return self._normalize(stem)
+
+    def normalize_many(self, stems: list[str]):
+        """Generates the game names and slugs for a whole list of stems at once, normalizing every distinct stem only once.
+
+        Args:
+            stems: File names without extensions, or game names from a DAT.
+
+        Returns:
+            A list of (game name, slug) tuples in the same order as the stems.
+        """
+
+        results = {stem: None for stem in stems}
+        for stem in results:
+            results[stem] = self.normalize(stem)
+        return [results[stem] for stem in stems]
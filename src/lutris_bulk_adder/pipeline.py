@@ -0,0 +1,227 @@
+import queue
+import threading
+from collections.abc import Callable, Iterable, Iterator
+
+from lutris_bulk_adder.constants import DEFAULT_QUEUE_SIZE
+
+# how often a blocked worker looks up from its queue
+# to check whether the pipeline was stopped in the meantime
+_POLL_INTERVAL = 0.1
+
+# marks the end of the stream in a queue
+_DONE = object()
+
+
+class _Stopped(Exception):
+    """Raised inside the threads of a pipeline once it's been stopped."""
+
+
+class Stage():
+    """A step of a pipeline, run by one or more threads.
+
+    Attributes:
+        name: The name of the stage, for reporting.
+        func: Called with every item. Returns the item for the next stage, or None to drop it.
+        workers: The number of threads running the stage.
+        processed: The number of items the stage has been called with.
+        dropped: The number of items the stage returned None for.
+    """
+    name: str
+    func: Callable
+    workers: int
+    processed: int = 0
+    dropped: int = 0
+
+    def __init__(self, name: str, func: Callable, workers: int = 1):
+        if workers < 1:
+            raise ValueError("The number of workers of the {} stage must be at least 1, got {}".format(name, workers))
+
+        self.name = name
+        self.func = func
+        self.workers = workers
+        self.processed = 0
+        self.dropped = 0
+
+
+class Pipeline():
+    """A chain of stages connected by bounded queues, each stage running in its own threads.
+
+    Note:
+        Every stage works on an item as soon as the stage before it is done with it, so for example scanning, hashing and writing overlap instead of running one after the other.
+        The queues between the stages are bounded, so a fast stage can only run a little ahead of a slow one, and the number of items held in memory stays the same no matter how many items go through.
+        The items come out of the last stage in the thread iterating the pipeline, which makes it the place for work that has to stay in one thread, like writing to SQLite. The order of the items isn't kept once a stage has more than one worker.
+        If a stage raises an exception, the whole pipeline is stopped and the exception is raised again to whoever iterates it.
+
+    Attributes:
+        source: The items fed into the first stage. Iterated in a thread of its own.
+        queue_size: The number of items each queue holds at most.
+        stages: The stages in order.
+        fed: The number of items taken from the source so far.
+        exhausted: Whether every item of the source has been taken, so `fed` is the total.
+        consumed: The number of items that came out of the last stage.
+    """
+    source: Iterable
+    queue_size: int
+    stages: list[Stage]
+    fed: int = 0
+    exhausted: bool = False
+    consumed: int = 0
+
+    def __init__(self, source: Iterable, queue_size: int = DEFAULT_QUEUE_SIZE):
+        """Initialize an empty pipeline.
+
+        Args:
+            source: The items fed into the first stage.
+            queue_size (optional): The number of items each queue holds at most. Default 256.
+        """
+
+        if queue_size < 1:
+            raise ValueError("The queue size must be at least 1, got {}".format(queue_size))
+
+        self.source = source
+        self.queue_size = queue_size
+        self.stages = []
+        self.fed = 0
+        self.exhausted = False
+        self.consumed = 0
+
+        self._stop = threading.Event()
+        self._error = None
+        self._lock = threading.Lock()
+
+    def add_stage(self, name: str, func: Callable, workers: int = 1):
+        """Appends a stage to the pipeline.
+
+        Args:
+            name: The name of the stage, for reporting.
+            func: Called with every item. Returns the item for the next stage, or None to drop it. Has to be thread-safe if there is more than one worker.
+            workers (optional): The number of threads running the stage. Default 1.
+
+        Returns:
+            The pipeline itself, so calls can be chained.
+        """
+
+        self.stages.append(Stage(name, func, workers))
+        return self
+
+    def _get(self, inbox: queue.Queue):
+        while True:
+            if self._stop.is_set():
+                raise _Stopped()
+            try:
+                return inbox.get(timeout=_POLL_INTERVAL)
+            except queue.Empty:
+                pass
+
+    def _put(self, outbox: queue.Queue, item):
+        while True:
+            if self._stop.is_set():
+                raise _Stopped()
+            try:
+                return outbox.put(item, timeout=_POLL_INTERVAL)
+            except queue.Full:
+                pass
+
+    def _fail(self, error: BaseException):
+        with self._lock:
+            if self._error is None:
+                self._error = error
+        self._stop.set()
+
+    def _feed(self, outbox: queue.Queue):
+        """Runs in the source thread, putting the source items into the first queue."""
+
+        try:
+            for item in self.source:
+                self._put(outbox, item)
+                # only ever written by this thread, so no lock needed
+                self.fed += 1
+            self.exhausted = True
+            self._put(outbox, _DONE)
+        except _Stopped:
+            pass
+        except BaseException as err:
+            self._fail(err)
+        finally:
+            # a generator source, like a directory scan,
+            # gets the chance to clean up after itself
+            close = getattr(self.source, 'close', None)
+            if close:
+                close()
+
+    def _work(self, stage: Stage, inbox: queue.Queue, outbox: queue.Queue, remaining: list[int]):
+        """Runs in the threads of a stage, taking items from the inbox and putting the results into the outbox."""
+
+        try:
+            while True:
+                item = self._get(inbox)
+                if item is _DONE:
+                    # let the other workers of the stage know too
+                    self._put(inbox, _DONE)
+                    break
+
+                with self._lock:
+                    stage.processed += 1
+                result = stage.func(item)
+                if result is not None:
+                    self._put(outbox, result)
+                else:
+                    with self._lock:
+                        stage.dropped += 1
+
+            # the last worker of a stage to finish
+            # tells the next stage that the stream is over
+            with self._lock:
+                remaining[0] -= 1
+                last = remaining[0] == 0
+            if last:
+                self._put(outbox, _DONE)
+        except _Stopped:
+            pass
+        except BaseException as err:
+            self._fail(err)
+
+    def completed(self):
+        """The number of items that are done with, because they came out of the last stage, or a stage dropped them on the way."""
+
+        return self.consumed + sum(stage.dropped for stage in self.stages)
+
+    def __iter__(self) -> Iterator:
+        """Starts the threads of the pipeline and yields the items coming out of the last stage.
+
+        Raises:
+            Exception: Whatever exception a stage or the source raised.
+        """
+
+        queues = [queue.Queue(maxsize=self.queue_size) for _ in range(len(self.stages) + 1)]
+        threads = [threading.Thread(target=self._feed, args=(queues[0],), name='pipeline-source', daemon=True)]
+        for index, stage in enumerate(self.stages):
+            remaining = [stage.workers]
+            for worker in range(stage.workers):
+                threads.append(threading.Thread(
+                    target=self._work, args=(stage, queues[index], queues[index + 1], remaining),
+                    name='pipeline-{}-{}'.format(stage.name, worker), daemon=True))
+
+        for thread in threads:
+            thread.start()
+
+        try:
+            while True:
+                try:
+                    item = self._get(queues[-1])
+                except _Stopped:
+                    break
+                if item is _DONE:
+                    break
+                yield item
+                # counted once the consumer is done with the item
+                self.consumed += 1
+        finally:
+            # stops the threads if the consumer
+            # gave up early or ran into an error
+            self._stop.set()
+            for thread in threads:
+                thread.join()
+
+        if self._error is not None:
+            raise self._error
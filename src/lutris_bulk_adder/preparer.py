@@ -0,0 +1,281 @@
+import os
+import threading
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+
+from lutris_bulk_adder.classes import ImportJob
+from lutris_bulk_adder.hashing import HashCache, hash_file
+from lutris_bulk_adder.dat import DatIndex
+from lutris_bulk_adder.normalize import Normalizer, filename_stem
+from lutris_bulk_adder.detect import PlatformDetector
+from lutris_bulk_adder.archive import is_archive, read_archive, main_member, member_digests
+from lutris_bulk_adder.profiling import StageProfiler
+from lutris_bulk_adder.constants import PLATFORMS, AUTO_PLATFORM
+
+# What's known about a ROM file before it's checked against the Lutris database.
+# platform is None if it couldn't be detected, sniffed tells whether its header
+# had to be read for that, dat_named whether the name came from a DAT, and
+# hashed how many bytes were read to hash it
+PreparedGame = namedtuple('PreparedGame', ['platform', 'runner', 'core', 'digests', 'size', 'name', 'slug',
+                                           'sniffed', 'dat_named', 'hashed'])
+
+
+def platform_runner(platform: str, runner: str | None, core: str | None):
+    """Picks the runner and core for a detected platform.
+
+    Args:
+        platform: The platform name, a key of the PLATFORMS dictionary.
+        runner: The runner asked for, used if the platform has it.
+        core: The libretro core asked for, used if the platform has it and the runner is libretro.
+
+    Returns:
+        A tuple of the runner and the core, which is None unless the runner is libretro.
+    """
+
+    data = PLATFORMS[platform]
+    runner = runner if runner in data.runners else data.default_runner
+    if runner != 'libretro':
+        return runner, None
+    return runner, core if core in (data.cores or []) else data.default_core
+
+
+class GamePreparer():
+    """Works out everything about a ROM file that doesn't need the Lutris database: its platform, checksums, size and name.
+
+    Note:
+        This is the part of the import that keeps the CPU busy, so it can run in the threads of the pipeline, or in a `PreparePool` of processes, with a preparer of its own in every process.
+        Archives are looked into for the ROM inside, its CRC32 and size are read from the table of contents.
+
+    Attributes:
+        jobs: The directories of the import.
+        hashing: Whether the files are hashed for the run, so archives are looked into for their checksums.
+        hash_algorithms: If given, files that come without digests are hashed right here, with these algorithms.
+        dat_index: The DAT index to name the games from, if any.
+        detector: The platform detector, if a job has its platform detected.
+    """
+    jobs: list[ImportJob]
+    hashing: bool
+    hash_algorithms: list[str] | None
+    dat_index: DatIndex | None
+    detector: PlatformDetector | None
+
+    def __init__(
+            self, jobs: list[ImportJob], hashing: bool = False, hash_algorithms: list[str] | None = None,
+            dat_index: DatIndex | None = None, profiler: StageProfiler | None = None
+    ):
+        """Initialize the preparer, compiling the name rules of every job.
+
+        Args:
+            jobs: The directories of the import.
+            hashing (optional): Whether the files are hashed for the run. Default False.
+            hash_algorithms (optional): Hash files that come without digests with these algorithms. By default files are expected to be hashed already, by the hash stage of the pipeline.
+            dat_index (optional): The DAT index to name the games from.
+            profiler (optional): The profiler to measure the detection, the DAT lookups and the name generation with.
+        """
+
+        profiler = profiler or StageProfiler()
+        self.jobs = jobs
+        self.hashing = hashing
+        self.hash_algorithms = hash_algorithms
+        self.dat_index = dat_index
+
+        # all the name rules are compiled once up front
+        self._normalizers = {job: profiler.timed('name', Normalizer(job.strip_filename).normalize) for job in jobs}
+        self._find_dat_name = profiler.timed('dat', dat_index.find) if dat_index else None
+
+        # only needed if a platform has to be detected
+        self.detector = None
+        if any(job.platform == AUTO_PLATFORM for job in jobs):
+            self.detector = PlatformDetector(PLATFORMS)
+            self._detect_platform = profiler.timed('detect', self.detector.detect)
+
+    def prepare(self, job: ImportJob, file: str, digests: dict | None = None):
+        """Prepares a ROM file for the import.
+
+        Args:
+            job: The directory the file was found in.
+            file: Path of the file.
+            digests (optional): The checksums of the file, if it's been hashed already.
+
+        Returns:
+            A PreparedGame. Its platform is None if it couldn't be detected, then the file should be left out. Its digests are None if the file couldn't be read.
+        """
+
+        size = None
+        hashed = 0
+
+        # look into archives for the name, size and CRC32 of the ROM,
+        # only the table of contents is read, nothing is extracted
+        member = None
+        if (self.hashing or job.platform == AUTO_PLATFORM) and is_archive(file):
+            try:
+                member = main_member(read_archive(file))
+            except (OSError, ValueError):
+                member = None
+            if member:
+                digests = member_digests(member)
+                size = member.size
+        elif self.hash_algorithms and digests is None and not is_archive(file):
+            # a file that vanished or can't be read since the scan
+            # goes on without its checksums, like it does when
+            # it's hashed by the hash stage of the pipeline
+            try:
+                digests = hash_file(file, self.hash_algorithms)
+                if digests:
+                    size = os.path.getsize(file)
+                    hashed = size
+            except OSError:
+                digests = None
+
+        # find out which platform the file is for,
+        # and drop it if that can't be told
+        platform, runner, core = job.platform, job.runner, job.core
+        sniffed = False
+        if platform == AUTO_PLATFORM:
+            # only exact if the preparer isn't shared between threads,
+            # like in the processes of a PreparePool
+            before = self.detector.sniffed
+            platform = self._detect_platform(file, member)
+            sniffed = self.detector.sniffed != before
+            if platform is None:
+                return PreparedGame(None, None, None, digests, size, None, None, sniffed, False, hashed)
+            runner, core = platform_runner(platform, runner, core)
+
+        # Generate game name and slug from the DAT entry if there is one
+        # otherwise from filename
+        if digests and size is None:
+            try:
+                size = os.path.getsize(file)
+            except OSError:
+                # only the CRC32 lookup in the DATs needs the size
+                size = None
+        dat_name = None
+        if self.dat_index and digests:
+            dat_name = self._find_dat_name(digests, size)
+
+        game, slug = self._normalizers[job](dat_name or filename_stem(file))
+        return PreparedGame(platform, runner, core, digests, size, game, slug, sniffed, dat_name is not None, hashed)
+
+
+# the preparer of a process of a PreparePool
+_worker_preparer = None
+
+
+def _init_worker(jobs: list[ImportJob], hashing: bool, hash_algorithms: list[str] | None,
+                 dat_index_path: str | None, dats: list[str] | None):
+    """Sets up the preparer of a process of a PreparePool."""
+
+    global _worker_preparer
+    # the DATs are already indexed by the main process,
+    # so opening the index only checks they didn't change
+    dat_index = DatIndex(dat_index_path, dats) if dat_index_path else None
+    _worker_preparer = GamePreparer(jobs, hashing, hash_algorithms, dat_index)
+
+
+def _prepare_in_worker(job_number: int, file: str, digests: dict | None):
+    return _worker_preparer.prepare(_worker_preparer.jobs[job_number], file, digests)
+
+
+class PreparePool():
+    """Prepares ROM files in a pool of processes, so hashing, header sniffing and name generation use every core.
+
+    Note:
+        Every process has a GamePreparer of its own, with its own connection to the DAT index. Only the job number, the path and the digests go to a process, and the PreparedGame comes back, so the records are small to send.
+        The hash cache stays in the calling process: cached digests are looked up before a file is sent off, and new ones stored when they come back.
+        Everything that touches the Lutris database stays with the caller, so there's still only a single writer.
+        `prepare` blocks until the file is done, so it's meant to be called from several threads at once, like the workers of a pipeline stage, to keep the processes busy.
+
+    Attributes:
+        workers: The number of processes.
+        cache: The hash cache, if any.
+        detecting: Whether platforms are detected.
+        sniffed: The number of files whose header had to be read to detect their platform.
+        unknown: The number of files no platform was found for.
+        dat_hits: The number of games named from a DAT.
+        bytes_hashed: The number of bytes hashed by the processes.
+    """
+    workers: int
+    cache: HashCache | None
+    detecting: bool
+    sniffed: int = 0
+    unknown: int = 0
+    dat_hits: int = 0
+    bytes_hashed: int = 0
+
+    def __init__(
+            self, jobs: list[ImportJob], workers: int, hashing: bool = False, hash_algorithms: list[str] | None = None,
+            cache: HashCache | None = None, dat_index: DatIndex | None = None, dats: list[str] | None = None
+    ):
+        """Start the processes of the pool.
+
+        Args:
+            jobs: The directories of the import.
+            workers: The number of processes.
+            hashing (optional): Whether the files are hashed. Default False.
+            hash_algorithms (optional): The algorithms to hash the files with, if hashing.
+            cache (optional): The hash cache to look the digests up in and store them into.
+            dat_index (optional): The DAT index to name the games from. The processes open it again on their own.
+            dats (optional): The DAT files the index was opened with.
+
+        Raises:
+            concurrent.futures.process.BrokenProcessPool: If the processes couldn't be set up, e.g. because the DAT index can't be opened.
+        """
+
+        if workers < 1:
+            raise ValueError("The number of processes must be at least 1, got {}".format(workers))
+
+        self.workers = workers
+        self.cache = cache
+        self.detecting = any(job.platform == AUTO_PLATFORM for job in jobs)
+        self.sniffed = 0
+        self.unknown = 0
+        self.dat_hits = 0
+        self.bytes_hashed = 0
+        self._hash_algorithms = hash_algorithms if hashing else None
+        self._job_numbers = {job: number for number, job in enumerate(jobs)}
+        self._lock = threading.Lock()
+
+        self._executor = ProcessPoolExecutor(
+            max_workers=workers, initializer=_init_worker,
+            initargs=(jobs, hashing, self._hash_algorithms, dat_index.path if dat_index else None, dats))
+        # the processes are started right away from this thread,
+        # before the pipeline starts threads of its own
+        self._executor.submit(int).result()
+
+    def prepare(self, job: ImportJob, file: str, digests: dict | None = None):
+        """Prepares a ROM file in one of the processes. Blocks until it's done.
+
+        Args:
+            job: The directory the file was found in, one of the jobs the pool was started with.
+            file: Path of the file.
+            digests (optional): The checksums of the file, if it's been hashed already.
+
+        Returns:
+            A PreparedGame, see `GamePreparer.prepare`.
+        """
+
+        # cached digests save the process from reading the file
+        key = None
+        if self._hash_algorithms and self.cache is not None and digests is None and not is_archive(file):
+            try:
+                key = HashCache.key(os.stat(file))
+            except OSError:
+                key = None
+            if key is not None:
+                digests = self.cache.get(key, self._hash_algorithms)
+
+        game = self._executor.submit(_prepare_in_worker, self._job_numbers[job], file, digests).result()
+
+        if key is not None and game.hashed and game.digests:
+            self.cache.put(key, game.digests)
+        with self._lock:
+            self.sniffed += game.sniffed
+            self.unknown += game.platform is None
+            self.dat_hits += game.dat_named
+            self.bytes_hashed += game.hashed
+        return game
+
+    def close(self):
+        """Shuts down the processes."""
+
+        self._executor.shutdown(wait=True)
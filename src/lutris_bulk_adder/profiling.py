@@ -0,0 +1,204 @@
+import time
+import threading
+from collections.abc import Callable, Iterable
+
+
+class StageStats():
+    """What a stage of the import has been measured to do.
+
+    Attributes:
+        calls: The number of times the stage was called.
+        seconds: The time spent in the stage, summed up over all of its threads.
+        bytes: The number of bytes the stage read or wrote, if that's known.
+    """
+    __slots__ = ('calls', 'seconds', 'bytes')
+
+    def __init__(self):
+        self.calls = 0
+        self.seconds = 0.0
+        self.bytes = 0
+
+
+class StageProfiler():
+    """Measures the time, calls and bytes of the stages of an import, and optionally profiles them with cProfile.
+
+    Note:
+        The stages are measured by wrapping the functions that do their work, see `timed`. A disabled profiler hands the functions back unwrapped, so it costs nothing while the import runs.
+        The stages run at the same time in different threads, so the times of the stages add up to more than the time the import took. The time of a stage is what its threads spent working, not waiting.
+        cProfile only sees the thread it's enabled in, so every thread running a stage gets its own profile, and they're merged into one when the stats are dumped.
+
+    Attributes:
+        enabled: Whether the stages are measured at all.
+        pstats_path: The file the merged cProfile stats are written to, if any.
+        stages: The measurements, by stage name, in the order the stages were first seen.
+    """
+    enabled: bool
+    pstats_path: str | None
+    stages: dict[str, StageStats]
+
+    def __init__(self, enabled: bool = False, pstats_path: str | None = None):
+        """Initialize the profiler.
+
+        Args:
+            enabled (optional): Whether to measure the stages. Default False.
+            pstats_path (optional): Also profile the stages with cProfile, and write the stats to this file, to be read with `pstats` or a viewer like snakeviz. Enables the profiler.
+        """
+
+        self.enabled = enabled or pstats_path is not None
+        self.pstats_path = pstats_path
+        self.stages = {}
+
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._profiles = []
+        self._started = time.perf_counter()
+
+    def _stats(self, name: str):
+        stats = self.stages.get(name)
+        if stats is None:
+            with self._lock:
+                stats = self.stages.setdefault(name, StageStats())
+        return stats
+
+    def _profile(self):
+        """The cProfile profile of the calling thread, or None if it's already running further up the stack."""
+
+        if getattr(self._local, 'active', False):
+            return None
+        profile = getattr(self._local, 'profile', None)
+        if profile is None:
+            import cProfile
+            profile = self._local.profile = cProfile.Profile()
+            with self._lock:
+                self._profiles.append(profile)
+        return profile
+
+    def _call(self, name: str, func: Callable, args: tuple, kwargs: dict, size: Callable | None):
+        profile = self._profile() if self.pstats_path else None
+        if profile:
+            self._local.active = True
+            profile.enable()
+        started = time.perf_counter()
+        try:
+            result = func(*args, **kwargs)
+        finally:
+            elapsed = time.perf_counter() - started
+            if profile:
+                profile.disable()
+                self._local.active = False
+        self.record(name, elapsed, size(result) if size and result is not None else 0)
+        return result
+
+    def record(self, name: str, seconds: float, nbytes: int = 0, calls: int = 1):
+        """Adds a measurement to a stage.
+
+        Args:
+            name: The name of the stage.
+            seconds: The time spent.
+            nbytes (optional): The number of bytes read or written. Default 0.
+            calls (optional): The number of calls the measurement covers. Default 1.
+        """
+
+        if not self.enabled:
+            return
+        stats = self._stats(name)
+        with self._lock:
+            stats.calls += calls
+            stats.seconds += seconds
+            stats.bytes += nbytes
+
+    def add_bytes(self, name: str, nbytes: int):
+        """Adds to the bytes of a stage, for stages that only know them once they're done, like the hasher.
+
+        Args:
+            name: The name of the stage.
+            nbytes: The number of bytes read or written.
+        """
+
+        self.record(name, 0.0, nbytes, calls=0)
+
+    def timed(self, name: str, func: Callable, size: Callable | None = None):
+        """Wraps a function, so every call of it is measured as part of a stage.
+
+        Args:
+            name: The name of the stage.
+            func: The function doing the work of the stage. It may be called from several threads.
+            size (optional): Called with the result of the function, returns the number of bytes it read or wrote, e.g. `len` for a rendered config.
+
+        Returns:
+            The wrapped function, or `func` itself if the profiler is disabled.
+        """
+
+        if not self.enabled:
+            return func
+
+        def wrapper(*args, **kwargs):
+            return self._call(name, func, args, kwargs, size)
+        return wrapper
+
+    def timed_iter(self, name: str, iterable: Iterable):
+        """Wraps an iterable, like the directory scan, so the time spent producing every item is measured as part of a stage.
+
+        Args:
+            name: The name of the stage.
+            iterable: The items of the stage.
+
+        Returns:
+            An iterator over the same items, or `iterable` itself if the profiler is disabled.
+        """
+
+        if not self.enabled:
+            return iterable
+        return self._timed_iter(name, iterable)
+
+    def _timed_iter(self, name: str, iterable: Iterable):
+        iterator = iter(iterable)
+        try:
+            while True:
+                started = time.perf_counter()
+                try:
+                    item = next(iterator)
+                except StopIteration:
+                    self.record(name, time.perf_counter() - started, calls=0)
+                    return
+                self.record(name, time.perf_counter() - started)
+                yield item
+        finally:
+            close = getattr(iterator, 'close', None)
+            if close:
+                close()
+
+    def summary(self):
+        """Formats the measurements as a table, one line per stage.
+
+        Returns:
+            The table as a string.
+        """
+
+        elapsed = time.perf_counter() - self._started
+        lines = ["{:<12} {:>10} {:>10} {:>10} {:>10} {:>10}".format('Stage', 'Calls', 'Time (s)', 'ms/call', 'MB', 'MB/s')]
+        for name, stats in self.stages.items():
+            megabytes = stats.bytes / 1024 / 1024
+            lines.append("{name:<12} {calls:>10} {seconds:>10.3f} {per_call:>10.3f} {megabytes:>10} {rate:>10}".format(
+                name = name, calls = stats.calls, seconds = stats.seconds,
+                per_call = stats.seconds * 1000 / stats.calls if stats.calls else 0,
+                megabytes = '{:.1f}'.format(megabytes) if stats.bytes else '-',
+                rate = '{:.1f}'.format(megabytes / stats.seconds) if stats.bytes and stats.seconds else '-'))
+        lines.append("Import took {:.3f}s in total, the stages run at the same time".format(elapsed))
+        return '\n'.join(lines)
+
+    def dump_stats(self):
+        """Merges the cProfile profiles of all threads and writes them to `pstats_path`.
+
+        Returns:
+            False if there was nothing to write, True otherwise.
+
+        Raises:
+            OSError: If the stats file can't be written.
+        """
+
+        if not self.pstats_path or not self._profiles:
+            return False
+        import pstats
+        pstats.Stats(*self._profiles).dump_stats(self.pstats_path)
+        return True
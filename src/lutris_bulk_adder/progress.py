@@ -0,0 +1,123 @@
+import time
+import threading
+from collections.abc import Callable
+from typing import TextIO
+
+from lutris_bulk_adder.pipeline import Pipeline
+
+# How often the progress line is redrawn on a terminal, in seconds
+TTY_INTERVAL = 0.5
+
+# How often a progress line is logged when the output isn't a terminal,
+# e.g. when the import runs from cron with its output going to a file
+LOG_INTERVAL = 10.0
+
+
+def format_duration(seconds: float):
+    """Formats a duration as H:MM:SS."""
+
+    seconds = int(seconds)
+    return '{}:{:02d}:{:02d}'.format(seconds // 3600, seconds // 60 % 60, seconds % 60)
+
+
+class ProgressReporter():
+    """Reports the progress of an import while it runs: the files found, the files processed, the throughput and the time left.
+
+    Note:
+        The reporter doesn't get told about every file. It looks at the counters the pipeline keeps anyway (the items taken from the scan, and the items that made it through or were dropped on the way), from a thread of its own on a timer, so the import itself doesn't do any extra work per file.
+        On a terminal, a single line is redrawn twice a second. Otherwise, like in a log file, a line is written every 10 seconds.
+        The time left is only known once the scan is done, before that the files still to be found aren't known.
+
+    Attributes:
+        pipeline: The pipeline of the import.
+        stream: Where the progress goes.
+        tty: Whether the stream is a terminal, so the line can be redrawn in place.
+        interval: The seconds between two updates.
+    """
+    pipeline: Pipeline
+    stream: TextIO
+    tty: bool
+    interval: float
+
+    def __init__(self, pipeline: Pipeline, stream: TextIO, bytes_read: Callable[[], int] | None = None, interval: float | None = None):
+        """Initialize the reporter. It only starts reporting once `start` is called.
+
+        Args:
+            pipeline: The pipeline of the import.
+            stream: Where the progress goes, usually stdout.
+            bytes_read (optional): Returns the number of bytes hashed so far, to report the MB/s when hashing.
+            interval (optional): The seconds between two updates. Defaults to TTY_INTERVAL on a terminal, LOG_INTERVAL otherwise.
+        """
+
+        self.pipeline = pipeline
+        self.stream = stream
+        try:
+            self.tty = stream.isatty()
+        except (AttributeError, ValueError):
+            self.tty = False
+        self.interval = interval or (TTY_INTERVAL if self.tty else LOG_INTERVAL)
+
+        self._bytes_read = bytes_read
+        self._stop = threading.Event()
+        self._thread = None
+        self._started = time.perf_counter()
+
+    def line(self):
+        """Formats the current progress.
+
+        Returns:
+            The progress as a single line of text.
+        """
+
+        elapsed = max(time.perf_counter() - self._started, 1e-9)
+        found = self.pipeline.fed
+        processed = self.pipeline.completed()
+        rate = processed / elapsed
+
+        line = "Found {found:,} files{more}, processed {processed:,} ({rate:,.0f} files/s".format(
+            found = found, more = '' if self.pipeline.exhausted else ' so far',
+            processed = processed, rate = rate)
+        if self._bytes_read:
+            line += ", {:,.1f} MB/s hashed".format(self._bytes_read() / 1024 / 1024 / elapsed)
+        line += ")"
+
+        if self.pipeline.exhausted and found:
+            if rate > 0:
+                line += ", {:.0%} done, {} left".format(processed / found, format_duration((found - processed) / rate))
+            else:
+                line += ", {:.0%} done".format(processed / found)
+        else:
+            line += ", scanning"
+        return line
+
+    def _report(self):
+        if self.tty:
+            # \x1b[K clears what's left of a longer line from before
+            self.stream.write('\r' + self.line() + '\x1b[K')
+        else:
+            self.stream.write(self.line() + '\n')
+        self.stream.flush()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self._report()
+
+    def start(self):
+        """Starts reporting in the background."""
+
+        self._started = time.perf_counter()
+        self._thread = threading.Thread(target=self._run, name='progress', daemon=True)
+        self._thread.start()
+
+    def close(self):
+        """Stops reporting. On a terminal, the line is drawn a last time and ended, so the next output starts on a line of its own."""
+
+        if self._thread is None:
+            return
+        self._stop.set()
+        self._thread.join()
+        self._thread = None
+        if self.tty:
+            self._report()
+            self.stream.write('\n')
+            self.stream.flush()
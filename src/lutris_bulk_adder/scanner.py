@@ -0,0 +1,140 @@
+import os
+import re
+import fnmatch
+from collections.abc import Iterator
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+from lutris_bulk_adder.constants import DEFAULT_SCAN_WORKERS
+
+
+def compile_globs(patterns: list[str] | None):
+    """Compiles a list of shell style glob patterns into one combined regex, so a name is checked against all of them with a single match call.
+
+    Args:
+        patterns: List of glob patterns, e.g. `*.sfc` or `*(Beta)*`.
+
+    Returns:
+        A compiled pattern, or None if no patterns were given.
+    """
+
+    if not patterns:
+        return None
+    return re.compile('|'.join(fnmatch.translate(pattern) for pattern in patterns))
+
+
+def _scan_one(path: str, rel: str, types: frozenset[str], include, exclude, follow_symlinks: bool):
+    """Scans a single directory. Runs inside a worker thread of the scanner.
+
+    Note:
+        The checks below only use the type information cached on the `DirEntry` by `os.scandir`, which on Linux comes straight from the directory listing, so no extra `stat` call is made per entry. The only exceptions are symlinks, whose target has to be stat'ed to tell a file from a directory, and following symlinked directories, where the target has to be stat'ed to detect loops.
+
+    Args:
+        path: Directory to scan.
+        rel: The path of the directory relative to the root of the scan, used for glob matching.
+        types: Set of lowercase file extensions to include.
+        include: Compiled include globs, or None to include every matching file.
+        exclude: Compiled exclude globs, or None to exclude nothing.
+        follow_symlinks: Whether or not to descend into symlinked directories.
+
+    Returns:
+        A tuple of the matching file paths and the subdirectories (path, relative path, (device, inode) or None) to scan next.
+    """
+
+    files = []
+    subdirs = []
+    try:
+        with os.scandir(path) as it:
+            for entry in it:
+                entry_rel = os.path.join(rel, entry.name) if rel else entry.name
+                if exclude and (exclude.match(entry.name) or exclude.match(entry_rel)):
+                    continue
+
+                if entry.is_dir(follow_symlinks=follow_symlinks):
+                    key = None
+                    if follow_symlinks:
+                        stat = entry.stat()
+                        key = (stat.st_dev, stat.st_ino)
+                    subdirs.append((entry.path, entry_rel, key))
+                # symlinked files are always included, like
+                # the original scan did, only descending into
+                # symlinked directories is up to follow_symlinks
+                elif entry.is_file():
+                    # same extension logic as the original scan:
+                    # everything after the last dot, case-insensitively
+                    if entry.name.rsplit(os.extsep, 1)[-1].lower() not in types:
+                        continue
+                    if include and not (include.match(entry.name) or include.match(entry_rel)):
+                        continue
+                    files.append(entry.path)
+    except (PermissionError, NotADirectoryError, FileNotFoundError):
+        # an unreadable subdirectory, or one removed
+        # since it was listed, shouldn't stop the whole scan
+        pass
+    return files, subdirs
+
+
+def scan_directory(
+        dir: str, types: list[str],
+        max_depth: int | None = 0, follow_symlinks: bool = False,
+        include: list[str] | None = None, exclude: list[str] | None = None,
+        workers: int = DEFAULT_SCAN_WORKERS
+) -> Iterator[str]:
+    """Scans a directory tree for all files matching a list of extension types, walking subdirectories concurrently.
+
+    Note:
+        Every directory is listed by a thread from a bounded pool, so on network shares the latency of many directory listings overlaps. Paths are yielded as soon as the directory containing them has been listed, instead of collecting everything into one big set first.
+        The order of the yielded paths is not guaranteed.
+
+    Args:
+        dir: Directory location to scan.
+        types: List of file extensions to include.
+        max_depth (optional): How many levels of subdirectories to descend into. 0 only scans the directory itself, None means no limit. Default 0.
+        follow_symlinks (optional): Whether or not to descend into symlinked directories. Symlinked directories are only scanned once, even if they form a loop. Symlinked files are always included. Default False.
+        include (optional): Glob patterns a file name (or its path relative to dir) must match to be included.
+        exclude (optional): Glob patterns for file and directory names (or relative paths) to skip.
+        workers (optional): The number of directories listed concurrently. Default 8.
+
+    Yields:
+        File paths.
+
+    Raises:
+        FileNotFoundError: Directory does not exist.
+    """
+
+    if workers < 1:
+        raise ValueError("The number of scan workers must be at least 1, got {}".format(workers))
+
+    # make sure a missing root directory
+    # is reported, not silently skipped
+    if not os.path.isdir(dir):
+        raise FileNotFoundError("{} is not a directory".format(dir))
+
+    types = frozenset(ext.lower() for ext in types)
+    include = compile_globs(include)
+    exclude = compile_globs(exclude)
+
+    visited = set()
+    if follow_symlinks:
+        stat = os.stat(dir)
+        visited.add((stat.st_dev, stat.st_ino))
+
+    executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='scan')
+    try:
+        pending = {executor.submit(_scan_one, dir, '', types, include, exclude, follow_symlinks): 0}
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                depth = pending.pop(future)
+                files, subdirs = future.result()
+
+                if max_depth is None or depth < max_depth:
+                    for path, rel, key in subdirs:
+                        if key is not None:
+                            if key in visited:
+                                continue
+                            visited.add(key)
+                        pending[executor.submit(_scan_one, path, rel, types, include, exclude, follow_symlinks)] = depth + 1
+
+                yield from files
+    finally:
+        executor.shutdown(wait=True, cancel_futures=True)
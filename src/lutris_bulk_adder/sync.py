@@ -0,0 +1,111 @@
+import os
+from collections import namedtuple
+
+import yaml
+
+from lutris_bulk_adder.database import GameRow
+
+# libyaml's parser is a lot faster than the pure Python one,
+# but PyYAML can be installed without it
+try:
+    from yaml import CSafeLoader as ConfigLoader
+except ImportError:
+    from yaml import SafeLoader as ConfigLoader
+
+# A game in Lutris and the ROM file its config points to
+SyncedGame = namedtuple('SyncedGame', ['row', 'main_file', 'config_path'])
+
+
+def read_main_file(config_path: str):
+    """Reads the ROM file a game config points to.
+
+    Args:
+        config_path: Path of the YML config file.
+
+    Returns:
+        The `main_file` of the config, or None if the file can't be read or has none.
+    """
+
+    try:
+        with open(config_path, encoding='utf-8') as f:
+            config = yaml.load(f, Loader=ConfigLoader)
+    except (OSError, UnicodeDecodeError, yaml.YAMLError):
+        return None
+    game = config.get('game') if isinstance(config, dict) else None
+    main_file = game.get('main_file') if isinstance(game, dict) else None
+    return main_file if isinstance(main_file, str) else None
+
+
+def under(path: str, directories: list[str]):
+    """Checks whether a path is inside one of the directories."""
+
+    return any(path == directory or path.startswith(directory.rstrip(os.sep) + os.sep) for directory in directories)
+
+
+def load_main_files(rows: list[GameRow], yml_dir: str, directories: list[str], platforms: list[str | None] | None = None):
+    """Reads which ROM file every game in the given directories points to.
+
+    Args:
+        rows: Every game in Lutris, see `DuplicateIndex.rows`.
+        yml_dir: The Lutris YML directory the configs are in.
+        directories: The directories that are scanned. Games pointing anywhere else are left out.
+        platforms (optional): The platform every directory is scanned for, in the same order, or None where the platform is detected. Games of other platforms in a directory are left out. By default every platform counts.
+
+    Returns:
+        A dictionary of the absolute path of the ROM file to its SyncedGame.
+    """
+
+    platforms = platforms or [None] * len(directories)
+    scopes = [(os.path.abspath(directory), platform) for directory, platform in zip(directories, platforms)]
+    # the configs of games of other platforms aren't read at all
+    any_platform = None in platforms
+    wanted = set(platforms)
+
+    games = {}
+    for row in rows:
+        if not row.configpath or not (any_platform or row.platform in wanted):
+            continue
+        config_path = os.path.join(yml_dir, '{}.yml'.format(row.configpath))
+        main_file = read_main_file(config_path)
+        if main_file is None:
+            continue
+        main_file = os.path.abspath(main_file)
+        if under(main_file, [directory for directory, platform in scopes if platform is None or platform == row.platform]):
+            games[main_file] = SyncedGame(row, main_file, config_path)
+    return games
+
+
+class SyncPlan():
+    """What it takes to bring Lutris in line with the scanned directories: the games whose ROMs are gone, and the ROMs not in Lutris yet.
+
+    Note:
+        Only the games whose config points into one of the scanned directories, and that are of the platform the directory is scanned for, are looked at (see `load_main_files`), everything else in Lutris is left alone.
+        Both sides are loaded into sets of absolute paths up front, so telling them apart is a set difference, instead of a lookup in the database per file.
+        A game is only counted as removed if its ROM is really gone. A ROM left out of the scan by the include or exclude patterns, or by the depth limit, keeps its game.
+
+    Attributes:
+        removed: The games whose ROMs are gone, sorted by path.
+        added: The absolute paths of the scanned ROMs no game points to yet.
+        kept: The number of games whose ROMs are still there.
+    """
+    removed: list[SyncedGame]
+    added: set[str]
+    kept: int
+
+    def __init__(self, existing: dict[str, SyncedGame], scanned: set[str], moved: dict[str, str] | None = None):
+        """Compare the games in Lutris with the scanned files.
+
+        Args:
+            existing: The games in the scanned directories, by the absolute path of their ROM, see `load_main_files`.
+            scanned: The absolute paths of the files found by the scan.
+            moved (optional): The games that were moved rather than removed, as their old absolute paths to the new ones, see `moves.MoveDetector`.
+        """
+
+        # the files that vanished are few, so only they
+        # are checked on disk, not everything in Lutris
+        moved = moved or {}
+        missing = existing.keys() - scanned - moved.keys()
+        self.removed = sorted((existing[path] for path in missing if not os.path.lexists(path)),
+                              key=lambda game: game.main_file)
+        self.added = scanned - existing.keys() - set(moved.values())
+        self.kept = len(existing) - len(self.removed)
@@ -0,0 +1,75 @@
+import os
+import sqlite3
+import sys
+
+import pytest
+
+from lutris_bulk_adder.benchmark import create_lutris_database
+from lutris_bulk_adder.lutris_bulk_adder import main
+
+
+class Lutris():
+    """A scratch Lutris setup: a pga.db with the Lutris schema, its YML and game directories, and a directory of ROMs."""
+
+    def __init__(self, root):
+        self.root = str(root)
+        self.database = os.path.join(self.root, 'pga.db')
+        self.yml_dir = os.path.join(self.root, 'games')
+        self.game_dir = os.path.join(self.root, 'lutris-games')
+        self.roms = os.path.join(self.root, 'roms')
+        self.side_database = os.path.join(self.root, 'lutris-bulk-adder.db')
+        for directory in (self.yml_dir, self.game_dir, self.roms):
+            os.makedirs(directory)
+        create_lutris_database(self.database)
+
+    def rom(self, name: str, contents: bytes | None = None, directory: str | None = None):
+        """Creates a ROM file, with contents of its own unless given, and returns its path."""
+
+        directory = directory or self.roms
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, name)
+        with open(path, 'wb') as f:
+            f.write(contents if contents is not None else name.encode())
+        return path
+
+    def run(self, *args: str, platform: str = 'Nintendo SNES'):
+        """Runs the script against this setup, and returns its exit code."""
+
+        argv = ['lutris-bulk-adder', '-p', platform, '-ld', self.database, '-ly', self.yml_dir,
+                '-lg', self.game_dir, '--no-progress', *args]
+        if '-d' not in args and '-L' not in args:
+            argv += ['-d', self.roms]
+        old_argv = sys.argv
+        sys.argv = argv
+        try:
+            main()
+        except SystemExit as exit:
+            return exit.code
+        finally:
+            sys.argv = old_argv
+        return 0
+
+    def games(self, columns: str = 'id, name, configpath'):
+        """The rows of the games table, sorted by id."""
+
+        conn = sqlite3.connect(self.database)
+        try:
+            return conn.execute("SELECT {} FROM games ORDER BY id".format(columns)).fetchall()
+        finally:
+            conn.close()
+
+    def main_files(self):
+        """The main_file of every YML config, by config name."""
+
+        import yaml
+        files = {}
+        for name in os.listdir(self.yml_dir):
+            if name.endswith('.yml'):
+                with open(os.path.join(self.yml_dir, name)) as f:
+                    files[name[:-len('.yml')]] = yaml.safe_load(f)['game']['main_file']
+        return files
+
+
+@pytest.fixture
+def lutris(tmp_path):
+    return Lutris(tmp_path)
@@ -0,0 +1,68 @@
+import zipfile
+import zlib
+
+import pytest
+
+from lutris_bulk_adder.archive import is_archive, main_member, member_digests, read_archive
+
+
+@pytest.fixture
+def archive(tmp_path):
+    path = tmp_path / 'Game (USA).zip'
+    with zipfile.ZipFile(path, 'w') as f:
+        f.writestr('docs/', '')
+        f.writestr('docs/readme.txt', 'x' * 5000, zipfile.ZIP_DEFLATED)
+        f.writestr('Game (USA).sfc', b'rom' * 100, zipfile.ZIP_DEFLATED)
+        f.writestr('Game (USA) (Manual).pdf', b'pdf' * 1000)
+    return path
+
+
+def test_is_archive():
+    assert is_archive('/roms/Game (USA).ZIP')
+    assert not is_archive('/roms/Game (USA).sfc')
+
+
+def test_read_archive(archive):
+    members = read_archive(str(archive))
+    assert [(member.name, member.size, member.stored) for member in members] == [
+        ('docs/readme.txt', 5000, False), ('Game (USA).sfc', 300, False), ('Game (USA) (Manual).pdf', 3000, True)]
+
+    # the biggest file that isn't an extra is the ROM
+    member = main_member(members)
+    assert member.name == 'Game (USA).sfc'
+    assert member_digests(member) == {'crc32': '{:08x}'.format(zlib.crc32(b'rom' * 100))}
+
+
+def test_only_extras():
+    assert main_member([]) is None
+
+
+@pytest.mark.parametrize('cut', [0, 10, -10, -30])
+def test_truncated_archive(archive, cut):
+    # cut short at the start, or into the central directory at the end
+    data = archive.read_bytes()
+    archive.write_bytes(data[:cut] if cut > 0 else data[:len(data) + cut] if cut else b'')
+    with pytest.raises(ValueError):
+        read_archive(str(archive))
+
+
+def test_not_an_archive(tmp_path):
+    path = tmp_path / 'Game (USA).zip'
+    path.write_bytes(b'not a zip file' * 100)
+    with pytest.raises(ValueError):
+        read_archive(str(path))
+
+
+def test_unsupported_archive(archive):
+    # a zip version zipfile doesn't know in the central directory
+    data = bytearray(archive.read_bytes())
+    central = data.index(b'PK\x01\x02')
+    data[central + 6] = 85
+    archive.write_bytes(bytes(data))
+    with pytest.raises(ValueError):
+        read_archive(str(archive))
+
+
+def test_missing_archive(tmp_path):
+    with pytest.raises(OSError):
+        read_archive(str(tmp_path / 'gone.zip'))
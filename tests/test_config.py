@@ -0,0 +1,78 @@
+import os
+import subprocess
+import sys
+
+import pytest
+import yaml
+
+from lutris_bulk_adder.config import ConfigTemplate, ConfigWriter, sweep_temp_files
+
+PATHS = [
+    # plain paths the template writes verbatim
+    '/roms/snes/Super Mario World (USA).sfc',
+    '/roms/snes/Legend_of_Zelda,_The_-_A_Link_to_the_Past_(USA)_[!].sfc',
+    # quoted and escaped
+    "/roms/snes/Ren & Stimpy Show, The - Time Warp (USA): 'Veediots'.sfc",
+    '/roms/snes/Batman - "Revenge of the Joker" #1.sfc',
+    '/roms/gb/yes',
+    '/roms/gb/ starts with a space.gb',
+    '/roms/gb/ends with a space .gb',
+    # non-ASCII, over 80 columns, folded by the emitter
+    '/mnt/nas/roms/Nintendo - Game Boy Color/Europe/Pokémon - Edición Cristal (Spain) (Rev 1) [!].gbc',
+    '/mnt/nas/roms/ポケットモンスター/ポケットモンスター 金 (Japan) (Rev 1) (SGB Enhanced) (GB Compatible).gbc',
+    '/mnt/nas/roms/Nintendo - Super Nintendo Entertainment System/USA/Final Fantasy III (USA) (Rev 1).sfc',
+    '/mnt/nas/roms/Nintendo_-_Super_Nintendo_Entertainment_System/USA/Final_Fantasy_III_(USA)_(Rev_1).sfc',
+]
+
+OPTIONS = [
+    {},
+    {'core': 'snes9x', 'platform': '1'},
+    {'core': 'gambatte', 'platform': '1', 'zz_option': 'a value: with a colon'},
+]
+
+
+@pytest.mark.parametrize('options', OPTIONS)
+@pytest.mark.parametrize('path', PATHS)
+def test_render_matches_yaml_dump(path, options):
+    template = ConfigTemplate(options)
+    assert template.render(path) == yaml.dump(template.config(path), default_flow_style=False)
+
+
+@pytest.mark.parametrize('options', OPTIONS)
+@pytest.mark.parametrize('path', PATHS)
+def test_render_round_trips(path, options):
+    template = ConfigTemplate(options)
+    assert yaml.safe_load(template.render(path)) == template.config(path)
+
+
+
+def dead_pid():
+    """The id of a process that's gone."""
+
+    process = subprocess.Popen([sys.executable, '-c', 'pass'])
+    process.wait()
+    return process.pid
+
+
+def test_sweep_removes_temp_files_of_dead_imports(tmp_path):
+    dead = tmp_path / '.snes-game-1.yml.{}.abcd1234.tmp'.format(dead_pid())
+    running = tmp_path / '.snes-game-2.yml.{}.abcd1234.tmp'.format(os.getpid())
+    config = tmp_path / 'snes-game-3.yml'
+    for path in (dead, running, config):
+        path.write_text('game: {}\n')
+
+    assert sweep_temp_files(str(tmp_path)) == 1
+    assert sorted(path.name for path in tmp_path.iterdir()) == sorted([running.name, config.name])
+
+
+def test_sweep_finds_writer_temp_files(tmp_path):
+    writer = ConfigWriter(1)
+    temp_path, _, _ = writer._write_temp(str(tmp_path / 'snes-game-1.yml'), 'game: {}\n')
+    writer.close()
+
+    # the same file, as if the import writing it had crashed
+    prefix = '.snes-game-1.yml.{}.'.format(os.getpid())
+    assert os.path.basename(temp_path).startswith(prefix)
+    os.rename(temp_path, temp_path.replace(prefix, '.snes-game-1.yml.{}.'.format(dead_pid())))
+    assert sweep_temp_files(str(tmp_path)) == 1
+    assert not list(tmp_path.iterdir())
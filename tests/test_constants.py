@@ -0,0 +1,17 @@
+from lutris_bulk_adder.classes import PlatformRegistry
+from lutris_bulk_adder.constants import PLATFORMS
+
+
+def test_every_platform_is_valid():
+    # the platforms aren't validated when the script runs,
+    # so a broken spec has to be caught here
+    assert PLATFORMS.validate() == {}
+
+
+def test_invalid_spec_is_reported():
+    registry = PlatformRegistry({
+        'Good': {'runners': ['mednafen'], 'default_runner': 'mednafen'},
+        'Bad': {'runners': ['mednafen'], 'default_runner': 'libretro'},
+    })
+    assert list(registry.validate()) == ['Bad']
+
@@ -0,0 +1,170 @@
+import os
+import sqlite3
+import threading
+
+import pytest
+
+from lutris_bulk_adder.benchmark import create_lutris_database
+from lutris_bulk_adder.config import ConfigWriter
+from lutris_bulk_adder.database import GameWriter, StagingWriter, GAME_COLUMNS
+from lutris_bulk_adder.journal import ImportJournal, INSERTED, UPDATED, MOVED
+
+
+def game(name: str):
+    """The values of a new game, with its config named after it."""
+
+    values = dict.fromkeys(GAME_COLUMNS)
+    values.update(name=name, slug=name, platform='Nintendo SNES', runner='libretro', installed=1, configpath=name)
+    return values
+
+
+@pytest.fixture
+def database(tmp_path):
+    path = str(tmp_path / 'pga.db')
+    create_lutris_database(path)
+    return path
+
+
+def connect(database: str):
+    # a short busy timeout, so a locked database shows up
+    # as an error right away instead of sqlite3 waiting
+    return sqlite3.connect(database, timeout=0.05, check_same_thread=False)
+
+
+def hold_read_lock(database: str, seconds: float):
+    """Keeps a read transaction open on the database for a while, so a writer can't commit until it's over."""
+
+    reader = sqlite3.connect(database, isolation_level=None, check_same_thread=False)
+    reader.execute("BEGIN")
+    reader.execute("SELECT * FROM games").fetchall()
+
+    def release():
+        reader.execute("COMMIT")
+        reader.close()
+    timer = threading.Timer(seconds, release)
+    timer.start()
+    return timer
+
+
+def test_interleaved_writers_get_their_own_ids(database):
+    first = GameWriter(connect(database), batch_size=2)
+    second = GameWriter(connect(database), batch_size=2)
+
+    # every batch takes the ids after the highest one
+    # in the table at the time it's written
+    first.add(game('a1'))
+    second.add(game('b1'))
+    first.add(game('a2'))
+    assert list(first.last_ids) == [1, 2]
+    second.add(game('b2'))
+    assert list(second.last_ids) == [3, 4]
+    first.add(game('a3'))
+    second.add(game('b3'))
+    second.close()
+    first.close()
+
+    conn = sqlite3.connect(database)
+    assert conn.execute("SELECT id, configpath FROM games ORDER BY id").fetchall() == [
+        (1, 'a1'), (2, 'a2'), (3, 'b1'), (4, 'b2'), (5, 'b3'), (6, 'a3')]
+
+
+def test_busy_batch_is_retried_and_journaled_once(database, tmp_path):
+    journal = ImportJournal(str(tmp_path / 'journal.db'))
+    journal.begin(database)
+    conn = connect(database)
+    writer = GameWriter(conn, batch_size=10, busy_timeout=10, journal=journal)
+    for name in ('a', 'b', 'c'):
+        writer.add(game(name), file='/roms/{}.sfc'.format(name))
+
+    # the COMMIT of the batch is busy until the reader is done
+    timer = hold_read_lock(database, 0.3)
+    writer.close()
+    timer.join()
+
+    assert writer.busy_retries > 0
+    assert conn.execute("SELECT id, configpath FROM games ORDER BY id").fetchall() == [(1, 'a'), (2, 'b'), (3, 'c')]
+    assert [tuple(entry) for entry in journal.entries(journal.run_id)] == [
+        (1, INSERTED, 'a', '/roms/a.sfc'), (2, INSERTED, 'b', '/roms/b.sfc'), (3, INSERTED, 'c', '/roms/c.sfc')]
+    journal.close()
+
+
+def test_busy_timeout_rolls_back_the_batch(database, tmp_path):
+    configs = ConfigWriter(1)
+    conn = connect(database)
+    writer = GameWriter(conn, batch_size=10, configs=configs, busy_timeout=0.2)
+    writer.add(game('a'), str(tmp_path / 'a.yml'), 'game: {}\n')
+
+    timer = hold_read_lock(database, 1)
+    with pytest.raises(sqlite3.OperationalError):
+        writer.flush()
+    timer.join()
+    configs.close()
+
+    # neither the row nor its config made it
+    assert conn.execute("SELECT count(*) FROM games").fetchone()[0] == 0
+    assert not conn.in_transaction
+    assert [path.name for path in tmp_path.iterdir() if 'yml' in path.name] == []
+
+
+def test_pragmas_are_restored(database):
+    conn = connect(database)
+    before = (conn.execute("PRAGMA journal_mode").fetchone()[0], conn.execute("PRAGMA synchronous").fetchone()[0])
+
+    writer = GameWriter(conn, journal_mode='WAL', synchronous='OFF')
+    assert conn.execute("PRAGMA journal_mode").fetchone()[0] == 'wal'
+    assert conn.execute("PRAGMA synchronous").fetchone()[0] == 0
+    writer.add(game('a'))
+    writer.close()
+
+    assert (conn.execute("PRAGMA journal_mode").fetchone()[0], conn.execute("PRAGMA synchronous").fetchone()[0]) == before
+
+
+def test_staging_merges_into_existing_games(database, tmp_path):
+    yml_dir = tmp_path / 'games'
+    yml_dir.mkdir()
+
+    # Lutris has games 1, 2 and 5 already, 5 in a category
+    conn = connect(database)
+    writer = GameWriter(conn)
+    for name in ('old1', 'old2', 'old5'):
+        writer.add(game(name))
+    writer.close()
+    conn.execute("UPDATE games SET id = 5 WHERE id = 3")
+    conn.execute("INSERT INTO games_categories (game_id, category_id) VALUES (5, 1)")
+    conn.commit()
+
+    journal = ImportJournal(str(tmp_path / 'journal.db'))
+    journal.begin(database)
+    configs = ConfigWriter(1)
+    writer = StagingWriter(conn, batch_size=2, configs=configs, journal=journal)
+    for name in ('new1', 'new2', 'new3'):
+        writer.add(game(name), str(yml_dir / '{}.yml'.format(name)), 'game: {}\n', file='/roms/{}.sfc'.format(name))
+    updated = game('old1')
+    updated.update(name='Old One', directory='/roms')
+    writer.update(1, updated, file='/roms/old1.sfc')
+    writer.move(2, '/moved', str(yml_dir / 'old2.yml'), 'game: {}\n', file='/moved/old2.sfc')
+    writer.delete([5])
+    staging_path = writer.staging_path
+
+    # nothing reaches Lutris before the merge
+    writer.flush()
+    assert conn.execute("SELECT id FROM games ORDER BY id").fetchall() == [(1,), (2,), (5,)]
+    assert not any(path.name.endswith('.yml') for path in yml_dir.iterdir())
+
+    writer.close()
+    configs.close()
+
+    # the staged rows are numbered past the highest id at the time of the merge
+    assert list(writer.last_ids) == [6, 7, 8]
+    assert conn.execute("SELECT id, name, configpath, directory FROM games ORDER BY id").fetchall() == [
+        (1, 'Old One', 'old1', '/roms'), (2, 'old2', 'old2', '/moved'),
+        (6, 'new1', 'new1', None), (7, 'new2', 'new2', None), (8, 'new3', 'new3', None)]
+    assert conn.execute("SELECT count(*) FROM games_categories WHERE game_id = 5").fetchone()[0] == 0
+    assert sorted(path.name for path in yml_dir.iterdir()) == ['new1.yml', 'new2.yml', 'new3.yml', 'old2.yml']
+    assert not os.path.exists(staging_path)
+    assert (writer.rows_written, writer.rows_updated, writer.rows_moved, writer.rows_deleted) == (3, 1, 1, 1)
+
+    assert [tuple(entry) for entry in journal.entries(journal.run_id)] == [
+        (6, INSERTED, 'new1', '/roms/new1.sfc'), (7, INSERTED, 'new2', '/roms/new2.sfc'), (8, INSERTED, 'new3', '/roms/new3.sfc'),
+        (1, UPDATED, 'old1', '/roms/old1.sfc'), (2, MOVED, 'old2', '/moved/old2.sfc')]
+    journal.close()
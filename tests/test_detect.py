@@ -0,0 +1,110 @@
+import struct
+import zipfile
+
+import pytest
+
+from lutris_bulk_adder.archive import main_member, read_archive
+from lutris_bulk_adder.constants import PLATFORMS
+from lutris_bulk_adder.detect import PlatformDetector
+
+
+@pytest.fixture
+def detector():
+    return PlatformDetector(PLATFORMS)
+
+
+def at(size: int, *parts: tuple[int, bytes]):
+    """A header of the given size with bytes placed at offsets."""
+
+    data = bytearray(size)
+    for offset, part in parts:
+        data[offset:offset + len(part)] = part
+    return bytes(data)
+
+
+def iso9660(system: bytes, boot: bytes | None = None):
+    """A 2048 byte sector ISO 9660 image with a system identifier, and a SYSTEM.CNF in its root directory if `boot` is given."""
+
+    name = b'SYSTEM.CNF;1'
+    record = bytearray(33 + len(name) + 1)
+    record[0] = len(record)
+    record[2:6] = struct.pack('<I', 18)
+    record[10:14] = struct.pack('<I', len(boot or b''))
+    record[32] = len(name)
+    record[33:33 + len(name)] = name
+
+    root = bytearray(34)
+    root[0] = 34
+    root[2:6] = struct.pack('<I', 17)
+    root[10:14] = struct.pack('<I', 2048)
+
+    descriptor = b'\x01CD001\x01\x00' + system.ljust(32) + bytes(156 - 40) + bytes(root)
+    parts = [(16 * 2048, descriptor)]
+    if boot:
+        parts += [(17 * 2048, bytes(record)), (18 * 2048, boot)]
+    return at(19 * 2048, *parts)
+
+
+def pbp(category: bytes):
+    """An EBOOT.PBP whose PARAM.SFO has a CATEGORY."""
+
+    keys = b'CATEGORY\x00'
+    values = category + b'\x00'
+    sfo = b'\x00PSF' + struct.pack('<IIII', 0x0101, 20 + 16, 20 + 16 + len(keys), 1) \
+        + struct.pack('<HHIII', 0, 0x0204, len(values), 4, 0) + keys + values
+    return b'\x00PBP' + struct.pack('<II', 0x10000, 0x28) + bytes(0x28 - 12) + sfo
+
+
+@pytest.mark.parametrize('name, data, platform', [
+    ('game.bin', at(0x200, (0x100, b'SEGA MEGA DRIVE')), 'Sega Mega Drive'),
+    ('game.bin', at(0x200, (0x101, b'SEGA GENESIS')), 'Sega Mega Drive'),
+    ('game.bin', at(0x200, (0x100, b'SEGA 32X')), 'Sega 32X'),
+    ('game.bin', at(0x1000, (0, b'SEGADISCSYSTEM  ')), 'Sega CD'),
+    ('game.bin', at(0x1000, (16, b'SEGA SEGASATURN ')), 'Sega Saturn'),
+    ('game.iso', at(0x1000, (0, b'\x01\x5a\x5a\x5a\x5a\x5a\x01')), '3DO'),
+    ('game.iso', at(0x100, (0x1c, b'\xc2\x33\x9f\x3d')), 'Nintendo Gamecube'),
+    ('game.iso', at(0x100, (0x18, b'\x5d\x1c\x9e\xa3')), 'Nintendo Wii'),
+    ('game.rvz', at(0x100, (0, b'RVZ\x01'), (0x48, struct.pack('>I', 1))), 'Nintendo Gamecube'),
+    ('game.rvz', at(0x100, (0, b'WIA\x01'), (0x48, struct.pack('>I', 2))), 'Nintendo Wii'),
+    ('game.iso', iso9660(b'PSP GAME'), 'Sony PlayStation Portable'),
+    ('game.iso', iso9660(b'PLAYSTATION', b'BOOT = cdrom:\\SLUS_000.01;1\r\n'), 'Sony PlayStation'),
+    ('game.iso', iso9660(b'PLAYSTATION', b'BOOT2 = cdrom0:\\SLUS_200.01;1\r\n'), 'Sony PlayStation 2'),
+    ('EBOOT.PBP', pbp(b'ME'), 'Sony PlayStation'),
+    ('EBOOT.PBP', pbp(b'EG'), 'Sony PlayStation Portable'),
+    # no header at all, but small enough for a 2600 cartridge
+    ('game.bin', at(4096), 'Atari 2600'),
+    ('game.bin', at(128 * 1024), None),
+    # a signature of a platform the extension doesn't belong to
+    ('game.pbp', at(0x200, (0x100, b'SEGA MEGA DRIVE')), None),
+])
+def test_sniff(detector, tmp_path, name, data, platform):
+    path = tmp_path / name
+    path.write_bytes(data)
+    assert detector.detect(str(path)) == platform
+    assert detector.sniffed == 1
+    assert detector.unknown == (platform is None)
+
+
+def test_single_candidate_isnt_opened(detector, tmp_path):
+    # the file doesn't even exist
+    assert detector.detect(str(tmp_path / 'game.sfc')) == 'Nintendo SNES'
+    assert detector.detect(str(tmp_path / 'game.unknown')) is None
+    assert detector.sniffed == 0
+
+
+def test_unreadable_file(detector, tmp_path):
+    assert detector.detect(str(tmp_path / 'gone.bin')) is None
+    assert detector.unknown == 1
+
+
+@pytest.mark.parametrize('compression, platform', [(zipfile.ZIP_STORED, 'Sega Mega Drive'), (zipfile.ZIP_DEFLATED, None)])
+def test_archive_member(detector, tmp_path, compression, platform):
+    path = tmp_path / 'game.zip'
+    with zipfile.ZipFile(path, 'w', compression) as archive:
+        archive.writestr('readme.txt', 'hello')
+        archive.writestr('game.bin', at(0x200, (0x100, b'SEGA MEGA DRIVE')))
+
+    # only a member stored as it is has its header read
+    member = main_member(read_archive(str(path)))
+    assert member.name == 'game.bin'
+    assert detector.detect(str(path), member) == platform
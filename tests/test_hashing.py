@@ -0,0 +1,40 @@
+import hashlib
+import zlib
+
+from lutris_bulk_adder.hashing import FileHasher, HashCache, hash_file
+
+
+def test_hash_file(tmp_path):
+    rom = tmp_path / 'game.sfc'
+    rom.write_bytes(b'rom' * 1000)
+
+    assert hash_file(str(rom), ['crc32', 'md5', 'sha1']) == {
+        'crc32': '{:08x}'.format(zlib.crc32(b'rom' * 1000)),
+        'md5': hashlib.md5(b'rom' * 1000).hexdigest(),
+        'sha1': hashlib.sha1(b'rom' * 1000).hexdigest(),
+    }
+
+
+def test_hasher_starts_its_processes_up_front():
+    # forking from a thread of the pipeline later on
+    # could deadlock, so the pool is up before that
+    hasher = FileHasher(['md5'], workers=2)
+    try:
+        assert len(hasher._executor._processes) == 2
+    finally:
+        hasher.close()
+
+
+def test_hasher_uses_cache(tmp_path):
+    rom = tmp_path / 'game.sfc'
+    rom.write_bytes(b'rom')
+    cache = HashCache(str(tmp_path / 'cache.db'))
+    hasher = FileHasher(['md5'], cache, workers=1)
+    try:
+        digests = hasher.hash(str(rom))
+        assert digests == {'md5': hashlib.md5(b'rom').hexdigest()}
+        assert hasher.hash(str(rom)) == digests
+        assert hasher.hash(str(tmp_path / 'gone.sfc')) is None
+    finally:
+        hasher.close()
+        cache.close()
@@ -0,0 +1,27 @@
+import os
+
+from lutris_bulk_adder import importer
+
+
+def test_import(lutris):
+    lutris.rom('Super Game (USA).sfc')
+    lutris.rom('Other Game (Europe).sfc')
+
+    assert lutris.run() == 0
+    assert sorted(name for _, name, _ in lutris.games()) == ['Other Game', 'Super Game']
+    assert sorted(lutris.main_files().values()) == sorted(
+        os.path.join(lutris.roms, name) for name in ('Other Game (Europe).sfc', 'Super Game (USA).sfc'))
+
+
+def test_incremental_skips_file_gone_after_scan(lutris, monkeypatch):
+    lutris.rom('Super Game (USA).sfc')
+    scan_directory = importer.scan_directory
+
+    # the scan lists a file that's deleted before it's checked
+    def scan_with_vanished_file(directory, *args, **kwargs):
+        yield os.path.join(directory, 'Gone (USA).sfc')
+        yield from scan_directory(directory, *args, **kwargs)
+
+    monkeypatch.setattr(importer, 'scan_directory', scan_with_vanished_file)
+    assert lutris.run('-u') == 0
+    assert [name for _, name, _ in lutris.games()] == ['Super Game']
@@ -0,0 +1,87 @@
+import os
+import sqlite3
+
+from lutris_bulk_adder.journal import ImportJournal, JournalEntry, INSERTED, UPDATED, RUNNING, FINISHED, ROLLED_BACK
+
+
+def test_record_again_is_ignored(tmp_path):
+    journal = ImportJournal(str(tmp_path / 'journal.db'))
+    journal.begin(str(tmp_path / 'pga.db'))
+    batch = [(1, INSERTED, 'game-1', '/roms/game 1.sfc'), (2, UPDATED, 'game-2', '/roms/game 2.sfc')]
+
+    # a batch tried again because Lutris was busy is recorded twice
+    journal.record(batch)
+    journal.record(batch)
+
+    assert [tuple(entry) for entry in journal.entries(journal.run_id)] == batch
+    journal.close()
+
+
+def test_committed_needs_same_id_and_config():
+    entries = [
+        JournalEntry(1, INSERTED, 'game-1', '/roms/1.sfc'),
+        # the batch of this one never made it into Lutris
+        JournalEntry(2, INSERTED, 'game-2', '/roms/2.sfc'),
+        # and this id belongs to another game by now
+        JournalEntry(3, INSERTED, 'game-3', '/roms/3.sfc'),
+    ]
+    games = {1: 'game-1', 3: 'other-game'}
+    assert ImportJournal.committed(entries, games) == entries[:1]
+
+
+def test_files_are_recorded_by_absolute_path(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    journal = ImportJournal('journal.db')
+    journal.begin('pga.db')
+    journal.record([(1, INSERTED, 'game-1', os.path.join('roms', 'game 1.sfc'))])
+    assert journal.entries(journal.run_id)[0].file == str(tmp_path / 'roms' / 'game 1.sfc')
+    journal.close()
+
+
+def test_resume_skips_what_the_run_imported(lutris, monkeypatch, capsys):
+    monkeypatch.chdir(lutris.root)
+    lutris.rom('First (USA).sfc')
+    lutris.rom('Second (USA).sfc')
+    assert lutris.run('-d', 'roms') == 0
+
+    # as if the run had died before it was done
+    conn = sqlite3.connect(lutris.side_database)
+    conn.execute("UPDATE runs SET status = ?", (RUNNING,))
+    conn.commit()
+    conn.close()
+    lutris.rom('Third (USA).sfc')
+    capsys.readouterr()
+
+    # resumed with the directory given another way
+    assert lutris.run('-d', lutris.roms, '--resume') == 0
+    output = capsys.readouterr().out
+    assert "Resuming import run 1, 2 files were imported before" in output
+    assert "Skipped 2 files imported before the run was resumed" in output
+    assert sorted(name for _, name, _ in lutris.games()) == ['First', 'Second', 'Third']
+
+    journal = ImportJournal(lutris.side_database)
+    assert journal.run(1).status == FINISHED
+    assert len(journal.entries(1)) == 3
+    journal.close()
+
+
+def test_rollback_deletes_what_the_run_added(lutris, capsys):
+    lutris.rom('First (USA).sfc')
+    assert lutris.run() == 0
+    lutris.rom('Second (USA).sfc')
+    assert lutris.run() == 0
+    second = [configpath for _, name, configpath in lutris.games() if name == 'Second']
+
+    assert lutris.run('--rollback', '2') == 0
+    assert [name for _, name, _ in lutris.games()] == ['First']
+    assert second[0] not in lutris.main_files()
+    assert list(lutris.main_files()) == [configpath for _, _, configpath in lutris.games()]
+
+    journal = ImportJournal(lutris.side_database)
+    assert journal.run(2).status == ROLLED_BACK
+    journal.close()
+
+    capsys.readouterr()
+    assert lutris.run('--rollback', '2') == 0
+    assert "Import run 2 was rolled back already" in capsys.readouterr().out
+    assert [name for _, name, _ in lutris.games()] == ['First']
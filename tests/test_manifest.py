@@ -0,0 +1,43 @@
+import os
+
+import pytest
+
+from lutris_bulk_adder.manifest import ScanManifest, ADDED, CHANGED
+
+
+def test_check_and_commit(tmp_path):
+    rom = tmp_path / 'game.sfc'
+    rom.write_bytes(b'rom')
+    manifest = ScanManifest(str(tmp_path / 'manifest.db'))
+
+    assert manifest.check(str(rom)) == ADDED
+    manifest.commit()
+    manifest.close()
+
+    # unchanged on the next run, changed once it's written to
+    manifest = ScanManifest(str(tmp_path / 'manifest.db'))
+    assert manifest.check(str(rom)) is None
+    rom.write_bytes(b'changed rom')
+    assert manifest.check(str(rom)) == CHANGED
+    assert (manifest.skipped, manifest.added, manifest.changed) == (1, 0, 1)
+    manifest.close()
+
+
+def test_relative_and_absolute_paths_match(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / 'roms').mkdir()
+    (tmp_path / 'roms' / 'game.sfc').write_bytes(b'rom')
+    manifest = ScanManifest('manifest.db')
+
+    manifest.check(os.path.join('roms', 'game.sfc'))
+    manifest.commit()
+    assert manifest.recorded(str(tmp_path / 'roms' / 'game.sfc')) is not None
+    assert manifest.check(str(tmp_path / 'roms' / 'game.sfc')) is None
+    manifest.close()
+
+
+def test_check_vanished_file(tmp_path):
+    manifest = ScanManifest(str(tmp_path / 'manifest.db'))
+    with pytest.raises(FileNotFoundError):
+        manifest.check(str(tmp_path / 'gone.sfc'))
+    manifest.close()
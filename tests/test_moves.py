@@ -0,0 +1,57 @@
+import os
+import shutil
+import sqlite3
+
+import pytest
+
+
+def set_playtime(lutris, playtime: float):
+    conn = sqlite3.connect(lutris.database)
+    conn.execute("UPDATE games SET playtime = ?", (playtime,))
+    conn.commit()
+    conn.close()
+
+
+@pytest.mark.parametrize('relative', [False, True])
+def test_renamed_rom_is_found_by_inode(lutris, monkeypatch, relative):
+    monkeypatch.chdir(lutris.root)
+    directory = 'roms' if relative else lutris.roms
+    lutris.rom('Game (USA).sfc')
+    lutris.rom('Other (USA).sfc')
+    assert lutris.run('-d', directory, '-u') == 0
+    set_playtime(lutris, 5.0)
+
+    os.rename(os.path.join(lutris.roms, 'Game (USA).sfc'), os.path.join(lutris.roms, 'Game (USA) [!].sfc'))
+    assert lutris.run('-d', directory, '--detect-moves') == 0
+
+    # the same game, pointing to the new file, with its playtime
+    assert lutris.games('name, playtime') == [('Game', 5.0), ('Other', 5.0)]
+    assert sorted(os.path.abspath(path) for path in lutris.main_files().values()) == [
+        os.path.join(lutris.roms, 'Game (USA) [!].sfc'), os.path.join(lutris.roms, 'Other (USA).sfc')]
+
+
+def test_copied_rom_is_found_by_hash(lutris):
+    old = lutris.rom('Game (USA).sfc', b'game rom')
+    lutris.rom('Other (USA).sfc', b'other rom')
+    assert lutris.run('-u', '-H') == 0
+    set_playtime(lutris, 5.0)
+
+    # a copy to another disk only keeps the contents
+    new = os.path.join(lutris.roms, 'Game (USA) (Rev 1).sfc')
+    shutil.copyfile(old, new)
+    os.remove(old)
+    assert lutris.run('--detect-moves') == 0
+
+    assert lutris.games('name, playtime') == [('Game', 5.0), ('Other', 5.0)]
+    assert new in lutris.main_files().values()
+
+
+def test_new_rom_of_the_same_size_is_imported(lutris):
+    lutris.rom('Game (USA).sfc', b'game rom')
+    assert lutris.run('-u', '-H') == 0
+
+    # same size, other contents, and the old ROM is still there
+    lutris.rom('Another (USA).sfc', b'new! rom')
+    assert lutris.run('--detect-moves') == 0
+
+    assert sorted(name for _, name, _ in lutris.games()) == ['Another', 'Game']
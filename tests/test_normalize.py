@@ -0,0 +1,49 @@
+import re
+
+import pytest
+
+from lutris_bulk_adder.normalize import Normalizer, filename_stem
+
+
+def old_normalize(stem: str, strip_tokens: list[str]):
+    """The name generation of the original single-file script, which the normalizer has to match."""
+
+    game = stem
+    for token in strip_tokens:
+        game = game.replace(token, "")
+    game = re.sub(r"\(.*?\)|\[.*?\]", "", game)
+    game = re.sub(r"\s+", " ", game).strip(" ")
+
+    slug = re.sub(r"[^0-9A-Za-z']", " ", game)
+    slug = slug.replace("'", "")
+    slug = re.sub(r"\s+", "-", slug).strip("-").lower()
+
+    return game, slug
+
+
+@pytest.mark.parametrize('stem, strip_tokens', [
+    ('Chrono Trigger (USA)', []),
+    ('Super Mario World (USA, Europe) [!]', ['(USA)']),
+    # a token inside another one, in both orders
+    ('Zelda USA (USA, Europe) Rev 1', ['USA', '(USA, Europe)']),
+    ('Zelda USA (USA, Europe) Rev 1', ['(USA, Europe)', 'USA']),
+    # overlapping tokens
+    ('Mega Man X Rev A Rev B', ['X Rev', 'Rev A']),
+    ('Mega Man X Rev A Rev B', ['Rev A', 'X Rev']),
+    # removing a token creates a match for a later one
+    ('Metroid DemDEMOo', ['DEMO', 'Demo']),
+    ('Metroid DemDEMOo', ['Demo', 'DEMO']),
+    ('Kirby\'s  Dream   Land', ['', ' ']),
+])
+def test_matches_old_behavior(stem, strip_tokens):
+    assert Normalizer(strip_tokens).normalize(stem) == old_normalize(stem, strip_tokens)
+    assert Normalizer(strip_tokens, cache_size=0).normalize(stem) == old_normalize(stem, strip_tokens)
+
+
+def test_normalize_many_keeps_order():
+    stems = ['B Game (Disc 2)', 'A Game', 'B Game (Disc 1)']
+    assert Normalizer().normalize_many(stems) == [('B Game', 'b-game'), ('A Game', 'a-game'), ('B Game', 'b-game')]
+
+
+def test_filename_stem():
+    assert filename_stem('/roms/Game.v1.sfc') == 'Game'
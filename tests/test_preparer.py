@@ -0,0 +1,40 @@
+from lutris_bulk_adder.classes import ImportJob
+from lutris_bulk_adder.preparer import GamePreparer, PreparePool
+
+
+def job_for(directory):
+    return ImportJob('Nintendo SNES', str(directory), 'libretro', 'snes9x', ['sfc'])
+
+
+def test_prepare_hashes_file(tmp_path):
+    rom = tmp_path / 'Super Game (USA).sfc'
+    rom.write_bytes(b'rom')
+    job = job_for(tmp_path)
+
+    prepared = GamePreparer([job], True, ['md5']).prepare(job, str(rom))
+    assert prepared.digests == {'md5': '5f397a1e588cfe96b4aa4bab7a5b1d44'}
+    assert prepared.size == 3
+    assert prepared.name == 'Super Game'
+
+
+def test_prepare_vanished_file(tmp_path):
+    # a file removed between the scan and the prepare
+    # step is prepared without its checksums
+    job = job_for(tmp_path)
+
+    prepared = GamePreparer([job], True, ['md5']).prepare(job, str(tmp_path / 'Gone (USA).sfc'))
+    assert prepared.platform == 'Nintendo SNES'
+    assert prepared.digests is None
+    assert prepared.size is None
+    assert prepared.hashed == 0
+
+
+def test_pool_prepare_vanished_file(tmp_path):
+    job = job_for(tmp_path)
+    pool = PreparePool([job], 1, True, ['md5'])
+    try:
+        prepared = pool.prepare(job, str(tmp_path / 'Gone (USA).sfc'))
+    finally:
+        pool.close()
+    assert prepared.platform == 'Nintendo SNES'
+    assert prepared.digests is None
@@ -0,0 +1,54 @@
+import os
+
+import pytest
+
+from lutris_bulk_adder.scanner import scan_directory
+
+
+@pytest.fixture
+def tree(tmp_path):
+    """roms/{a.sfc, B.SFC, notes.txt, USA/{c.sfc, Beta/d (Beta).sfc}, Japan/e.sfc}"""
+
+    for path in ('a.sfc', 'B.SFC', 'notes.txt', 'USA/c.sfc', 'USA/Beta/d (Beta).sfc', 'Japan/e.sfc'):
+        path = tmp_path / 'roms' / path
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_bytes(b'rom')
+    return tmp_path / 'roms'
+
+
+def scan(root, **kwargs):
+    return sorted(os.path.relpath(path, root) for path in scan_directory(str(root), ['sfc'], **kwargs))
+
+
+def test_max_depth(tree):
+    assert scan(tree) == ['B.SFC', 'a.sfc']
+    assert scan(tree, max_depth=1) == ['B.SFC', 'Japan/e.sfc', 'USA/c.sfc', 'a.sfc']
+    assert scan(tree, max_depth=None) == ['B.SFC', 'Japan/e.sfc', 'USA/Beta/d (Beta).sfc', 'USA/c.sfc', 'a.sfc']
+
+
+def test_include_and_exclude(tree):
+    # names and paths relative to the root both count
+    assert scan(tree, max_depth=None, exclude=['*(Beta)*']) == ['B.SFC', 'Japan/e.sfc', 'USA/c.sfc', 'a.sfc']
+    assert scan(tree, max_depth=None, exclude=['USA']) == ['B.SFC', 'Japan/e.sfc', 'a.sfc']
+    assert scan(tree, max_depth=None, include=['USA/*']) == ['USA/Beta/d (Beta).sfc', 'USA/c.sfc']
+    assert scan(tree, max_depth=None, include=['[a-e].sfc']) == ['Japan/e.sfc', 'USA/c.sfc', 'a.sfc']
+
+
+def test_symlinks(tree, tmp_path):
+    other = tmp_path / 'other'
+    other.mkdir()
+    (other / 'f.sfc').write_bytes(b'rom')
+    os.symlink(other / 'f.sfc', tree / 'linked.sfc')
+    os.symlink(other, tree / 'Other')
+    # a loop back up to the root
+    os.symlink(tree, tree / 'USA' / 'Loop')
+
+    # symlinked files are always there, symlinked directories only when followed
+    assert scan(tree, max_depth=None) == ['B.SFC', 'Japan/e.sfc', 'USA/Beta/d (Beta).sfc', 'USA/c.sfc', 'a.sfc', 'linked.sfc']
+    assert scan(tree, max_depth=None, follow_symlinks=True) == [
+        'B.SFC', 'Japan/e.sfc', 'Other/f.sfc', 'USA/Beta/d (Beta).sfc', 'USA/c.sfc', 'a.sfc', 'linked.sfc']
+
+
+def test_missing_directory(tmp_path):
+    with pytest.raises(FileNotFoundError):
+        list(scan_directory(str(tmp_path / 'gone'), ['sfc']))
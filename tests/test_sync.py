@@ -0,0 +1,69 @@
+import os
+import sqlite3
+
+from lutris_bulk_adder.database import DuplicateIndex, GameRow
+from lutris_bulk_adder.sync import SyncPlan, SyncedGame, load_main_files
+
+
+def synced(path: str, game_id: int = 1):
+    return SyncedGame(GameRow(game_id, 'game', 'Game', 'Nintendo SNES', 'libretro', 'game'), path, path + '.yml')
+
+
+def test_plan(tmp_path):
+    kept = tmp_path / 'kept.sfc'
+    kept.write_bytes(b'rom')
+    # still there, only left out of the scan by a pattern
+    excluded = tmp_path / 'excluded.sfc'
+    excluded.write_bytes(b'rom')
+    gone = str(tmp_path / 'gone.sfc')
+    moved = str(tmp_path / 'moved.sfc')
+    new = str(tmp_path / 'new.sfc')
+    moved_to = str(tmp_path / 'moved-to.sfc')
+
+    existing = {str(kept): synced(str(kept), 1), str(excluded): synced(str(excluded), 2),
+                gone: synced(gone, 3), moved: synced(moved, 4)}
+    plan = SyncPlan(existing, {str(kept), new, moved_to}, {moved: moved_to})
+
+    assert [game.main_file for game in plan.removed] == [gone]
+    assert plan.added == {new}
+    assert plan.kept == 3
+
+
+def test_load_main_files_by_directory_and_platform(lutris):
+    lutris.rom('Snes Game (USA).sfc')
+    lutris.rom('Nes Game (USA).nes')
+    elsewhere = os.path.join(lutris.root, 'elsewhere')
+    lutris.rom('Elsewhere Game (USA).sfc', directory=elsewhere)
+    assert lutris.run('-f', 'sfc') == 0
+    assert lutris.run('-f', 'nes', platform='Nintendo NES') == 0
+    assert lutris.run('-d', elsewhere) == 0
+
+    conn = sqlite3.connect(lutris.database)
+    rows = DuplicateIndex(conn).rows
+    conn.close()
+
+    games = load_main_files(rows, lutris.yml_dir, [lutris.roms], ['Nintendo SNES'])
+    assert list(games) == [os.path.join(lutris.roms, 'Snes Game (USA).sfc')]
+    games = load_main_files(rows, lutris.yml_dir, [lutris.roms])
+    assert sorted(games) == [os.path.join(lutris.roms, name) for name in ('Nes Game (USA).nes', 'Snes Game (USA).sfc')]
+
+
+def test_sync_removes_games_whose_rom_is_gone(lutris):
+    lutris.rom('Kept (USA).sfc')
+    gone = lutris.rom('Gone (USA).sfc')
+    nes = lutris.rom('Nes Game (USA).nes')
+    elsewhere = os.path.join(lutris.root, 'elsewhere')
+    other = lutris.rom('Elsewhere (USA).sfc', directory=elsewhere)
+    assert lutris.run('-f', 'sfc') == 0
+    assert lutris.run('-f', 'nes', platform='Nintendo NES') == 0
+    assert lutris.run('-d', elsewhere) == 0
+
+    # the ROMs of games of another platform and of
+    # another directory are gone as well, but those
+    # games aren't part of what's synced
+    for path in (gone, nes, other):
+        os.remove(path)
+    assert lutris.run('-f', 'sfc', '--sync') == 0
+
+    assert sorted(name for _, name, _ in lutris.games()) == ['Elsewhere', 'Kept', 'Nes Game']
+    assert len(lutris.main_files()) == 3